@@ -1,23 +1,15 @@
 
 import streamlit as st
+import json
 import time
-from src.rag.engine import RAGEngine
-from src.rag.vector_store import initialize_vector_store
-from src.logger import setup_logger
-from config.settings import MODEL_TYPE, LOCAL_LLM_MODEL, BEDROCK_MODEL_ID, LOG_FILE
+from src.logger import setup_logger, tail_file
+from config.settings import MODEL_TYPE, LOCAL_LLM_MODEL, BEDROCK_MODEL_ID, LOG_FILE, WARMUP_ENABLED
 from config.prompts import UI_SAMPLE_QUESTIONS, CHAT_INPUT_PLACEHOLDER
 import os
 
+rerun_started = time.perf_counter()
 logger = setup_logger(__name__)
 
-# Initialize application components
-try:
-    vector_store_manager = initialize_vector_store()
-    rag_engine = RAGEngine(vector_store_manager)
-except Exception as e:
-    st.error(f"Failed to initialize System: {e}")
-    st.stop()
-
 st.set_page_config(
     page_title="AirIndia-RAG-IntelligenceBOT",
     page_icon="✈️",
@@ -25,6 +17,40 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Application-lifetime resources: built once per process and shared by every session and rerun.
+# Heavy modules (embedding model, Chroma, provider SDKs) are imported on first use only.
+@st.cache_resource(show_spinner="Loading embedding model...")
+def get_embedding_function():
+    from src.rag.embeddings import get_embedding_function as build_embedding_function
+    return build_embedding_function()
+
+@st.cache_resource(show_spinner="Opening vector store...")
+def get_vector_store_manager():
+    from src.rag.vector_store import VectorStoreManager
+    return VectorStoreManager(get_embedding_function())
+
+@st.cache_resource(show_spinner="Connecting to the language model...")
+def get_llm_provider():
+    from src.rag.engine import create_llm_provider
+    return create_llm_provider(MODEL_TYPE)
+
+@st.cache_resource(show_spinner="Warming up the assistant...")
+def get_rag_engine():
+    from src.rag.engine import RAGEngine
+    started = time.perf_counter()
+    engine = RAGEngine(get_vector_store_manager(), llm_provider=get_llm_provider())
+    if WARMUP_ENABLED:
+        # Loads embedding and LLM weights and faults in the index pages before the first real question
+        engine.warm_up(UI_SAMPLE_QUESTIONS[0])
+    logger.info(f"Application resources ready in {time.perf_counter() - started:.2f}s")
+    return engine
+
+try:
+    rag_engine = get_rag_engine()
+except Exception as e:
+    st.error(f"Failed to initialize System: {e}")
+    st.stop()
+
 # Sidebar for additional info / controls
 with st.sidebar:
     if os.path.exists("logo.png"):
@@ -41,15 +67,27 @@ with st.sidebar:
     active_model = BEDROCK_MODEL_ID if MODEL_TYPE == "bedrock" else LOCAL_LLM_MODEL
     st.metric(label="Model Mode", value=MODEL_TYPE.upper())
     st.metric(label="Active Model", value=active_model)
+    if rag_engine.response_cache:
+        st.caption(f"Answer cache: {rag_engine.response_cache.stats_line()}")
+    if hasattr(rag_engine.llm, "stats_line"):
+        st.caption(f"LLM hedging: {rag_engine.llm.stats_line()}")
+    if getattr(rag_engine.vector_store, "router", None):
+        st.caption(f"Query routing: {rag_engine.vector_store.router.stats_line()}")
+
+    stage_latency = rag_engine.metrics.summary()
+    if stage_latency:
+        with st.expander(f"⏱️ Stage latency ({rag_engine.metrics.requests} requests)"):
+            st.table([{"stage": stage, **values} for stage, values in stage_latency.items()])
+            st.download_button("Prometheus metrics", rag_engine.metrics.to_prometheus(),
+                               file_name="rag_metrics.prom", mime="text/plain")
+            st.download_button("OTLP JSON metrics", json.dumps(rag_engine.metrics.to_otel_json(), indent=2),
+                               file_name="rag_metrics.json", mime="application/json")
     st.divider()
 
     st.subheader("📜 System Logs")
     if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r") as f:
-            logs = f.readlines()
-            # Show last 20 lines
-            log_text = "".join(logs[-20:])
-            st.code(log_text, language="text")
+        # Show last 20 lines, read backwards from the end of the file
+        st.code(tail_file(LOG_FILE, lines=20), language="text")
     else:
         st.info("No logs found yet.")
 
@@ -91,6 +129,9 @@ elif input_val:
     prompt = input_val
     del st.session_state.sample_prompt
 
+# Fixed cost of every rerun (resource lookup, sidebar, history replay), excluding answer generation
+logger.debug(f"UI rerun overhead: {(time.perf_counter() - rerun_started) * 1000:.1f}ms")
+
 if prompt:
     # Display user message in chat message container
     with st.chat_message("user"):
@@ -109,12 +150,18 @@ if prompt:
                 logger.info(f"Processing user query: {prompt}")
                 
                 # Pass the history (everything except the current message just added)
-                response, sources = rag_engine.generate_response(prompt, chat_history=st.session_state.messages[:-1])
-                
-                # Simulate typing effect
-                for chunk in response.split():
-                    full_response += chunk + " "
-                    time.sleep(0.05)
+                sources = []
+                start_time = time.time()
+                first_token_at = None
+                for kind, payload in rag_engine.stream_response(prompt, chat_history=st.session_state.messages[:-1]):
+                    if kind == "sources":
+                        sources = payload
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                        logger.info(f"UI time-to-first-token: {first_token_at - start_time:.2f}s")
+                    # Render real tokens as they arrive
+                    full_response += payload
                     message_placeholder.markdown(full_response + "▌")
                 message_placeholder.markdown(full_response)
                 
@@ -0,0 +1,304 @@
+"""
+Offline performance benchmarks: ingestion throughput, retrieval latency, end-to-end RAGEngine
+QPS under concurrency, Ollama cold vs. warm latency and peak RSS. The embedding model and LLM
+are the deterministic stubs from tests/stubs.py with simulated latency, so results reflect this
+codebase rather than a model server and can be diffed between commits. The Ollama numbers come from OllamaProvider
+talking to tests/fake_ollama.py, which simulates model loading and KV-cache prefix reuse.
+
+    python -m benchmarks.perf --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.perf --compare benchmarks/results/<baseline>.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from config.prompts import TEST_QUESTIONS, UI_SAMPLE_QUESTIONS, RAG_SYSTEM_PROMPT, RAG_PROMPT_TEMPLATE
+from config.settings import COLLECTION_NAME, VECTOR_BACKEND
+from src.logger import setup_logger
+from src.llm.ollama_provider import OllamaProvider
+from src.rag.engine import RAGEngine
+from src.rag.pipeline import IngestionPipeline
+from src.rag.tracing import MetricsRegistry
+from src.rag.vector_backends import create_backend
+from src.rag.vector_store import VectorStoreManager
+from tests.fake_ollama import FakeOllamaServer
+from tests.stubs import HashEmbeddings, StubLLM
+
+logger = setup_logger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_DOCS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "AirIndia")
+DEFAULT_CONCURRENCY = (1, 2, 4, 8, 16)
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size so far of this process and of its reaped children (parse workers)."""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def latency_stats(samples_ms: Sequence[float]) -> Dict[str, float]:
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+
+def golden_questions() -> List[str]:
+    return list(dict.fromkeys(UI_SAMPLE_QUESTIONS + TEST_QUESTIONS))
+
+
+def bench_ingestion(docs_dir: str, db_dir: str, embeddings, backend: str) -> tuple:
+    """Ingests every PDF in docs_dir into a fresh store; returns (manager, throughput report)."""
+    paths = sorted(os.path.join(docs_dir, f) for f in os.listdir(docs_dir) if f.lower().endswith(".pdf"))
+    manager = VectorStoreManager(
+        embeddings, backend=create_backend(backend, embeddings, db_dir, COLLECTION_NAME), persist_directory=db_dir
+    )
+    # Parsing is part of what is measured, so the PDF text cache stays out of the way
+    pipeline = IngestionPipeline(manager, use_pdf_cache=False)
+    summary = pipeline.run(paths)
+    started = time.perf_counter()
+    manager.rebuild_keyword_index()
+    manager.backend.build_index()
+    index_seconds = time.perf_counter() - started
+
+    wall = pipeline.wall_time
+    pages = pipeline.stats["parse"].items
+    chunks = pipeline.stats["upsert"].items
+    report = {
+        "files": len(paths),
+        "failed": len(summary["failed"]),
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(wall, 3),
+        "pages_per_sec": round(pages / wall, 2) if wall else 0.0,
+        "chunks_per_sec": round(chunks / wall, 2) if wall else 0.0,
+        "index_seconds": round(index_seconds, 3),
+        "stage_busy_seconds": {name: round(stat.busy, 3) for name, stat in pipeline.stats.items()},
+    }
+    logger.info(f"Ingestion: {pages} pages, {chunks} chunks in {wall:.2f}s "
+                f"({report['pages_per_sec']} pages/s, {report['chunks_per_sec']} chunks/s)")
+    return manager, report
+
+
+def bench_retrieval(manager: VectorStoreManager, questions: List[str], rounds: int) -> Dict[str, dict]:
+    """Latency distributions of dense-only and hybrid (dense + BM25) search over the golden questions."""
+    results = {}
+    for name, search in (("dense", manager.dense_search), ("hybrid", manager.similarity_search)):
+        search(questions[0])  # first call loads indexes
+        samples = []
+        for _ in range(rounds):
+            for question in questions:
+                started = time.perf_counter()
+                search(question)
+                samples.append((time.perf_counter() - started) * 1000)
+        results[name] = latency_stats(samples)
+        logger.info(f"Retrieval ({name}): p50 {results[name]['p50_ms']}ms, p95 {results[name]['p95_ms']}ms")
+    return results
+
+
+def bench_serving(engine: RAGEngine, questions: List[str], concurrency: Sequence[int],
+                  requests_per_worker: int) -> Dict[str, dict]:
+    """End-to-end generate_response throughput and latency at each concurrency level."""
+    results = {}
+    for workers in concurrency:
+        engine.metrics = MetricsRegistry()
+        total = workers * requests_per_worker
+        prompts = [questions[i % len(questions)] for i in range(total)]
+        latencies = []
+
+        def call(question):
+            started = time.perf_counter()
+            engine.generate_response(question)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(call, prompts))
+        wall = time.perf_counter() - started
+
+        stages = engine.metrics.summary()
+        stages.pop("total", None)
+        results[str(workers)] = {
+            "requests": total,
+            "qps": round(total / wall, 2),
+            **latency_stats(latencies),
+            "stage_p50_ms": {stage: values["p50_ms"] for stage, values in stages.items()},
+        }
+        logger.info(f"Serving at concurrency {workers}: {results[str(workers)]['qps']} QPS, "
+                    f"p95 {results[str(workers)]['p95_ms']}ms")
+    return results
+
+
+def bench_ollama(questions: List[str], load_latency: float, token_latency: float) -> dict:
+    """
+    First-request latency against a cold fake Ollama server versus after OllamaProvider.warm_up,
+    and the share of prompt tokens served from the KV cache once the system prefix is warm.
+    """
+    prompts = [RAG_PROMPT_TEMPLATE.format(chat_history="No previous conversation.", context="Baggage rules.",
+                                          question=q) for q in questions]
+    with FakeOllamaServer(load_latency=load_latency, token_latency=token_latency) as server:
+        provider = OllamaProvider(base_url=server.endpoint_url)
+        started = time.perf_counter()
+        provider.generate(prompts[0], RAG_SYSTEM_PROMPT)
+        cold_ms = (time.perf_counter() - started) * 1000
+
+        server.expire()
+        provider = OllamaProvider(base_url=server.endpoint_url)
+        warm_up_ms = provider.warm_up(RAG_SYSTEM_PROMPT) * 1000
+        served_from = len(server.requests)
+        samples = []
+        for prompt in prompts:
+            started = time.perf_counter()
+            provider.generate(prompt, RAG_SYSTEM_PROMPT)
+            samples.append((time.perf_counter() - started) * 1000)
+        warm = server.requests[served_from:]
+
+    reused = sum(r["reused_tokens"] for r in warm)
+    evaluated = sum(r["evaluated_tokens"] for r in warm)
+    report = {
+        "cold_first_request_ms": round(cold_ms, 3),
+        "warm_up_ms": round(warm_up_ms, 3),
+        "warm_first_request_ms": round(samples[0], 3),
+        "warm": latency_stats(samples),
+        "reloads_after_warm_up": sum(r["loaded"] for r in warm),
+        "prefix_reuse_ratio": round(reused / (reused + evaluated), 3) if reused + evaluated else 0.0,
+    }
+    logger.info(f"Ollama: cold first request {report['cold_first_request_ms']:.0f}ms, warm first request "
+                f"{report['warm_first_request_ms']:.0f}ms, {report['prefix_reuse_ratio']:.0%} prompt tokens reused")
+    return report
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_benchmarks(
+    docs_dir: str = DEFAULT_DOCS_DIR,
+    backend: str = VECTOR_BACKEND,
+    embed_latency: float = 0.002,
+    llm_latency: float = 0.05,
+    concurrency: Sequence[int] = DEFAULT_CONCURRENCY,
+    requests_per_worker: int = 8,
+    retrieval_rounds: int = 5,
+    ollama_load_latency: float = 1.0,
+    ollama_token_latency: float = 0.0005,
+) -> dict:
+    """Runs every benchmark against a throwaway store and returns the JSON-serializable report."""
+    questions = golden_questions()
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "backend": backend,
+            "embed_latency_s": embed_latency,
+            "llm_latency_s": llm_latency,
+            "concurrency": list(concurrency),
+            "requests_per_worker": requests_per_worker,
+            "retrieval_rounds": retrieval_rounds,
+            "ollama_load_latency_s": ollama_load_latency,
+            "ollama_token_latency_s": ollama_token_latency,
+            "questions": len(questions),
+        },
+    }
+    embeddings = HashEmbeddings(latency=embed_latency)
+    with tempfile.TemporaryDirectory() as db_dir:
+        manager, report["ingestion"] = bench_ingestion(docs_dir, db_dir, embeddings, backend)
+        report["retrieval"] = bench_retrieval(manager, questions, retrieval_rounds)
+
+        # Every request must do the full work: no answer cache, and no reranker model to download
+        engine = RAGEngine(manager, llm_provider=StubLLM(latency=llm_latency), response_cache=None, reranker=None)
+        report["serving"] = bench_serving(engine, questions, concurrency, requests_per_worker)
+    report["ollama"] = bench_ollama(questions, ollama_load_latency, ollama_token_latency)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def flatten(report: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare_reports(baseline: dict, current: dict) -> List[str]:
+    """One line per numeric metric present in both reports, with the relative change."""
+    old, new = flatten(baseline), flatten(current)
+    lines = []
+    for path in sorted(old.keys() & new.keys()):
+        if path.startswith(("meta.", "config.")):
+            continue
+        change = (new[path] - old[path]) / old[path] * 100 if old[path] else 0.0
+        lines.append(f"{path:<45} {old[path]:>12g} -> {new[path]:>12g}  ({change:+.1f}%)")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ingestion / retrieval / serving benchmarks with stub models.")
+    parser.add_argument("--docs-dir", type=str, default=DEFAULT_DOCS_DIR, help="Directory of PDFs to ingest.")
+    parser.add_argument("--backend", type=str, default=VECTOR_BACKEND, help="Vector backend (chroma, numpy, faiss).")
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="Simulated seconds per embedding call.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per LLM call.")
+    parser.add_argument("--concurrency", type=str, default=",".join(map(str, DEFAULT_CONCURRENCY)),
+                        help="Comma-separated concurrency levels for the serving benchmark.")
+    parser.add_argument("--requests-per-worker", type=int, default=8, help="Requests each worker issues per level.")
+    parser.add_argument("--ollama-load-latency", type=float, default=1.0,
+                        help="Simulated seconds the fake Ollama server takes to load the model.")
+    parser.add_argument("--ollama-token-latency", type=float, default=0.0005,
+                        help="Simulated seconds per prompt token the fake Ollama server evaluates.")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the golden questions for retrieval latency.")
+    parser.add_argument("--output", type=str,
+                        help="Path for the JSON report (default: benchmarks/results/<revision>.json).")
+    parser.add_argument("--compare", type=str, help="Baseline JSON report to diff the new results against.")
+    args = parser.parse_args()
+
+    result = run_benchmarks(
+        docs_dir=args.docs_dir,
+        backend=args.backend,
+        embed_latency=args.embed_latency,
+        llm_latency=args.llm_latency,
+        concurrency=[int(level) for level in args.concurrency.split(",") if level],
+        requests_per_worker=args.requests_per_worker,
+        retrieval_rounds=args.rounds,
+        ollama_load_latency=args.ollama_load_latency,
+        ollama_token_latency=args.ollama_token_latency,
+    )
+    output: Optional[str] = args.output or os.path.join(RESULTS_DIR, f"{result['meta']['revision']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"Benchmark report written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print("\n".join(compare_reports(json.load(f), result)))
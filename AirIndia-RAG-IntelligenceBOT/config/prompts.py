@@ -10,15 +10,31 @@ Follow Up Input: {question}
 
 Standalone search query:"""
 
-RAG_PROMPT_TEMPLATE = """
-### ROLE
+HISTORY_SUMMARY_PROMPT = """
+[INSTRUCTION]
+Update the running summary of a conversation between a user and an Air India assistant.
+Merge the Existing Summary with the New Lines into one concise summary of at most {max_words} words.
+Keep the user's questions, key facts from the answers, and any names, routes or numbers mentioned.
+
+Existing Summary:
+{summary}
+
+New Lines:
+{new_lines}
+
+Updated summary:"""
+
+# Static instructions, sent as the system prompt. Keep them free of per-request values: the
+# model server can then reuse its KV cache for this prefix instead of re-processing it.
+RAG_SYSTEM_PROMPT = """### ROLE
 You are a factual AI assistant for Air India. Your goal is to answer the USER'S QUESTION using ONLY the provided CONTEXT.
 
 ### RULES
 1. If the answer is not in the CONTEXT, say exactly: "I'm sorry, I don't see that information in the documents I have."
 2. Do not use your own knowledge. Use only the provided CONTEXT.
-3. If the user asks about the conversation history, use the CHAT HISTORY section below.
+3. If the user asks about the conversation history, use the CHAT HISTORY section below."""
 
+RAG_PROMPT_TEMPLATE = """
 ### DATA
 CHAT HISTORY:
 {chat_history}
@@ -81,3 +97,33 @@ TEST_QUESTIONS = [
     "Who are the major interline partners or associated airlines for Air India?",
     "What are all the questions that I have asked you above?"
 ]
+
+# Reference answers used by the RAGAS metrics that need ground truth (context recall)
+GROUND_TRUTH = {
+    "What is Air India's baggage policy for international flights?": "Most international flights allow 2 pieces of 23kg each for Economy Class and 2 pieces of 32kg each for Business Class.",
+    "Tell me about Air India's history and its founders.": "Air India was founded by J.R.D. Tata in 1932 as Tata Airlines. It was nationalized in 1953 and later re-acquired by the Tata Group in 2022.",
+    "What are the major air disasters associated with Air India in its history?": "Notable disasters include the 1950 Mont Blanc crash and the 1985 Kanishka bombing (Flight 182).",
+    "List some of the domestic routes operated by Air India as of February 2025.": "Air India operates a wide network connecting major cities like Delhi, Mumbai, Bengaluru, Kolkata, and Chennai.",
+    "What are the key service regulations for AIESL employees mentioned in the documents?": "AIESL employees are governed by specific service regulations covering working hours, safety protocols, and disciplinary procedures as detailed in the service manual.",
+    "Who are the major interline partners or associated airlines for Air India?": "Air India is a member of the Star Alliance and has numerous interline partners including Lufthansa, Singapore Airlines, and United Airlines."
+}
+
+# Expected document families per question, for routing accuracy (python -m src.rag.router)
+ROUTING_EVAL = {
+    "What is Air India's baggage policy for international flights?": ("fact_sheet",),
+    "Tell me about Air India's history and its founders.": ("history", "fact_sheet"),
+    "What are the major air disasters associated with Air India in its history?": ("history",),
+    "List some of the domestic routes operated by Air India as of February 2025.": ("routes",),
+    "What are the key service regulations for AIESL employees mentioned in the documents?": ("regulations",),
+    "Who are the major interline partners or associated airlines for Air India?": ("fact_sheet",),
+    "Which cities does Air India connect to non-stop from Delhi?": ("routes",),
+    "Does Air India fly to Tel Aviv?": ("routes",),
+    "How many days of earned leave can an employee accumulate?": ("regulations",),
+    "What happens in a disciplinary enquiry against an officer?": ("regulations",),
+    "At what age does an AIESL employee retire?": ("regulations",),
+    "What is the seat pitch in Air India's premium economy?": ("fact_sheet",),
+    "Which aircraft types are in the Air India fleet?": ("fact_sheet",),
+    "What happened to Air India Flight 182 in 1985?": ("history",),
+    "Which Air India flight crashed on Mont Blanc?": ("history",),
+    "When was Air India nationalised?": ("history", "fact_sheet"),
+}
@@ -13,19 +13,132 @@ MODEL_TYPE = os.getenv("MODEL_TYPE", "local") # "bedrock" or "local"
 AWS_REGION = os.getenv("AWS_REGION", "eu-west-3")
 BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "eu.amazon.nova-pro-v1:0")
 BEDROCK_EMBEDDING_MODEL_ID = os.getenv("BEDROCK_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL") or None # e.g. a local fake Bedrock for tests
+
+# Shared Bedrock Client (one pooled client per process; limits apply per model, 0 = unlimited)
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv("BEDROCK_MAX_POOL_CONNECTIONS", 50))
+BEDROCK_MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", 4)) # per generation call; botocore retries are off
+BEDROCK_CONNECT_TIMEOUT = float(os.getenv("BEDROCK_CONNECT_TIMEOUT", 5))
+BEDROCK_READ_TIMEOUT = float(os.getenv("BEDROCK_READ_TIMEOUT", 60))
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", 16))
+BEDROCK_TPS = float(os.getenv("BEDROCK_TPS", 0)) # requests per second
+BEDROCK_TPM = float(os.getenv("BEDROCK_TPM", 0)) # tokens per minute
+# Per-model overrides, e.g. "eu.amazon.nova-pro-v1:0=4,amazon.titan-embed-text-v2:0=32"
+BEDROCK_MODEL_CONCURRENCY = os.getenv("BEDROCK_MODEL_CONCURRENCY", "")
+BEDROCK_MODEL_TPS = os.getenv("BEDROCK_MODEL_TPS", "")
+BEDROCK_MODEL_TPM = os.getenv("BEDROCK_MODEL_TPM", "")
+
+# Hedged LLM calls: a secondary provider ("bedrock" or "local") takes over when the primary
+# (MODEL_TYPE) is slower than its own HEDGE_PERCENTILE latency or its circuit breaker is open
+LLM_FALLBACK_MODEL_TYPE = os.getenv("LLM_FALLBACK_MODEL_TYPE", "") # empty = single provider
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.95))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20)) # until then the initial delay applies
+HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("HEDGE_INITIAL_DELAY_SECONDS", 5))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", 0.25))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", 0.5)) # of the last CIRCUIT_WINDOW calls
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", 20))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", 5))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", 30))
+
+# Embedding Throughput
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", 8))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 5))
+
+# Embedding Cache (persistent, keyed by model id + normalized text hash)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./.cache/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 512))
 
 # Local Configuration (Ollama / HuggingFace)
 LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "llama3")
 LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 
+# Ollama serving: keep the model resident and size the context window per request
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL") or None # None = the client default, http://localhost:11434
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "-1") # seconds (-1 = pinned) or a duration such as "30m"
+OLLAMA_NUM_CTX_MIN = int(os.getenv("OLLAMA_NUM_CTX_MIN", 2048))
+OLLAMA_NUM_CTX_MAX = int(os.getenv("OLLAMA_NUM_CTX_MAX", 8192))
+OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", 512)) # answer tokens, reserved in the context window
+
 # Vector Store Configuration
 VECTOR_DB_DIR = os.getenv("VECTOR_DB_DIR", "./chroma_vectorestore")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "air_india_collection")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma") # "chroma", "numpy" (exact) or "faiss" (ANN)
+NUMPY_STORE_DTYPE = os.getenv("NUMPY_STORE_DTYPE", "float16") # "float16" or "int8"
+# FAISS ANN index (VECTOR_BACKEND=faiss): "hnsw", "ivf", "ivfpq" or "flat"
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "hnsw")
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", 200))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", 64))
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", 0)) # 0 = about 4 * sqrt(chunks)
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", 8))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", 16)) # sub-quantizers; must divide the embedding dimension
+FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", 8))
+# One manifest per backend, so switching backends triggers a (cache-backed) ingestion into the new one
+_MANIFEST_NAME = (f"{COLLECTION_NAME}_manifest.json" if VECTOR_BACKEND == "chroma"
+                  else f"{COLLECTION_NAME}_{VECTOR_BACKEND}_manifest.json")
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(VECTOR_DB_DIR, _MANIFEST_NAME))
+
+# Hybrid Retrieval (BM25 keyword index fused with dense search via reciprocal rank fusion)
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", 10))
+RRF_K = int(os.getenv("RRF_K", 60))
+
+# Query routing: restrict each search to the document families a question is about
+# (keyword rules first, then the nearest family centroid of the stored chunk embeddings)
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", 0.2)) # below this, search every family
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", 0.05)) # families this close to the best one are searched too
+
+# Reranking (optional local cross-encoder between retrieval and prompt construction)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 3))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 300))
+
+# Speculative retrieval: reuse raw-question results when the condensed query is this similar
+SPECULATIVE_RETRIEVAL_SIMILARITY = float(os.getenv("SPECULATIVE_RETRIEVAL_SIMILARITY", 0.9))
+
+# Batch answering (RAGEngine.generate_batch): concurrent LLM generations per batch
+BATCH_GENERATION_WORKERS = int(os.getenv("BATCH_GENERATION_WORKERS", 4))
+
+# Chat History (verbatim recent turns + rolling summary of older ones, within a token budget)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1000))
+HISTORY_RECENT_TURNS = int(os.getenv("HISTORY_RECENT_TURNS", 3))
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", 250))
+
+# Context Packing (merge neighbouring chunks, MMR diversity, fit retrieved text into a token budget)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", 0.7)) # 1.0 = pure relevance order
 
 # Document Processing
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
 
+# PDF Text Cache (extracted pages keyed by file hash + parser version; re-chunking skips parsing)
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "true").lower() == "true"
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "./.cache/pdf_text")
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", 256))
+
+# Ingestion Pipeline (0 parse workers = one per CPU core)
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", 0))
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", 16))
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 64))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 8))
+
+# Response Cache (exact + near-duplicate answers, invalidated by ingestion)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 500))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.95))
+
+# UI: run one retrieval at boot so the first question does not pay for model/index loading
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
+# Evaluation runner (answers are generated once and checkpointed per question)
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", 4))
+EVAL_CHECKPOINT_DIR = os.getenv("EVAL_CHECKPOINT_DIR", "./.cache/eval")
 
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Iterator, Optional, Dict, Any
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
@@ -13,3 +13,14 @@ class LLMProvider(ABC):
     def evaluate(self, prompt: str) -> str:
         """Evaluates a response, typically expecting JSON output."""
         pass
+
+    def stream(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields the response in pieces as the model produces them.
+        Providers without native streaming fall back to a single piece.
+        """
+        yield self.generate(prompt, system_prompt)
+
+    def warm_up(self, system_prompt: Optional[str] = None) -> float:
+        """Loads the model ahead of the first request; returns seconds taken. Hosted models need nothing."""
+        return 0.0
@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from config.settings import (
+    AWS_REGION, BEDROCK_ENDPOINT_URL, BEDROCK_MAX_POOL_CONNECTIONS,
+    BEDROCK_CONNECT_TIMEOUT, BEDROCK_READ_TIMEOUT, BEDROCK_MAX_CONCURRENCY, BEDROCK_TPS, BEDROCK_TPM,
+    BEDROCK_MODEL_CONCURRENCY, BEDROCK_MODEL_TPS, BEDROCK_MODEL_TPM
+)
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Bedrock error codes that signal "slow down" rather than a bad request
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelTimeoutException",
+    "InternalServerException",
+}
+# Errors the retry loops catch: Bedrock error responses, plus the connect/read timeouts and dropped
+# connections that botocore's own retries used to cover
+RETRYABLE_EXCEPTIONS = (ClientError, BotoConnectionError, HTTPClientError)
+
+
+def retryable_error_code(error: Exception) -> Optional[str]:
+    """The Bedrock error code (or transport error name) if the call is worth retrying, otherwise None."""
+    if isinstance(error, (BotoConnectionError, HTTPClientError)):
+        return type(error).__name__
+    if not isinstance(error, ClientError):
+        return None
+    code = error.response.get("Error", {}).get("Code", "")
+    return code if code in RETRYABLE_ERROR_CODES else None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, capped at 10s."""
+    return random.uniform(0, min(10.0, 0.2 * (2 ** attempt)))
+
+
+def parse_model_overrides(spec: str) -> Dict[str, float]:
+    """Parses "model=value,model=value"; model IDs may contain ':' but not '='."""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model_id, _, value = item.rpartition("=")
+        try:
+            overrides[model_id.strip()] = float(value)
+        except ValueError:
+            logger.warning(f"Ignoring malformed Bedrock model override: {item}")
+    return overrides
+
+
+class TokenBucket:
+    """Blocking token bucket refilled at `rate` units per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Takes `amount` units, sleeping until they are available. Returns the seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, delta: float):
+        """Charges (positive) or refunds (negative) units after the fact; the balance may go negative."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class ModelGate:
+    """
+    Client-side limits for one Bedrock model, shared by every caller in the process:
+    requests per second, tokens per minute and the number of calls in flight.
+    """
+
+    def __init__(self, model_id: str, max_concurrency: int = 0, tps: float = 0, tpm: float = 0):
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self.requests = TokenBucket(tps, tps) if tps > 0 else None
+        self.tokens = TokenBucket(tpm / 60.0, tpm) if tpm > 0 else None
+        self.calls = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0) -> Iterator["ModelGate"]:
+        """Holds a concurrency slot for one call after passing the rate limits."""
+        started = time.perf_counter()
+        if self.requests:
+            self.requests.acquire()
+        if self.tokens and estimated_tokens:
+            self.tokens.acquire(estimated_tokens)
+        if self._slots:
+            self._slots.acquire()
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.calls += 1
+            self.wait_seconds += waited
+        if waited > 1.0:
+            logger.debug(f"Waited {waited:.2f}s for a {self.model_id} slot")
+        try:
+            yield self
+        finally:
+            if self._slots:
+                self._slots.release()
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Corrects the TPM bucket once the response reports real token usage."""
+        if self.tokens and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def stats(self) -> Dict[str, float]:
+        return {"calls": self.calls, "wait_seconds": round(self.wait_seconds, 3)}
+
+
+_clients: Dict[Tuple[str, Optional[str]], object] = {}
+_gates: Dict[str, ModelGate] = {}
+_lock = threading.Lock()
+
+
+def get_bedrock_client(region_name: str = AWS_REGION, endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL):
+    """
+    Process-wide bedrock-runtime client per (region, endpoint). boto3 clients are thread-safe,
+    so embeddings and generation share one connection pool. botocore retries are off: callers
+    retry throttles and transport errors themselves, so the model gate and the embedding limiter
+    see every attempt.
+    """
+    key = (region_name, endpoint_url)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            config = Config(
+                max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+                retries={"total_max_attempts": 1, "mode": "standard"},
+                connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+                read_timeout=BEDROCK_READ_TIMEOUT,
+            )
+            client = boto3.client("bedrock-runtime", region_name=region_name, endpoint_url=endpoint_url, config=config)
+            _clients[key] = client
+            logger.info(f"Created shared Bedrock client for {region_name} "
+                        f"(pool={BEDROCK_MAX_POOL_CONNECTIONS}, botocore retries off)")
+    return client
+
+
+def get_model_gate(model_id: str) -> ModelGate:
+    """Shared ModelGate for a model, configured from the global limits and per-model overrides."""
+    with _lock:
+        gate = _gates.get(model_id)
+        if gate is None:
+            concurrency = parse_model_overrides(BEDROCK_MODEL_CONCURRENCY).get(model_id, BEDROCK_MAX_CONCURRENCY)
+            tps = parse_model_overrides(BEDROCK_MODEL_TPS).get(model_id, BEDROCK_TPS)
+            tpm = parse_model_overrides(BEDROCK_MODEL_TPM).get(model_id, BEDROCK_TPM)
+            gate = ModelGate(model_id, int(concurrency), tps, tpm)
+            _gates[model_id] = gate
+            logger.info(f"Bedrock limits for {model_id}: concurrency={int(concurrency) or 'unlimited'}, "
+                        f"tps={tps or 'unlimited'}, tpm={tpm or 'unlimited'}")
+    return gate
+
+
+def reset_bedrock_clients():
+    """Drops the shared clients and gates (tests, or after changing settings at runtime)."""
+    with _lock:
+        _clients.clear()
+        _gates.clear()
@@ -1,47 +1,82 @@
 import json
 import time
-import boto3
-from typing import Optional
+from typing import Iterator, Optional
 from src.llm.base import LLMProvider
-from config.settings import AWS_REGION, BEDROCK_MODEL_ID
+from src.llm.bedrock_client import (
+    RETRYABLE_EXCEPTIONS, backoff_delay, get_bedrock_client, get_model_gate, retryable_error_code
+)
+from config.settings import AWS_REGION, BEDROCK_MODEL_ID, BEDROCK_ENDPOINT_URL, BEDROCK_MAX_ATTEMPTS
 from src.logger import setup_logger
+from src.rag.tokens import count_tokens
 
 logger = setup_logger(__name__)
 
+MAX_OUTPUT_TOKENS = 300
+
+
+def _usage_tokens(usage: Optional[dict]) -> Optional[int]:
+    if not usage:
+        return None
+    return usage.get("inputTokens", 0) + usage.get("outputTokens", 0)
+
 class BedrockProvider(LLMProvider):
     """Wrapper for AWS Bedrock models."""
     
-    def __init__(self, model_id: str = BEDROCK_MODEL_ID, region: str = AWS_REGION):
+    def __init__(self, model_id: str = BEDROCK_MODEL_ID, region: str = AWS_REGION,
+                 endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL, max_attempts: int = BEDROCK_MAX_ATTEMPTS):
         self.model_id = model_id
         self.region = region
+        self.max_attempts = max(1, max_attempts)
         try:
-            self.client = boto3.client("bedrock-runtime", region_name=self.region)
+            self.client = get_bedrock_client(self.region, endpoint_url)
+            self.gate = get_model_gate(self.model_id)
             logger.info(f"Initialized BedrockProvider with model: {self.model_id}")
         except Exception as e:
             logger.error(f"Failed to initialize Bedrock client: {e}")
             raise
 
-    def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
-        start_time = time.time()
-        
+    def _request_body(self, prompt: str, system_prompt: Optional[str] = None) -> str:
         message_list = [{"role": "user", "content": [{"text": prompt}]}]
         
         request_body = {
             "schemaVersion": "messages-v1",
             "messages": message_list,
-            "inferenceConfig": {"maxTokens": 300, "topP": 0.1, "topK": 20, "temperature": 0},
+            "inferenceConfig": {"maxTokens": MAX_OUTPUT_TOKENS, "topP": 0.1, "topK": 20, "temperature": 0},
         }
 
         if system_prompt:
              request_body["system"] = [{"text": system_prompt}]
-             
+        return json.dumps(request_body)
+
+    def _estimate_tokens(self, prompt: str, system_prompt: Optional[str]) -> int:
+        """Upper bound charged against the TPM limit before the call; settled from usage afterwards."""
+        return count_tokens(prompt) + count_tokens(system_prompt or "") + MAX_OUTPUT_TOKENS
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        """Backs off before the next attempt if the error is retryable and attempts remain."""
+        code = retryable_error_code(error)
+        if code is None or attempt + 1 >= self.max_attempts:
+            return False
+        logger.warning(f"Retryable Bedrock error ({code}), attempt {attempt + 1}/{self.max_attempts}")
+        time.sleep(backoff_delay(attempt))
+        return True
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        start_time = time.time()
         try:
             logger.info(f"Invoking Bedrock model {self.model_id}...")
-            response = self.client.invoke_model(
-                modelId=self.model_id, 
-                body=json.dumps(request_body)
-            )
-            result = json.loads(response["body"].read())
+            estimated = self._estimate_tokens(prompt, system_prompt)
+            body = self._request_body(prompt, system_prompt)
+            for attempt in range(self.max_attempts):
+                try:
+                    with self.gate.slot(estimated):
+                        response = self.client.invoke_model(modelId=self.model_id, body=body)
+                        result = json.loads(response["body"].read())
+                    break
+                except RETRYABLE_EXCEPTIONS as e:
+                    if not self._should_retry(e, attempt):
+                        raise
+            self.gate.settle(estimated, _usage_tokens(result.get("usage")))
             elapsed = time.time() - start_time
             logger.info(f"Received response from Bedrock in {elapsed:.2f}s")
             return result['output']['message']['content'][0]['text']
@@ -49,6 +84,43 @@ class BedrockProvider(LLMProvider):
             logger.error(f"Error invoking Bedrock model: {e}")
             raise 
 
+    def stream(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Streams text deltas via invoke_model_with_response_stream, logging time-to-first-token."""
+        start_time = time.time()
+        first_token_at = None
+        try:
+            logger.info(f"Streaming from Bedrock model {self.model_id}...")
+            estimated = self._estimate_tokens(prompt, system_prompt)
+            body = self._request_body(prompt, system_prompt)
+            usage = None
+            for attempt in range(self.max_attempts):
+                try:
+                    # The concurrency slot is held until the stream is fully consumed
+                    with self.gate.slot(estimated):
+                        response = self.client.invoke_model_with_response_stream(modelId=self.model_id, body=body)
+                        for event in response["body"]:
+                            chunk = event.get("chunk")
+                            if not chunk:
+                                continue
+                            payload = json.loads(chunk["bytes"])
+                            usage = payload.get("metadata", {}).get("usage", usage)
+                            text = payload.get("contentBlockDelta", {}).get("delta", {}).get("text")
+                            if text:
+                                if first_token_at is None:
+                                    first_token_at = time.time()
+                                    logger.info(f"Bedrock time-to-first-token: {first_token_at - start_time:.2f}s")
+                                yield text
+                    break
+                except RETRYABLE_EXCEPTIONS as e:
+                    # Only a stream that has not produced text yet can be restarted
+                    if first_token_at is not None or not self._should_retry(e, attempt):
+                        raise
+            self.gate.settle(estimated, _usage_tokens(usage))
+            logger.info(f"Bedrock stream completed in {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.error(f"Error streaming from Bedrock model: {e}")
+            raise
+
     def evaluate(self, prompt: str) -> str:
         """Simple invocation for evaluation tasks (no system prompt usually)."""
         # Could reuse generate, but sometimes eval needs less overhead/different params
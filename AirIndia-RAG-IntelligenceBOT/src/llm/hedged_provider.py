@@ -0,0 +1,333 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from src.llm.base import LLMProvider
+from src.rag.tracing import LatencyHistogram
+from config.settings import (
+    HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_INITIAL_DELAY_SECONDS, HEDGE_MIN_DELAY_SECONDS,
+    CIRCUIT_ERROR_RATE, CIRCUIT_WINDOW, CIRCUIT_MIN_CALLS, CIRCUIT_COOLDOWN_SECONDS
+)
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Opens when at least `error_rate` of the last `window` calls failed (given `min_calls`).
+    After `cooldown` seconds it is half-open and admits a single trial call, which closes the
+    circuit on success or reopens it on failure. A trial that has not reported back within
+    another cooldown (e.g. a cancelled stream) is presumed lost and a new one is admitted.
+    Only the trial settles an open circuit: calls admitted earlier finish without effect.
+    """
+
+    def __init__(self, name: str, error_rate: float = CIRCUIT_ERROR_RATE, window: int = CIRCUIT_WINDOW,
+                 min_calls: int = CIRCUIT_MIN_CALLS, cooldown: float = CIRCUIT_COOLDOWN_SECONDS):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def _admits(self, now: float) -> bool:
+        if self.opened_at is None:
+            return True
+        if now - self.opened_at < self.cooldown:
+            return False
+        return self.trial_started is None or now - self.trial_started >= self.cooldown
+
+    def available(self) -> bool:
+        """Whether allow() would admit a call now, without taking the half-open trial."""
+        with self._lock:
+            return self._admits(time.monotonic())
+
+    def allow(self) -> Optional[float]:
+        """
+        Admits a call: always when closed, never when open, one trial at a time when half-open.
+        Returns the admission time to pass back to record(), or None if the call is refused.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not self._admits(now):
+                return None
+            if self.opened_at is not None:
+                self.trial_started = now
+            return now
+
+    def record(self, success: bool, admitted_at: Optional[float] = None):
+        """Records the outcome of a call admitted at `admitted_at` (the value allow() returned)."""
+        with self._lock:
+            if self.opened_at is not None:
+                if admitted_at is None or admitted_at != self.trial_started:
+                    return  # admitted before the circuit opened, or a trial presumed lost
+                self.trial_started = None
+                if success:
+                    logger.info(f"Circuit for {self.name} closed after a successful trial call")
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = time.monotonic()
+                    self.trips += 1
+                    logger.warning(f"Circuit for {self.name} reopened after a failed trial call; "
+                                   f"retrying after {self.cooldown:.0f}s")
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures >= self.error_rate * len(self.outcomes):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                logger.warning(f"Circuit for {self.name} opened: {failures}/{len(self.outcomes)} recent calls "
+                               f"failed; retrying after {self.cooldown:.0f}s")
+
+
+class _Upstream:
+    """One wrapped provider with its circuit breaker and latency history (full answers and first tokens)."""
+
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker):
+        self.provider = provider
+        self.name = breaker.name
+        self.breaker = breaker
+        self.latency = {"generate": LatencyHistogram(window=200), "stream": LatencyHistogram(window=200)}
+        self._lock = threading.Lock()
+
+    def observe(self, kind: str, seconds: float):
+        with self._lock:
+            self.latency[kind].observe(seconds * 1000)
+
+    def hedge_delay(self, kind: str, percentile: float, min_samples: int, initial: float, floor: float) -> float:
+        with self._lock:
+            histogram = self.latency[kind]
+            if histogram.count < min_samples:
+                return initial
+            return max(floor, histogram.percentile(percentile) / 1000)
+
+
+def provider_name(provider: LLMProvider) -> str:
+    return getattr(provider, "model_id", None) or getattr(provider, "model_name", None) or type(provider).__name__
+
+
+class HedgedProvider(LLMProvider):
+    """
+    Sends each call to the primary provider. If it has not answered (or, when streaming,
+    produced its first token) within its own `hedge_percentile` latency, the same call goes to
+    the secondary and the first answer wins; an error fails over straight away. The losing
+    stream is stopped at its next token. A blocking generate call cannot be interrupted, so a
+    losing one finishes in the background and its answer is dropped. Providers whose circuit
+    breaker is open are skipped until their cooldown ends.
+    """
+
+    def __init__(self, primary: LLMProvider, secondary: LLMProvider, hedge_percentile: float = HEDGE_PERCENTILE,
+                 min_samples: int = HEDGE_MIN_SAMPLES, initial_delay: float = HEDGE_INITIAL_DELAY_SECONDS,
+                 min_delay: float = HEDGE_MIN_DELAY_SECONDS, max_workers: int = 32, **breaker_kwargs):
+        self.upstreams = [_Upstream(p, CircuitBreaker(f"{role}:{provider_name(p)}", **breaker_kwargs))
+                          for role, p in (("primary", primary), ("secondary", secondary))]
+        self.model_name = "|".join(provider_name(p) for p in (primary, secondary))
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "short_circuited": 0}
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        logger.info(f"Initialized HedgedProvider: primary {self.upstreams[0].name}, "
+                    f"secondary {self.upstreams[1].name}, hedging at p{hedge_percentile * 100:g}")
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def stats_line(self) -> str:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        circuits = ", ".join(f"{u.name} {u.breaker.state}" for u in self.upstreams)
+        return (f"{stats['calls']} calls, {stats['hedged']} hedged ({stats['hedge_wins']} won by the hedge), "
+                f"{stats['failovers']} failovers; {circuits}")
+
+    def _candidates(self) -> Tuple[List[_Upstream], Dict[int, Optional[float]]]:
+        """
+        Upstreams whose circuit admits a call, primary first; if none does, the primary anyway.
+        Only the first is admitted here (taking a half-open circuit's trial); a hedge or
+        failover target is admitted when it is launched. Also returns the admission times by
+        candidate index, for the breakers to tell their trial call from older ones.
+        """
+        self._count("calls")
+        allowed = [u for u in self.upstreams if u.breaker.available()]
+        admitted_at = None
+        while allowed:
+            admitted_at = allowed[0].breaker.allow()
+            if admitted_at is not None:
+                break
+            allowed.pop(0)  # a concurrent call took its half-open trial
+        if not allowed or allowed[0] is not self.upstreams[0]:
+            self._count("short_circuited")
+        return allowed or self.upstreams[:1], {0: admitted_at}
+
+    @staticmethod
+    def _admit(candidates: List[_Upstream], admissions: Dict[int, Optional[float]], index: int) -> bool:
+        admissions[index] = candidates[index].breaker.allow()
+        if admissions[index] is not None:
+            return True
+        logger.info(f"Not calling {candidates[index].name}: its half-open circuit already has a trial call")
+        return False
+
+    def _delay(self, upstream: _Upstream, kind: str) -> float:
+        return upstream.hedge_delay(kind, self.hedge_percentile, self.min_samples, self.initial_delay, self.min_delay)
+
+    def _timed_call(self, upstream: _Upstream, admitted_at: Optional[float], call: Callable[[LLMProvider], str]) -> str:
+        started = time.perf_counter()
+        try:
+            result = call(upstream.provider)
+        except Exception:
+            upstream.breaker.record(False, admitted_at)
+            raise
+        upstream.breaker.record(True, admitted_at)
+        upstream.observe("generate", time.perf_counter() - started)
+        return result
+
+    def _race(self, call: Callable[[LLMProvider], str]) -> str:
+        candidates, admissions = self._candidates()
+        futures: Dict = {}
+        errors = []
+        hedged = False
+
+        def launch(index: int):
+            future = self._pool.submit(self._timed_call, candidates[index], admissions[index], call)
+            futures[future] = index
+            return future
+
+        pending = {launch(0)}
+        timeout = self._delay(candidates[0], "generate")
+        while pending:
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            timeout = None
+            if not done:
+                if len(futures) < len(candidates) and self._admit(candidates, admissions, 1):
+                    logger.info(f"{candidates[0].name} slower than its hedge threshold; "
+                                f"hedging to {candidates[1].name}")
+                    self._count("hedged")
+                    hedged = True
+                    pending.add(launch(1))
+                continue
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    logger.warning(f"LLM call to {candidates[futures[future]].name} failed: {e}")
+                    continue
+                if hedged and futures[future] > 0:
+                    self._count("hedge_wins")
+                for other in pending:
+                    other.cancel()  # only succeeds if it never started
+                return result
+            if len(futures) < len(candidates) and self._admit(candidates, admissions, len(futures)):
+                self._count("failovers")
+                pending.add(launch(len(futures)))
+        raise errors[-1]
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        return self._race(lambda provider: provider.generate(prompt, system_prompt))
+
+    def evaluate(self, prompt: str) -> str:
+        return self._race(lambda provider: provider.evaluate(prompt))
+
+    def _pump(self, index: int, upstream: _Upstream, admitted_at: Optional[float], prompt: str,
+              system_prompt: Optional[str], events: queue.Queue, cancelled: threading.Event):
+        """Feeds one provider's stream into the shared queue until it ends, fails or is cancelled."""
+        started = time.perf_counter()
+        tokens = upstream.provider.stream(prompt, system_prompt)
+        try:
+            for token in tokens:
+                if cancelled.is_set():
+                    return
+                if started is not None:
+                    upstream.observe("stream", time.perf_counter() - started)
+                    started = None
+                events.put((index, "token", token))
+            upstream.breaker.record(True, admitted_at)
+            events.put((index, "done", None))
+        except Exception as e:
+            upstream.breaker.record(False, admitted_at)
+            events.put((index, "error", e))
+        finally:
+            tokens.close()
+
+    def stream(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Races time-to-first-token; once a provider has produced a token the others are cancelled."""
+        candidates, admissions = self._candidates()
+        events: queue.Queue = queue.Queue()
+        cancels: List[threading.Event] = []
+
+        def launch(index: int):
+            cancels.append(threading.Event())
+            self._pool.submit(self._pump, index, candidates[index], admissions[index], prompt, system_prompt,
+                              events, cancels[-1])
+
+        launch(0)
+        winner, failed, error, hedged = None, set(), None, False
+        timeout = self._delay(candidates[0], "stream")
+        try:
+            while True:
+                try:
+                    index, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    timeout = None
+                    if len(cancels) < len(candidates) and self._admit(candidates, admissions, 1):
+                        logger.info(f"{candidates[0].name} first token slower than its hedge threshold; "
+                                    f"hedging to {candidates[1].name}")
+                        self._count("hedged")
+                        hedged = True
+                        launch(1)
+                    continue
+                if winner is None and kind == "token":
+                    winner = index
+                    if hedged and index > 0:
+                        self._count("hedge_wins")
+                    for other, cancel in enumerate(cancels):
+                        if other != winner:
+                            cancel.set()
+                if winner is not None and index != winner:
+                    continue
+                if kind == "token":
+                    yield payload
+                elif kind == "done":
+                    return
+                elif winner is not None:
+                    raise payload  # the chosen stream broke off after its first tokens
+                else:
+                    error = payload
+                    failed.add(index)
+                    logger.warning(f"LLM stream from {candidates[index].name} failed: {payload}")
+                    if len(cancels) < len(candidates) and self._admit(candidates, admissions, len(cancels)):
+                        self._count("failovers")
+                        timeout = None
+                        launch(len(cancels))
+                    elif len(failed) == len(cancels):
+                        raise error
+        finally:
+            for cancel in cancels:
+                cancel.set()
+
+    def warm_up(self, system_prompt: Optional[str] = None) -> float:
+        """Warms both providers in parallel; a cold secondary would make a poor hedge."""
+        started = time.perf_counter()
+        futures = [self._pool.submit(u.provider.warm_up, system_prompt) for u in self.upstreams]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"LLM warm-up failed: {e}")
+        return time.perf_counter() - started
@@ -1,44 +1,118 @@
+import threading
 import time
-from typing import Optional
+from typing import Iterator, Optional, Union
 from langchain_ollama import OllamaLLM
 from src.llm.base import LLMProvider
-from config.settings import LOCAL_LLM_MODEL
+from src.rag.tokens import count_tokens
+from config.settings import (
+    LOCAL_LLM_MODEL, OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE, OLLAMA_NUM_CTX_MIN, OLLAMA_NUM_CTX_MAX, OLLAMA_NUM_PREDICT
+)
 from src.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# cl100k counts run below most local models' tokenizers; the margin also covers the chat template
+TOKEN_MARGIN = 1.15
+TEMPLATE_TOKENS = 64
+
+
+def keep_alive_value(value: Union[str, int]) -> Union[str, int]:
+    """Ollama reads a number as seconds (negative = never unload) and anything else as a duration string."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def context_window(prompt_tokens: int, num_predict: int = OLLAMA_NUM_PREDICT,
+                   minimum: int = OLLAMA_NUM_CTX_MIN, maximum: int = OLLAMA_NUM_CTX_MAX) -> int:
+    """Smallest power of two (at least `minimum`, at most `maximum`) that fits the prompt plus the answer."""
+    needed = int(prompt_tokens * TOKEN_MARGIN) + TEMPLATE_TOKENS + num_predict
+    size = max(minimum, 1)
+    while size < needed and size < maximum:
+        size *= 2
+    return min(size, maximum)
+
+
 class OllamaProvider(LLMProvider):
-    """Wrapper for Local Ollama models."""
-    
-    def __init__(self, model_name: str = LOCAL_LLM_MODEL):
+    """
+    Wrapper for Local Ollama models. The model is requested with a keep-alive so it stays
+    resident between questions, and the system prompt travels in Ollama's own `system` field,
+    so every request starts with the same tokens and the server reuses their KV cache.
+    """
+
+    def __init__(self, model_name: str = LOCAL_LLM_MODEL, base_url: Optional[str] = OLLAMA_BASE_URL,
+                 keep_alive: Union[str, int] = OLLAMA_KEEP_ALIVE, num_predict: int = OLLAMA_NUM_PREDICT):
         self.model_name = model_name
+        self.keep_alive = keep_alive_value(keep_alive)
+        self.num_predict = num_predict
+        # Ollama reloads the model whenever num_ctx changes, so the window only ever grows
+        self.num_ctx = OLLAMA_NUM_CTX_MIN
+        self._ctx_lock = threading.Lock()
         try:
-            self.llm = OllamaLLM(model=self.model_name)
-            logger.info(f"Initialized OllamaProvider with model: {self.model_name}")
+            self.llm = OllamaLLM(model=self.model_name, base_url=base_url, keep_alive=self.keep_alive)
+            logger.info(f"Initialized OllamaProvider with model: {self.model_name} (keep_alive={self.keep_alive})")
         except Exception as e:
             logger.error(f"Failed to initialize OllamaLLM: {e}")
             raise
 
+    def _options(self, prompt: str, system_prompt: Optional[str]) -> dict:
+        needed = context_window(count_tokens(prompt) + count_tokens(system_prompt or ""), self.num_predict)
+        with self._ctx_lock:
+            if needed > self.num_ctx:
+                logger.info(f"Growing Ollama context window from {self.num_ctx} to {needed} tokens")
+                self.num_ctx = needed
+            num_ctx = self.num_ctx
+        return {"options": {"num_ctx": num_ctx, "num_predict": self.num_predict},
+                "keep_alive": self.keep_alive, "system": system_prompt or None}
+
+    def warm_up(self, system_prompt: Optional[str] = None) -> float:
+        """
+        Loads the model with the configured keep-alive and context window. With a system prompt,
+        the prompt is evaluated once too, so the first question already finds it in the KV cache.
+        """
+        started = time.time()
+        try:
+            options = self._options("", system_prompt)
+            options["options"]["num_predict"] = 1
+            self.llm.invoke("", **options)
+            logger.info(f"Ollama model {self.model_name} loaded and warmed in {time.time() - started:.2f}s")
+        except Exception as e:
+            logger.warning(f"Ollama warm-up failed: {e}")
+        return time.time() - started
+
     def generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
         """Generates response using Ollama."""
         start_time = time.time()
         try:
-            # Note: Ollama via Langchain applies system prompt differently depending on model template
-            # For simplicity, we just pass the prompt. 
-            # If system_prompt is crucial, we might prepend it.
-            full_prompt = prompt
-            if system_prompt:
-               full_prompt = f"System: {system_prompt}\n\nUser: {prompt}"
-               
             logger.info(f"Invoking Local Ollama model {self.model_name}...")
-            response = self.llm.invoke(full_prompt)
+            generation = self.llm.generate([prompt], **self._options(prompt, system_prompt)).generations[0][0]
+            info = generation.generation_info or {}
             elapsed = time.time() - start_time
-            logger.info(f"Received response from Ollama in {elapsed:.2f}s")
-            return response
+            logger.info(f"Received response from Ollama in {elapsed:.2f}s "
+                        f"(load {info.get('load_duration', 0) / 1e9:.2f}s, "
+                        f"{info.get('prompt_eval_count', 0)} prompt tokens evaluated)")
+            return generation.text
         except Exception as e:
             logger.error(f"Error generating response from Ollama: {e}")
             raise # Let the caller handle the fallback or user message
 
+    def stream(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """Streams tokens from Ollama, logging time-to-first-token."""
+        start_time = time.time()
+        first_token_at = None
+        try:
+            logger.info(f"Streaming from Local Ollama model {self.model_name}...")
+            for token in self.llm.stream(prompt, **self._options(prompt, system_prompt)):
+                if first_token_at is None:
+                    first_token_at = time.time()
+                    logger.info(f"Ollama time-to-first-token: {first_token_at - start_time:.2f}s")
+                yield token
+            logger.info(f"Ollama stream completed in {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.error(f"Error streaming response from Ollama: {e}")
+            raise
+
     def evaluate(self, prompt: str) -> str:
         """Evaluates response using Ollama (same as generate for now)."""
         return self.generate(prompt)
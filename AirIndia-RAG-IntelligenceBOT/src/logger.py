@@ -38,3 +38,20 @@ def setup_logger(name):
     logger.addHandler(file_handler)
 
     return logger
+
+
+def tail_file(path, lines=20, block_size=8192):
+    """
+    Returns the last `lines` lines of a file by reading fixed-size blocks backwards from the end,
+    so the cost does not grow with the size of the log.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= lines:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return b"\n".join(data.splitlines()[-lines:]).decode("utf-8", errors="replace")
@@ -0,0 +1,119 @@
+import gzip
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Keeps compound tokens such as flight codes (AI-101), clause numbers (12.3) and routes (DEL/BOM)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which", "who",
+    "will", "with", "about", "me", "tell", "all", "any", "i", "you",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens; compound tokens are also indexed by their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[.\-/]", token) if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Inverted BM25 index over chunk IDs, persisted as gzipped JSON next to the vector store."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.doc_lens: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.families: List[str] = []  # document family per chunk, aligned with ids
+        self.avg_len = 0.0
+        self._family_docs: Dict[FrozenSet[str], Set[int]] = {}
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]], **kwargs) -> "BM25Index":
+        """Builds the index from (chunk_id, text) pairs without keeping the texts around."""
+        index = cls(**kwargs)
+        for doc_index, (chunk_id, text) in enumerate(docs):
+            counts = Counter(tokenize(text))
+            index.ids.append(chunk_id)
+            index.doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                index.postings.setdefault(term, []).append((doc_index, tf))
+        index.avg_len = sum(index.doc_lens) / len(index.doc_lens) if index.doc_lens else 0.0
+        return index
+
+    def _docs_in(self, families: Sequence[str]) -> Set[int]:
+        key = frozenset(families)
+        if key not in self._family_docs:
+            self._family_docs[key] = {i for i, family in enumerate(self.families) if family in key}
+        return self._family_docs[key]
+
+    def search(self, query: str, k: int = 10, families: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """Returns the top-k (chunk_id, score) pairs for the query, optionally only among the given families."""
+        n_docs = len(self.ids)
+        if not n_docs:
+            return []
+        allowed = self._docs_in(families) if families and self.families else None
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_index, tf in postings:
+                if allowed is not None and doc_index not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[doc_index] / self.avg_len)
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.ids[doc_index], score) for doc_index, score in best]
+
+    def save(self, path: str):
+        index_dir = os.path.dirname(path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        payload = {"k1": self.k1, "b": self.b, "ids": self.ids, "doc_lens": self.doc_lens,
+                   "postings": self.postings, "families": self.families}
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        started = time.time()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.ids = payload["ids"]
+        index.doc_lens = payload["doc_lens"]
+        index.postings = {term: [tuple(p) for p in postings] for term, postings in payload["postings"].items()}
+        index.families = payload.get("families", [])
+        index.avg_len = sum(index.doc_lens) / len(index.doc_lens) if index.doc_lens else 0.0
+        logger.info(f"Loaded BM25 index ({len(index.ids)} chunks, {len(index.postings)} terms) "
+                    f"in {(time.time() - started) * 1000:.1f}ms")
+        return index
+
+
+def reciprocal_rank_fusion_scores(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merges several ranked ID lists: score(d) = sum over lists of 1 / (k + rank). Best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
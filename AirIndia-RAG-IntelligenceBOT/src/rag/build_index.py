@@ -0,0 +1,82 @@
+import argparse
+import json
+from config.settings import VECTOR_DB_DIR, COLLECTION_NAME, FAISS_INDEX_TYPE
+from src.logger import setup_logger
+from src.rag.compare_backends import exact_neighbours, golden_queries, load_corpus, measure
+from src.rag.embeddings import get_embedding_function
+from src.rag.faiss_store import INDEX_TYPES, FaissBackend, default_params
+from src.rag.numpy_store import dequantize
+from src.rag.vector_backends import ChromaBackend
+
+logger = setup_logger(__name__)
+
+
+def build_index(index_type: str = FAISS_INDEX_TYPE, params: dict = None, k: int = 5, synthetic: int = 0) -> dict:
+    """
+    Builds the FAISS index for the collection and reports build time, index size and recall@k /
+    latency against exact search over the same stored vectors on the golden query set.
+    """
+    embeddings = None if synthetic else get_embedding_function()
+    backend = FaissBackend(embeddings, VECTOR_DB_DIR, COLLECTION_NAME, index_type=index_type, params=params)
+    if not backend.count():
+        # First build: take the vectors already embedded into the Chroma collection
+        ids, texts, metadatas, matrix = load_corpus(ChromaBackend(embeddings, VECTOR_DB_DIR, COLLECTION_NAME))
+        if not ids:
+            raise SystemExit("No stored chunks found; run `make ingest` first.")
+        backend.upsert(ids, texts, metadatas, matrix)
+        logger.info(f"Imported {len(ids)} chunks from the Chroma collection.")
+
+    report = backend.build_index()
+    report["params"] = backend.params
+
+    matrix = dequantize(backend.vectors, backend.scales)
+    queries = golden_queries(embeddings, matrix, synthetic)
+    truth = exact_neighbours(backend.ids, matrix, queries, k)
+
+    def ann(query, n):
+        return [doc_id for doc_id, _ in backend.search_by_vector(query, n)]
+
+    def exact(query, n):
+        return [doc_id for doc_id, _ in backend.exact_search_by_vectors([query], n)[0]]
+
+    report["ann"] = measure(ann, queries, truth, k)
+    report["exact"] = measure(exact, queries, truth, k)
+    report["queries"] = len(queries)
+    logger.info(
+        f"FAISS {index_type}: build {report['build_seconds']:.2f}s, {report['index_bytes'] / 1024:.1f} KB, "
+        f"recall@{k}={report['ann'][f'recall@{k}']}, p50 {report['ann']['p50_ms']}ms "
+        f"(exact p50 {report['exact']['p50_ms']}ms) over {len(queries)} golden queries"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    defaults = default_params()
+    parser = argparse.ArgumentParser(
+        description="Build the FAISS ANN index and report its recall against exact search."
+    )
+    parser.add_argument("--type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE, help="Index type.")
+    parser.add_argument("--hnsw-m", type=int, default=defaults["hnsw_m"], help="HNSW neighbours per node.")
+    parser.add_argument("--ef-construction", type=int, default=defaults["ef_construction"],
+                        help="HNSW build beam width.")
+    parser.add_argument("--ef-search", type=int, default=defaults["ef_search"], help="HNSW search beam width.")
+    parser.add_argument("--nlist", type=int, default=defaults["nlist"], help="IVF lists (0 = about 4 * sqrt(chunks)).")
+    parser.add_argument("--nprobe", type=int, default=defaults["nprobe"], help="IVF lists probed per query.")
+    parser.add_argument("--pq-m", type=int, default=defaults["pq_m"],
+                        help="PQ sub-quantizers (must divide the dimension).")
+    parser.add_argument("--pq-nbits", type=int, default=defaults["pq_nbits"], help="Bits per PQ code.")
+    parser.add_argument("--k", type=int, default=5, help="Neighbours per query for recall@k.")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use this many noisy stored vectors as queries instead of embedding the sample questions.")
+    parser.add_argument("--output", type=str, help="Optional path for the JSON report.")
+    args = parser.parse_args()
+
+    params = {
+        "hnsw_m": args.hnsw_m, "ef_construction": args.ef_construction, "ef_search": args.ef_search,
+        "nlist": args.nlist, "nprobe": args.nprobe, "pq_m": args.pq_m, "pq_nbits": args.pq_nbits,
+    }
+    result = build_index(args.type, params, k=args.k, synthetic=args.synthetic)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Report written to {args.output}")
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config.prompts import GROUND_TRUTH
+from config.settings import VECTOR_DB_DIR, COLLECTION_NAME, VECTOR_BACKEND, CHUNK_SIZE, CHUNK_OVERLAP
+from src.logger import setup_logger
+from src.rag.bm25 import tokenize
+from src.rag.context import ContextPacker
+from src.rag.manifest import scan_pdfs
+from src.rag.pdf_cache import PdfTextCache
+from src.rag.pipeline import IngestionPipeline
+from src.rag.vector_backends import create_backend
+from src.rag.vector_store import VectorStoreManager
+
+logger = setup_logger(__name__)
+
+DEFAULT_GRID = "1000:200,800:150,600:100,400:50"
+DEFAULT_SWEEP_DIR = f"{VECTOR_DB_DIR.rstrip('/')}_sweep"
+# A question counts as a retrieval hit when its packed context holds this share of the reference answer's terms
+HIT_COVERAGE = 0.5
+
+
+def parse_grid(spec: str) -> List[Tuple[int, int]]:
+    """Parses "size:overlap,size:overlap" into (chunk_size, chunk_overlap) pairs."""
+    grid = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        size, _, overlap = item.partition(":")
+        grid.append((int(size), int(overlap or 0)))
+    return grid
+
+
+def answer_coverage(context: str, answer: str) -> float:
+    """Share of the reference answer's distinct content terms that appear in the context."""
+    expected = set(tokenize(answer))
+    if not expected:
+        return 0.0
+    return len(expected & set(tokenize(context))) / len(expected)
+
+
+def directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def build_collection(paths: List[str], directory: str, chunk_size: int, chunk_overlap: int, embeddings,
+                     backend: str, pdf_cache: Optional[PdfTextCache]) -> Tuple[VectorStoreManager, dict]:
+    """Ingests the PDFs into a fresh collection chunked with the given parameters."""
+    shutil.rmtree(directory, ignore_errors=True)
+    manager = VectorStoreManager(
+        embeddings, backend=create_backend(backend, embeddings, directory, COLLECTION_NAME), persist_directory=directory
+    )
+    hits_before = getattr(embeddings, "hits", 0)
+    pipeline = IngestionPipeline(manager, pdf_cache=pdf_cache, use_pdf_cache=pdf_cache is not None,
+                                 chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    summary = pipeline.run(paths)
+    started = time.perf_counter()
+    manager.rebuild_keyword_index()
+    manager.backend.build_index()
+    report = {
+        "chunks": manager.count(),
+        "failed_files": len(summary["failed"]),
+        "ingest_seconds": round(pipeline.wall_time + time.perf_counter() - started, 3),
+        "pages_from_cache": pipeline.cached_pages,
+        "embedding_cache_hits": getattr(embeddings, "hits", 0) - hits_before,
+        "index_bytes": directory_bytes(directory),
+    }
+    return manager, report
+
+
+def evaluate_collection(manager: VectorStoreManager, ground_truth: Dict[str, str], k: int,
+                        packer: ContextPacker) -> dict:
+    """Retrieval latency, hit rate and reference-answer coverage of the packed context, and its size in tokens."""
+    questions = list(ground_truth)
+    manager.similarity_search(questions[0], k=k)  # first call loads the indexes
+    latencies, coverages, context_tokens, retrieved_tokens = [], [], [], []
+    for question in questions:
+        started = time.perf_counter()
+        docs = manager.similarity_search(question, k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        packed = packer.pack(docs)
+        coverages.append(answer_coverage(packed.text, ground_truth[question]))
+        context_tokens.append(packed.tokens_after)
+        retrieved_tokens.append(packed.tokens_before)
+    return {
+        "hit_rate": round(float(np.mean([c >= HIT_COVERAGE for c in coverages])), 3),
+        "answer_coverage": round(float(np.mean(coverages)), 3),
+        "context_tokens": round(float(np.mean(context_tokens)), 1),
+        "retrieved_tokens": round(float(np.mean(retrieved_tokens)), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def recommend(results: Dict[str, dict], tolerance: float) -> str:
+    """The config with the fewest context tokens among those within `tolerance` of the best hit rate and coverage."""
+    best_hits = max(r["hit_rate"] for r in results.values())
+    best_coverage = max(r["answer_coverage"] for r in results.values())
+    eligible = [name for name, r in results.items()
+                if r["hit_rate"] >= best_hits - tolerance and r["answer_coverage"] >= best_coverage - tolerance]
+    return min(eligible, key=lambda name: (results[name]["context_tokens"], -results[name]["answer_coverage"]))
+
+
+def sweep(
+    docs_dir: str,
+    grid: Sequence[Tuple[int, int]],
+    output_dir: str = DEFAULT_SWEEP_DIR,
+    backend: str = VECTOR_BACKEND,
+    k: int = 3,
+    tolerance: float = 0.05,
+    embeddings=None,
+    pdf_cache: Optional[PdfTextCache] = None,
+    ground_truth: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Builds one collection per (chunk_size, chunk_overlap) under output_dir and scores each on the
+    ground-truth questions. Pages come from the PDF text cache and unchanged chunk texts from the
+    embedding cache, so only the first config parses PDFs and repeated chunks are never re-embedded.
+    """
+    if embeddings is None:
+        from src.rag.embeddings import get_embedding_function
+        embeddings = get_embedding_function()
+    if pdf_cache is None:
+        pdf_cache = PdfTextCache()
+    paths = scan_pdfs(docs_dir)
+    packer = ContextPacker()
+    results = {}
+    for chunk_size, chunk_overlap in dict.fromkeys(grid):
+        name = f"c{chunk_size}_o{chunk_overlap}"
+        manager, report = build_collection(paths, os.path.join(output_dir, name), chunk_size, chunk_overlap,
+                                           embeddings, backend, pdf_cache)
+        report.update(evaluate_collection(manager, ground_truth or GROUND_TRUTH, k, packer))
+        results[name] = dict(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **report)
+        logger.info(f"{name}: " + ", ".join(f"{key}={value}" for key, value in report.items()))
+    choice = recommend(results, tolerance)
+    best = results[choice]
+    logger.info(f"Recommended: CHUNK_SIZE={best['chunk_size']} CHUNK_OVERLAP={best['chunk_overlap']} "
+                f"({best['context_tokens']} context tokens, hit rate {best['hit_rate']})")
+    return {"configs": results, "recommended": choice, "k": k, "backend": backend,
+            "questions": len(ground_truth or GROUND_TRUTH)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chunking parameters on side-by-side collections.")
+    parser.add_argument("--docs-dir", type=str, default="AirIndia", help="Directory of PDFs to ingest.")
+    parser.add_argument("--grid", type=str, default=f"{CHUNK_SIZE}:{CHUNK_OVERLAP},{DEFAULT_GRID}",
+                        help="Comma-separated chunk_size:chunk_overlap pairs.")
+    parser.add_argument("--output-dir", type=str, default=DEFAULT_SWEEP_DIR,
+                        help="Where the sweep collections are built.")
+    parser.add_argument("--backend", type=str, default=VECTOR_BACKEND, help="Vector backend (chroma, numpy, faiss).")
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per question.")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Hit rate / coverage below the best still considered equal quality.")
+    parser.add_argument("--output", type=str, help="Optional path for the JSON results.")
+    args = parser.parse_args()
+
+    report = sweep(args.docs_dir, parse_grid(args.grid), args.output_dir, args.backend, args.k, args.tolerance)
+    print(f"{'config':<14} {'chunks':>7} {'index KB':>9} {'ingest s':>9} {'p50 ms':>8} {'hit rate':>9} "
+          f"{'coverage':>9} {'ctx tokens':>11}")
+    for name, r in report["configs"].items():
+        marker = "  <- recommended" if name == report["recommended"] else ""
+        print(f"{name:<14} {r['chunks']:>7} {r['index_bytes'] / 1024:>9.0f} {r['ingest_seconds']:>9.2f} "
+              f"{r['p50_ms']:>8.2f} {r['hit_rate']:>9.2f} {r['answer_coverage']:>9.2f} "
+              f"{r['context_tokens']:>11.0f}{marker}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Results written to {args.output}")
@@ -0,0 +1,116 @@
+import argparse
+import json
+import tempfile
+import time
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+from config.prompts import TEST_QUESTIONS, UI_SAMPLE_QUESTIONS
+from config.settings import VECTOR_DB_DIR, COLLECTION_NAME
+from src.logger import setup_logger
+from src.rag.embeddings import get_embedding_function
+from src.rag.numpy_store import NumpyBackend, exact_top_k
+from src.rag.vector_backends import ChromaBackend
+
+logger = setup_logger(__name__)
+
+
+def load_corpus(backend: ChromaBackend):
+    """Reads every stored chunk (ids, texts, metadatas, float32 embeddings) out of a Chroma collection."""
+    ids, texts, metadatas, vectors = [], [], [], []
+    for page_ids, page_texts, page_metadatas, page_vectors in backend.iter_records():
+        ids.extend(page_ids)
+        texts.extend(page_texts)
+        metadatas.extend(page_metadatas)
+        vectors.extend(page_vectors)
+    return ids, texts, metadatas, np.asarray(vectors, dtype=np.float32)
+
+
+def golden_queries(embedding_function, matrix: np.ndarray, synthetic: int = 0, seed: int = 0) -> np.ndarray:
+    """
+    The golden query set: the UI and test questions embedded with the configured model, or, with
+    `synthetic`, that many stored vectors plus noise (no embedding model needed).
+    """
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        picks = matrix[rng.choice(len(matrix), size=min(synthetic, len(matrix)), replace=False)]
+        noise = rng.normal(scale=0.05, size=picks.shape).astype(np.float32)
+        return picks / np.linalg.norm(picks, axis=1, keepdims=True) + noise
+    questions = list(dict.fromkeys(UI_SAMPLE_QUESTIONS + TEST_QUESTIONS))
+    return np.asarray(embedding_function.embed_documents(questions), dtype=np.float32)
+
+
+def exact_neighbours(ids: Sequence[str], matrix: np.ndarray, queries: np.ndarray, k: int) -> List[List[str]]:
+    """Ground truth: exact float32 cosine top-k for each query."""
+    normalized = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    truth = []
+    for query in queries:
+        scores = normalized @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        truth.append([ids[i] for i in exact_top_k(scores, k)])
+    return truth
+
+
+def measure(search: Callable[[np.ndarray, int], List[str]], queries: np.ndarray,
+            truth: List[List[str]], k: int) -> Dict[str, float]:
+    """Recall@k against the exact neighbours plus the search latency distribution."""
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(found) & set(expected)) / max(1, len(expected)))
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def compare_backends(k: int = 5, synthetic: int = 0) -> Dict[str, Dict[str, float]]:
+    """Benchmarks the Chroma collection against NumPy float16 and int8 stores built from the same vectors."""
+    embeddings = None if synthetic else get_embedding_function()
+    chroma = ChromaBackend(embeddings, VECTOR_DB_DIR, COLLECTION_NAME)
+    ids, texts, metadatas, matrix = load_corpus(chroma)
+    if not ids:
+        raise SystemExit("The Chroma collection is empty; run `make ingest` first.")
+    queries = golden_queries(embeddings, matrix, synthetic)
+    truth = exact_neighbours(ids, matrix, queries, k)
+    logger.info(f"Benchmarking {len(queries)} queries over {len(ids)} chunks (dim {matrix.shape[1]}), k={k}")
+
+    def search_ids(backend):
+        return lambda query, n: [doc_id for doc_id, _ in backend.search_by_vector(query, n)]
+
+    results = {}
+    started = time.perf_counter()
+    search_ids(chroma)(queries[0], k)  # Chroma loads its HNSW index on the first query
+    results["chroma"] = {"load_ms": round((time.perf_counter() - started) * 1000, 1),
+                         "vector_bytes": int(matrix.shape[0] * matrix.shape[1] * 4)}
+    results["chroma"].update(measure(search_ids(chroma), queries, truth, k))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in ("float16", "int8"):
+            NumpyBackend(embeddings, tmp, dtype, dtype=dtype).upsert(ids, texts, metadatas, matrix)
+            started = time.perf_counter()
+            backend = NumpyBackend(embeddings, tmp, dtype, dtype=dtype)
+            load_ms = (time.perf_counter() - started) * 1000
+            vector_bytes = backend.vectors.nbytes + (0 if backend.scales is None else backend.scales.nbytes)
+            results[f"numpy-{dtype}"] = {"load_ms": round(load_ms, 1), "vector_bytes": int(vector_bytes)}
+            results[f"numpy-{dtype}"].update(measure(search_ids(backend), queries, truth, k))
+
+    for name, stats in results.items():
+        logger.info(f"{name:>14}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recall and latency of the Chroma and NumPy vector backends.")
+    parser.add_argument("--k", type=int, default=5, help="Neighbours per query.")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use this many noisy stored vectors as queries instead of embedding the sample questions.")
+    parser.add_argument("--output", type=str, help="Optional path for the JSON results.")
+    args = parser.parse_args()
+
+    report = compare_backends(k=args.k, synthetic=args.synthetic)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Results written to {args.output}")
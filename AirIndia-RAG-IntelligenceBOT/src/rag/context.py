@@ -0,0 +1,149 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+from langchain_core.documents import Document
+from config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_MMR_LAMBDA
+from src.logger import setup_logger
+from src.rag.embedding_cache import normalize_text
+from src.rag.tokens import count_tokens, truncate_tokens
+
+logger = setup_logger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+# Chunks are stripped by the splitter, so neighbours on a page can be a few whitespace chars apart
+MAX_MERGE_GAP = 2
+
+
+@dataclass
+class PackedContext:
+    text: str
+    docs: List[Document] = field(default_factory=list)
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+@dataclass
+class _Span:
+    """A (possibly merged) run of text from one source page."""
+    doc: Document
+    rank: int
+    start: Optional[int]
+    text: str
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into a compact prompt context: overlapping or adjacent chunks of
+    the same source page are merged, exact duplicates dropped, the remainder ordered by MMR
+    (relevance vs. lexical redundancy) and packed into a token budget in that order. The first
+    passage is cut to the budget if it alone is larger.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, mmr_lambda: float = CONTEXT_MMR_LAMBDA):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.tokens_saved_total = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _merge(self, docs: List[Document]) -> List[_Span]:
+        groups = {}
+        for rank, doc in enumerate(docs):
+            key = (doc.metadata.get("source"), doc.metadata.get("page"))
+            start = doc.metadata.get("start_index")
+            groups.setdefault(key, []).append(_Span(doc, rank, start, doc.page_content))
+
+        merged: List[_Span] = []
+        for spans in groups.values():
+            positioned = sorted((s for s in spans if s.start is not None), key=lambda s: s.start)
+            merged.extend(s for s in spans if s.start is None)
+            current = None
+            for span in positioned:
+                if current is not None and span.start <= current.end + MAX_MERGE_GAP:
+                    if span.end > current.end:
+                        overlap = current.end - span.start
+                        # Splitter overlap: append only the part of the next chunk not already present
+                        current.text += span.text[overlap:] if overlap >= 0 else " " + span.text
+                    current.rank = min(current.rank, span.rank)
+                    continue
+                if current is not None:
+                    merged.append(current)
+                current = _Span(span.doc, span.rank, span.start, span.text)
+            if current is not None:
+                merged.append(current)
+
+        # Drop exact duplicates (e.g. the same page ingested under two file names)
+        seen, unique = set(), []
+        for span in sorted(merged, key=lambda s: s.rank):
+            key = normalize_text(span.text).lower()
+            if key not in seen:
+                seen.add(key)
+                unique.append(span)
+        return unique
+
+    def _mmr_order(self, spans: List[_Span]) -> List[_Span]:
+        if len(spans) <= 2:
+            return spans
+        words = [_words(span.text) for span in spans]
+        n = len(spans)
+        relevance = [1.0 - i / n for i in range(n)]  # spans arrive in relevance order
+        selected: List[int] = []
+        remaining = list(range(n))
+        while remaining:
+            def score(i):
+                redundancy = max((_jaccard(words[i], words[j]) for j in selected), default=0.0)
+                return self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+            best = max(remaining, key=score)
+            selected.append(best)
+            remaining.remove(best)
+        return [spans[i] for i in selected]
+
+    def pack(self, docs: List[Document]) -> PackedContext:
+        """Builds the context for docs given in relevance order."""
+        if not docs:
+            return PackedContext(text="")
+        tokens_before = count_tokens("\n\n".join(doc.page_content for doc in docs))
+
+        parts, used_docs, used = [], [], 0
+        for span in self._mmr_order(self._merge(docs)):
+            text, tokens = span.text, count_tokens(span.text)
+            if used + tokens > self.token_budget:
+                if parts:
+                    continue  # skip what does not fit; a smaller, less relevant span still might
+                # The most relevant span is always kept, cut to the budget if it alone exceeds it
+                text = truncate_tokens(text, self.token_budget)
+                tokens = count_tokens(text)
+            parts.append(text)
+            used_docs.append(span.doc)
+            used += tokens
+
+        packed = PackedContext("\n\n".join(parts), used_docs, tokens_before)
+        packed.tokens_after = count_tokens(packed.text)
+        with self._lock:
+            self.requests += 1
+            self.tokens_saved_total += packed.tokens_saved
+        logger.info(
+            f"Context packed: {len(docs)} chunks -> {len(parts)} passages, "
+            f"{packed.tokens_before} -> {packed.tokens_after} tokens ({packed.tokens_saved} saved, "
+            f"{self.tokens_saved_total} over {self.requests} requests)"
+        )
+        return packed
@@ -0,0 +1,199 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import List, Optional
+from langchain.embeddings.base import Embeddings
+from config.settings import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text so that trivially different copies of a chunk share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def model_identifier(embeddings: Embeddings) -> str:
+    """Best-effort stable identifier for the model behind an Embeddings implementation."""
+    for attr in ("model_id", "model_name", "model"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Transparent, persistent embedding cache around any LangChain Embeddings.
+    Vectors are stored in SQLite keyed by (model id, normalized text hash) and evicted
+    least-recently-used first once the cache grows past its size cap.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_bytes: int = EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        model_id: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_id = model_id or model_identifier(embeddings)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        logger.info(
+            f"Embedding cache for '{self.model_id}' at {path} "
+            f"({self._total_bytes / (1024 * 1024):.1f} MB used, cap {max_bytes / (1024 * 1024):.0f} MB)"
+        )
+
+    def _key(self, text: str) -> str:
+        normalized = normalize_text(text)
+        return hashlib.sha256(f"{self.model_id}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> dict:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, items: dict):
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = array("f", vector).tobytes()
+            rows.append((key, self.model_id, blob, len(blob), now))
+        with self._lock:
+            # Rows being replaced (e.g. a text embedded concurrently by two callers) give their bytes back
+            replaced = 0
+            keys = list(items)
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._total_bytes += sum(row[3] for row in rows) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drops least-recently-used entries until the cache is back under 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC")
+        victims = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            victims.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        logger.info(f"Evicted {len(victims)} embeddings from cache")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Returns cached vectors where available and embeds only the misses, preserving order."""
+        if not texts:
+            return []
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        fresh = {}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = {key: vector for key, vector in zip(missing.keys(), vectors) if vector}
+            self._store(fresh)
+
+        hits = sum(1 for key in keys if key in cached)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        logger.info(
+            f"Embedding cache: {hits}/{len(keys)} hits this call, "
+            f"{len(missing)} embedded, overall hit ratio {self.hit_ratio:.1%}"
+        )
+
+        results = []
+        for key in keys:
+            results.append(cached.get(key) or fresh.get(key) or [])
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        if vector:
+            self._store({key: vector})
+        return vector
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and on-disk footprint of the cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "model_id": self.model_id,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
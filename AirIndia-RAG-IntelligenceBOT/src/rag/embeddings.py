@@ -1,80 +1,201 @@
 import json
-import boto3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import tiktoken
 from langchain.embeddings.base import Embeddings
-from config.settings import AWS_REGION, BEDROCK_EMBEDDING_MODEL_ID, MODEL_TYPE, LOCAL_EMBEDDING_MODEL
+from config.settings import (
+    AWS_REGION, BEDROCK_EMBEDDING_MODEL_ID, BEDROCK_ENDPOINT_URL, MODEL_TYPE, LOCAL_EMBEDDING_MODEL,
+    EMBEDDING_MAX_WORKERS, EMBEDDING_MAX_RETRIES, EMBEDDING_CACHE_ENABLED
+)
+from src.llm.bedrock_client import (
+    RETRYABLE_ERROR_CODES, RETRYABLE_EXCEPTIONS, backoff_delay, get_bedrock_client, get_model_gate, retryable_error_code
+)
 from src.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter: halves the number of in-flight calls when the service
+    throttles and grows it back by one after a window of successful calls.
+    """
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = self.max_concurrency
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False):
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                new_limit = max(self.min_concurrency, self.limit // 2)
+                if new_limit != self.limit:
+                    logger.debug(f"Throttled: reducing embedding concurrency {self.limit} -> {new_limit}")
+                self.limit = new_limit
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self.limit < self.max_concurrency and self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
 class AmazonTitanEmbedding(Embeddings):
     """
     Custom LangChain Embedding class for Amazon Titan Bedrock Model.
-    Provides robust handling for token limits and embedding generation.
+    Provides robust handling for token limits and concurrent embedding generation.
     """
-    def __init__(self, region_name: str = AWS_REGION, model_id: str = BEDROCK_EMBEDDING_MODEL_ID):
+    def __init__(
+        self,
+        region_name: str = AWS_REGION,
+        model_id: str = BEDROCK_EMBEDDING_MODEL_ID,
+        endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL,
+        max_workers: int = EMBEDDING_MAX_WORKERS,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+    ):
         try:
-            self.client = boto3.client("bedrock-runtime", region_name=region_name)
+            self.client = get_bedrock_client(region_name, endpoint_url)
+            self.gate = get_model_gate(model_id)
             self.model_id = model_id
             self.max_tokens = 8000
+            self.max_workers = max(1, max_workers)
+            self.max_retries = max(0, max_retries)
             self.tokenizer = tiktoken.get_encoding("cl100k_base")
+            self.limiter = AdaptiveConcurrencyLimiter(self.max_workers)
+            self.last_stats = {}
             logger.info(f"Initialized AmazonTitanEmbedding with model {model_id} in {region_name}")
         except Exception as e:
             logger.error(f"Failed to initialize AmazonTitanEmbedding: {e}")
             raise
 
-    def _safe_truncate(self, text: str) -> str:
-        """Truncates text to ensure it fits within the model's token limit."""
+    def _truncate_tokens(self, text: str, tokens: list) -> str:
+        """Returns the text, decoding it back from tokens only when it exceeds the limit."""
+        if len(tokens) <= self.max_tokens:
+            return text
+        logger.debug(f"Truncating text from {len(tokens)} to {self.max_tokens} tokens")
+        return self.tokenizer.decode(tokens[:self.max_tokens])
+
+    def _safe_truncate_batch(self, texts: list[str]) -> list[str]:
+        """Truncates all texts in a single tokenization pass."""
         try:
-            tokens = self.tokenizer.encode(text)
-            if len(tokens) > self.max_tokens:
-                logger.debug(f"Truncating text from {len(tokens)} to {self.max_tokens} tokens")
-                tokens = tokens[:self.max_tokens]
-            return self.tokenizer.decode(tokens)
+            token_lists = self.tokenizer.encode_batch(texts, disallowed_special=())
+            return [self._truncate_tokens(text, tokens) for text, tokens in zip(texts, token_lists)]
         except Exception as e:
             logger.error(f"Error during tokenization/truncation: {e}")
-            return text[:self.max_tokens * 4] # fallback character limit
+            return [text[:self.max_tokens * 4] for text in texts] # fallback character limit
+
+    def _safe_truncate(self, text: str) -> str:
+        """Truncates text to ensure it fits within the model's token limit."""
+        return self._safe_truncate_batch([text])[0]
+
+    def _invoke(self, safe_text: str) -> list:
+        """Calls Titan for already-truncated text, backing off on throttling and transport errors."""
+        request = json.dumps({"inputText": safe_text})
+        estimated = len(safe_text) // 4 + 1
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            throttled = False
+            try:
+                with self.gate.slot(estimated):
+                    response = self.client.invoke_model(modelId=self.model_id, body=request)
+                    result = json.loads(response["body"].read())
+                self.gate.settle(estimated, result.get("inputTextTokenCount"))
+                return result["embedding"]
+            except RETRYABLE_EXCEPTIONS as e:
+                code = retryable_error_code(e)
+                if code is None or attempt == self.max_retries:
+                    raise
+                # Only throttles shrink the concurrency window; a dropped connection just backs off
+                throttled = code in RETRYABLE_ERROR_CODES
+                logger.debug(f"Retryable Bedrock error ({code}), attempt {attempt + 1}/{self.max_retries}")
+            finally:
+                self.limiter.release(throttled=throttled)
+            time.sleep(backoff_delay(attempt))
 
     def embed_query(self, text: str) -> list:
         """Generates embedding for a single query string."""
         try:
-            safe_text = self._safe_truncate(text)
-            request = json.dumps({"inputText": safe_text})
-            # Consider adding retry logic here if needed
-            response = self.client.invoke_model(modelId=self.model_id, body=request)
-            return json.loads(response["body"].read())["embedding"]
+            return self._invoke(self._safe_truncate(text))
         except Exception as e:
             logger.error(f"Error embedding query: {e}")
             return []
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Generates embeddings for a list of documents."""
-        embeddings = []
-        for i, text in enumerate(texts):
+        """
+        Generates embeddings for a list of documents concurrently.
+        The output is aligned with the input: a text that could not be embedded
+        keeps its position with an empty list.
+        """
+        if not texts:
+            return []
+
+        start_time = time.time()
+        safe_texts = self._safe_truncate_batch(texts)
+        embeddings = [[] for _ in texts]
+        failed = []
+
+        def _embed(index: int):
             try:
-                safe_text = self._safe_truncate(text)
-                embedding = self.embed_query(safe_text)
-                if embedding:
-                    embeddings.append(embedding)
-                else:
-                    logger.warning(f"Empty embedding returned for text #{i}")
+                embeddings[index] = self._invoke(safe_texts[index])
             except Exception as e:
-                logger.warning(f"Skipping text #{i} due to error: {e}")
+                logger.warning(f"Failed to embed text #{index}: {e}")
+            if not embeddings[index]:
+                failed.append(index)
+
+        workers = min(self.max_workers, len(texts))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="titan-embed") as executor:
+            list(executor.map(_embed, range(len(texts))))
+
+        elapsed = time.time() - start_time
+        rate = len(texts) / elapsed if elapsed > 0 else float("inf")
+        self.last_stats = {
+            "chunks": len(texts),
+            "failed_indices": sorted(failed),
+            "seconds": elapsed,
+            "chunks_per_sec": rate,
+            "final_concurrency": self.limiter.limit,
+        }
+        logger.info(
+            f"Embedded {len(texts) - len(failed)}/{len(texts)} chunks in {elapsed:.2f}s "
+            f"({rate:.1f} chunks/sec, concurrency {self.limiter.limit})"
+        )
+        if failed:
+            logger.warning(f"{len(failed)} chunks failed to embed at positions {sorted(failed)[:20]}")
         return embeddings
 
-def get_embedding_function():
-    """Factory function to return the appropriate embedding model based on settings."""
+def get_embedding_function(use_cache: bool = EMBEDDING_CACHE_ENABLED):
+    """
+    Factory function to return the appropriate embedding model based on settings.
+    The model is wrapped in the persistent embedding cache unless disabled.
+    """
     if MODEL_TYPE == "bedrock":
         logger.info("Using AWS Bedrock (Titan) for embeddings")
-        return AmazonTitanEmbedding()
+        embeddings = AmazonTitanEmbedding()
     else:
         logger.info(f"Using Local HuggingFace embeddings ({LOCAL_EMBEDDING_MODEL})")
         try:
             from langchain_huggingface import HuggingFaceEmbeddings
-            return HuggingFaceEmbeddings(
+            embeddings = HuggingFaceEmbeddings(
                 model_name=LOCAL_EMBEDDING_MODEL,
                 model_kwargs={'device': 'cpu'}
             )
         except ImportError:
             logger.error("langchain-huggingface not installed. Please install it for local embeddings.")
             raise
+
+    if use_cache:
+        from src.rag.embedding_cache import CachedEmbeddings
+        return CachedEmbeddings(embeddings)
+    return embeddings
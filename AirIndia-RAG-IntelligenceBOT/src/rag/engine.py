@@ -2,21 +2,131 @@ import re
 import json
 import os
 import time
-from typing import Dict, Any, List, Optional
-from config.settings import MODEL_TYPE
-from config.prompts import RAG_PROMPT_TEMPLATE, SEARCH_QUERY_GENERATOR_PROMPT, EVALUATION_PROMPT
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+from config.settings import (
+    MODEL_TYPE, LLM_FALLBACK_MODEL_TYPE, RESPONSE_CACHE_ENABLED, RERANK_ENABLED, SPECULATIVE_RETRIEVAL_SIMILARITY,
+    BATCH_GENERATION_WORKERS
+)
+from config.prompts import RAG_SYSTEM_PROMPT, RAG_PROMPT_TEMPLATE, SEARCH_QUERY_GENERATOR_PROMPT, EVALUATION_PROMPT
 from src.logger import setup_logger
-from src.rag.vector_store import VectorStoreManager
+from src.rag.vector_store import VectorStoreManager, chunk_id
+from src.rag.response_cache import ResponseCache
+from src.rag.embedding_cache import normalize_text
+from src.rag.history import ChatHistoryManager
+from src.rag.context import ContextPacker
+from src.rag.reranker import CrossEncoderReranker
+from src.rag.tokens import count_tokens
+from src.rag.tracing import MetricsRegistry, Trace
 from src.llm.base import LLMProvider
-from src.llm.bedrock_provider import BedrockProvider
-from src.llm.ollama_provider import OllamaProvider
 
 logger = setup_logger(__name__)
 
+# Default for optional components: build them when their setting enables them; None disables them
+_FROM_SETTINGS = object()
+
+ERROR_RESPONSE = "I'm sorry, I encountered an error while processing your request."
+TOKEN_ATTRIBUTES = ("prompt_tokens", "completion_tokens", "context_tokens", "tokens_saved")
+
+
+def rag_prompt_tokens(prompt: str) -> int:
+    """Tokens sent for a RAG prompt, including the static system prompt."""
+    return count_tokens(RAG_SYSTEM_PROMPT) + count_tokens(prompt)
+
+
+def create_llm_provider(model_type: str = MODEL_TYPE,
+                        fallback_model_type: str = LLM_FALLBACK_MODEL_TYPE) -> LLMProvider:
+    """
+    Builds the configured provider; only the selected providers' SDKs are imported. With a
+    fallback type, the two are wrapped in a HedgedProvider (primary first).
+    """
+    if model_type == "bedrock":
+        from src.llm.bedrock_provider import BedrockProvider
+        primary = BedrockProvider()
+    else:
+        from src.llm.ollama_provider import OllamaProvider
+        primary = OllamaProvider()
+    if not fallback_model_type or fallback_model_type == model_type:
+        return primary
+    from src.llm.hedged_provider import HedgedProvider
+    return HedgedProvider(primary, create_llm_provider(fallback_model_type, ""))
+
+
+@dataclass(slots=True)
+class RetrievedChunk:
+    chunk_id: str
+    text: str
+    score: Optional[float]  # RRF score with hybrid search, else vector similarity (larger is closer)
+    source: str
+    page: Optional[int] = None
+
+
+@dataclass(slots=True)
+class Retrieval:
+    """Packed prompt context, its source names and passages, and every chunk retrieval returned."""
+    context: str = ""
+    sources: List[str] = field(default_factory=list)
+    passages: List[str] = field(default_factory=list)
+    chunks: List[RetrievedChunk] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class RAGResult:
+    """
+    Everything one request produced. `contexts` are the passages the LLM was given; `chunks`
+    are all retrieved chunks in retrieval order. Answers served from the response cache carry
+    no chunks.
+    """
+    answer: str
+    sources: List[str] = field(default_factory=list)
+    search_query: str = ""
+    chunks: List[RetrievedChunk] = field(default_factory=list)
+    contexts: List[str] = field(default_factory=list)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    tokens: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    cached: bool = False
+    error: Optional[str] = None
+    trace_id: str = ""
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        return [chunk.chunk_id for chunk in self.chunks]
+
+    @property
+    def chunk_texts(self) -> List[str]:
+        return [chunk.text for chunk in self.chunks]
+
+    @property
+    def scores(self) -> List[Optional[float]]:
+        return [chunk.score for chunk in self.chunks]
+
+
+@dataclass
+class PreparedRequest:
+    """Everything generation needs, or a cached (response, sources) that makes generation unnecessary."""
+    search_query: str
+    prompt: str = ""
+    sources: Optional[List[str]] = None
+    corpus_version: Optional[str] = None
+    cached: Optional[Tuple[str, List[str]]] = None
+    retrieval: Retrieval = field(default_factory=Retrieval)
+
 class RAGEngine:
     """Core RAG logic using a modular LLM provider and a Vector Store."""
 
-    def __init__(self, vector_store_manager: VectorStoreManager, llm_provider: Optional[LLMProvider] = None):
+    def __init__(
+        self,
+        vector_store_manager: VectorStoreManager,
+        llm_provider: Optional[LLMProvider] = None,
+        response_cache: Optional[ResponseCache] = _FROM_SETTINGS,
+        reranker: Optional[CrossEncoderReranker] = _FROM_SETTINGS,
+        context_packer: Optional[ContextPacker] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
         self.vector_store = vector_store_manager
         
         # Initialize LLM Provider if not passed externally
@@ -24,80 +134,489 @@ class RAGEngine:
             self.llm = llm_provider
         else:
             self._initialize_llm()
+
+        if response_cache is _FROM_SETTINGS:
+            response_cache = (ResponseCache(embed_fn=self.vector_store.embedding_function.embed_query)
+                              if RESPONSE_CACHE_ENABLED else None)
+        self.response_cache = response_cache
+
+        if reranker is _FROM_SETTINGS:
+            reranker = CrossEncoderReranker() if RERANK_ENABLED else None
+        self.reranker = reranker
+
+        self.history_manager = ChatHistoryManager(self.llm)
+        self.context_packer = context_packer or ContextPacker()
+        self.metrics = metrics or MetricsRegistry()
+
+        self.speculation_stats = {"attempts": 0, "hits": 0, "seconds_saved": 0.0}
+        self._stats_lock = threading.Lock()
             
     def _initialize_llm(self):
         """Initializes the LLM provider based on configuration."""
         self.model_type = MODEL_TYPE
         try:
-            if self.model_type == "bedrock":
-                self.llm = BedrockProvider()
-            else:
-                self.llm = OllamaProvider()
+            self.llm = create_llm_provider(self.model_type)
             logger.info(f"Initialized RAGEngine with {self.model_type.upper()} provider.")
         except Exception as e:
             logger.error(f"Failed to initialize LLM provider: {e}")
             raise
 
     def _format_chat_history(self, chat_history: List[Dict[str, str]]) -> str:
-        """Formats the chat history list into a string."""
-        formatted_history = ""
-        for message in chat_history:
-            role = "User" if message["role"] == "user" else "Assistant"
-            formatted_history += f"{role}: {message['content']}\n"
-        return formatted_history
-
-    def generate_response(self, question: str, chat_history: List[Dict[str, str]] = None) -> tuple[str, list[str]]:
-        """Generates a response using the chosen LLM with retrieved context and chat history."""
-        if chat_history is None:
-            chat_history = []
+        """Formats the chat history into a string that stays within the history token budget."""
+        return self.history_manager.format(chat_history)
 
-        formatted_history = self._format_chat_history(chat_history)
-        
-        # 1. Query Condensation
-        search_query = question
-        if chat_history:
-            logger.info("Generating optimized search query with chat history...")
-            condense_prompt = SEARCH_QUERY_GENERATOR_PROMPT.format(
-                chat_history=formatted_history, 
-                question=question
-            )
+    def _condense_query(self, question: str, formatted_history: str, trace: Optional[Trace] = None) -> str:
+        """Rewrites a follow-up question into a standalone search query using the chat history."""
+        logger.info("Generating optimized search query with chat history...")
+        condense_prompt = SEARCH_QUERY_GENERATOR_PROMPT.format(
+            chat_history=formatted_history, 
+            question=question
+        )
+        with (trace or Trace()).span("condense", prompt_tokens=count_tokens(condense_prompt)) as span:
             try:
                 search_query = self.llm.generate(condense_prompt).strip()
+                span.set(completion_tokens=count_tokens(search_query))
                 logger.info(f"Condensed query: {search_query}")
+                return search_query
             except Exception as e:
+                span.set(error=type(e).__name__)
                 logger.warning(f"Query condensation failed, using original query: {e}")
-                search_query = question
+                return question
 
-        # 2. Retrieve relevant documents (Meta-question check)
-        is_meta_question = any(word in search_query.lower() for word in ["asked you", "previous questions", "our conversation", "my last question"])
-        
+    def _is_meta_question(self, search_query: str) -> bool:
+        return any(word in search_query.lower()
+                   for word in ["asked you", "previous questions", "our conversation", "my last question"])
+
+    def _retrieve(self, search_query: str, trace: Optional[Trace] = None) -> Retrieval:
+        """Retrieves (and optionally reranks) documents and packs them into the prompt context."""
+        trace = trace or Trace()
+        with trace.span("retrieval") as span:
+            scored = self.vector_store.similarity_search_with_scores(search_query, k=self._retrieval_k())
+            span.set(docs_retrieved=len(scored))
+        return self._pack(search_query, scored, trace)
+
+    def _retrieval_k(self) -> int:
+        # With a reranker, over-fetch and keep only the few candidates the cross-encoder rates best
+        return self.reranker.candidates if self.reranker else 3
+
+    def _pack(self, search_query: str, scored: List[Tuple[Any, float]], trace: Trace) -> Retrieval:
+        """Reranks (optionally) and packs scored search results into the prompt context."""
+        docs = [doc for doc, _ in scored]
+        if self.reranker:
+            with trace.span("rerank", candidates=len(docs)):
+                docs = self.reranker.rerank(search_query, docs)
+        with trace.span("context_build") as span:
+            packed = self.context_packer.pack(docs)
+            span.set(context_tokens=packed.tokens_after, tokens_saved=packed.tokens_saved)
+        sources = sorted(list(set([os.path.basename(doc.metadata.get('source', 'Unknown')) for doc in packed.docs])))
+        chunks = [
+            RetrievedChunk(
+                chunk_id=getattr(doc, "id", None) or chunk_id(doc),
+                text=doc.page_content,
+                score=score,
+                source=os.path.basename(doc.metadata.get('source', 'Unknown')),
+                page=doc.metadata.get('page'),
+            )
+            for doc, score in scored
+        ]
+        return Retrieval(packed.text, sources, [doc.page_content for doc in packed.docs], chunks)
+
+    def _check_cache(self, request: PreparedRequest, is_meta_question: bool,
+                     vector: Optional[List[float]] = None) -> bool:
+        """Answers to standalone document questions are reusable across users and turns."""
+        if self.response_cache is None or is_meta_question:
+            return False
+        request.corpus_version = self.vector_store.corpus_version()
+        request.cached = self.response_cache.get(request.search_query, request.corpus_version, vector)
+        return request.cached is not None
+
+    def _build_prompt(self, request: PreparedRequest, question: str, formatted_history: str,
+                      context: str, sources: List[str], is_meta_question: bool) -> PreparedRequest:
         if is_meta_question:
             logger.info("Meta-history question detected. Skipping vector retrieval.")
             context = "The user is asking about the previous conversation history, not requesting information from external documents."
             sources = ["System Memory"]
-        else:
-            docs = self.vector_store.similarity_search(search_query)
-            context = "\n\n".join([doc.page_content for doc in docs])
-            sources = sorted(list(set([os.path.basename(doc.metadata.get('source', 'Unknown')) for doc in docs])))
 
         if not context and not is_meta_question:
-            logger.warning(f"No relevant context found for: {search_query}")
+            logger.warning(f"No relevant context found for: {request.search_query}")
             context = "No specific documents found."
             sources = []
 
-        # 3. Generate final answer
-        prompt = RAG_PROMPT_TEMPLATE.format(
+        request.prompt = RAG_PROMPT_TEMPLATE.format(
             chat_history=formatted_history if formatted_history else "No previous conversation.",
             context=context, 
             question=question
         )
+        request.sources = sources
+        return request
+
+    def _prepare_request(self, question: str, chat_history: List[Dict[str, str]],
+                         trace: Optional[Trace] = None) -> PreparedRequest:
+        """Runs everything before generation: condensation, cache lookup, retrieval and prompt building."""
+        trace = trace or Trace()
+        with trace.span("history"):
+            formatted_history = self._format_chat_history(chat_history)
+        
+        # 1. Query Condensation
+        search_query = question
+        if chat_history:
+            search_query = self._condense_query(question, formatted_history, trace)
+
+        # 2. Retrieve relevant documents (Meta-question check)
+        with trace.span("meta_check") as span:
+            is_meta_question = self._is_meta_question(search_query)
+            span.set(meta=is_meta_question)
+        request = PreparedRequest(search_query=search_query)
+        if self._cached(request, is_meta_question, trace):
+            return request
+
+        if not is_meta_question:
+            request.retrieval = self._retrieve(search_query, trace)
+
+        # 3. Build the final prompt
+        retrieval = request.retrieval
+        return self._traced_build_prompt(trace, request, question, formatted_history,
+                                         retrieval.context, retrieval.sources, is_meta_question)
+
+    def _cached(self, request: PreparedRequest, is_meta_question: bool, trace: Trace,
+                vector: Optional[List[float]] = None) -> bool:
+        with trace.span("cache_lookup") as span:
+            hit = self._check_cache(request, is_meta_question, vector)
+            span.set(hit=hit)
+        return hit
+
+    def _traced_build_prompt(self, trace: Trace, *args) -> PreparedRequest:
+        with trace.span("prompt_build") as span:
+            request = self._build_prompt(*args)
+            span.set(prompt_tokens=rag_prompt_tokens(request.prompt))
+        return request
+
+    def _result(self, request: PreparedRequest, trace: Trace, answer: str, error: Optional[str] = None) -> RAGResult:
+        retrieval = request.retrieval
+        return RAGResult(
+            answer=answer,
+            sources=[] if error else list(request.sources or []),
+            search_query=request.search_query,
+            chunks=retrieval.chunks,
+            contexts=retrieval.passages,
+            timings_ms={**{stage: round(ms, 2) for stage, ms in trace.stage_totals().items()},
+                        "total": round(trace.elapsed_ms(), 2)},
+            tokens=trace.attribute_totals(TOKEN_ATTRIBUTES),
+            error=error,
+            trace_id=trace.trace_id,
+        )
 
+    def _cached_result(self, request: PreparedRequest, trace: Trace) -> RAGResult:
+        response, sources = request.cached
+        result = self._result(request, trace, response)
+        result.sources, result.cached = list(sources), True
+        return result
+
+    def _finish_trace(self, trace: Trace):
+        """Feeds a finished request into the metrics registry and logs its stage breakdown."""
+        self.metrics.record(trace)
+        logger.info(f"Request {trace.trace_id[:8]} timings: {trace.summary_line()}")
+
+    def warm_up(self, query: str) -> float:
+        """
+        Runs one retrieval so the embedding model, vector index, keyword index, tokenizer and
+        reranker are loaded before the first user request, while the LLM provider loads its model
+        and system prompt in parallel. Returns seconds taken.
+        """
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-warmup") as pool:
+            llm_warm_up = pool.submit(self.llm.warm_up, RAG_SYSTEM_PROMPT)
+            try:
+                self._retrieve(query)
+            except Exception as e:
+                logger.warning(f"Warm-up retrieval failed: {e}")
+            llm_warm_up.result()
+        elapsed = time.perf_counter() - started
+        logger.info(f"Warm-up query completed in {elapsed * 1000:.0f}ms")
+        return elapsed
+
+    def _remember(self, request: PreparedRequest, response: str):
+        """Stores a successful document-grounded answer in the response cache."""
+        if request.corpus_version is not None and request.sources:
+            self.response_cache.put(request.search_query, request.corpus_version, response, request.sources)
+
+    def generate_response(self, question: str, chat_history: List[Dict[str, str]] = None) -> tuple[str, list[str]]:
+        """Generates a response using the chosen LLM with retrieved context and chat history."""
+        result = self.generate(question, chat_history)
+        return result.answer, result.sources
+
+    def generate(self, question: str, chat_history: List[Dict[str, str]] = None) -> RAGResult:
+        """generate_response returning the full RAGResult: retrieved chunks, condensed query, timings and tokens."""
+        trace = Trace()
+        try:
+            return self._complete(self._prepare_request(question, chat_history or [], trace), trace)
+        finally:
+            self._finish_trace(trace)
+
+    def _complete(self, request: PreparedRequest, trace: Trace) -> RAGResult:
+        """Generation for a prepared request (or its cached answer)."""
+        if request.cached:
+            return self._cached_result(request, trace)
         try:
-            response = self.llm.generate(prompt)
-            return response, sources
+            with trace.span("generation", prompt_tokens=rag_prompt_tokens(request.prompt)) as span:
+                response = self.llm.generate(request.prompt, RAG_SYSTEM_PROMPT)
+                span.set(completion_tokens=count_tokens(response))
+            self._remember(request, response)
+            return self._result(request, trace, response)
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error while processing your request.", []
+            return self._result(request, trace, ERROR_RESPONSE, error=str(e))
+
+    def _embed_batch(self, indexes: List[int], questions: List[str], traces: List[Trace]) -> Dict[int, list]:
+        """
+        Embeds the given questions in one call, recorded as shared retrieval time on each trace.
+        Returns {} if embedding fails, so the cache and the search embed for themselves.
+        """
+        if not indexes:
+            return {}
+        started = time.perf_counter()
+        try:
+            vectors = self.vector_store.embedding_function.embed_documents([questions[i] for i in indexes])
+        except Exception as e:
+            logger.warning(f"Batched query embedding failed, embedding per question: {e}")
+            return {}
+        embed_ms = (time.perf_counter() - started) * 1000
+        for i in indexes:
+            traces[i].add_span("retrieval", embed_ms, batch_size=len(indexes))
+        return dict(zip(indexes, vectors))
+
+    def generate_batch(self, questions: List[str], max_workers: int = BATCH_GENERATION_WORKERS,
+                       on_result: Optional[Callable[[int, RAGResult], None]] = None) -> List[RAGResult]:
+        """
+        Answers many standalone questions (no chat history). The questions are embedded in one
+        batched call whose vectors serve both the cache lookups and one multi-query vector search
+        of the misses, then reranking, packing and generation fan out over a bounded thread pool. Results come back
+        in question order; a question that fails gets a RAGResult with `error` set. `on_result`
+        is called with (index, result) on the calling thread as each question finishes.
+        """
+        if not questions:
+            return []
+        started = time.perf_counter()
+        traces = [Trace() for _ in questions]
+        requests: List[Optional[PreparedRequest]] = [None] * len(questions)
+        errors: Dict[int, Exception] = {}
+        meta_flags: Dict[int, bool] = {}
+        for i, (question, trace) in enumerate(zip(questions, traces)):
+            try:
+                with trace.span("meta_check") as span:
+                    meta_flags[i] = self._is_meta_question(question)
+                    span.set(meta=meta_flags[i])
+            except Exception as e:
+                errors[i] = e
+        vectors = self._embed_batch([i for i, is_meta_question in meta_flags.items() if not is_meta_question],
+                                    questions, traces)
+
+        to_search = []
+        for i, is_meta_question in meta_flags.items():
+            try:
+                requests[i] = PreparedRequest(search_query=questions[i])
+                if not self._cached(requests[i], is_meta_question, traces[i], vectors.get(i)):
+                    to_search.append((i, is_meta_question))
+            except Exception as e:
+                errors[i] = e
+
+        searched = [i for i, is_meta_question in to_search if not is_meta_question]
+        hits: Dict[int, list] = {}
+        if searched:
+            search_started = time.perf_counter()
+            try:
+                batch = self.vector_store.similarity_search_many(
+                    [questions[i] for i in searched], k=self._retrieval_k(),
+                    vectors=[vectors[i] for i in searched] if vectors else None,
+                )
+                hits = dict(zip(searched, batch))
+            except Exception as e:
+                errors.update({i: e for i in searched})
+            search_ms = (time.perf_counter() - search_started) * 1000
+            for i in searched:
+                traces[i].add_span("retrieval", search_ms, docs_retrieved=len(hits.get(i, [])),
+                                   batch_size=len(searched))
+
+        def finish(i: int, is_meta_question: bool) -> RAGResult:
+            request, trace = requests[i], traces[i]
+            if not request.cached:
+                if not is_meta_question:
+                    request.retrieval = self._pack(request.search_query, hits[i], trace)
+                self._traced_build_prompt(trace, request, questions[i], "", request.retrieval.context,
+                                          request.retrieval.sources, is_meta_question)
+            return self._complete(request, trace)
+
+        results: List[Optional[RAGResult]] = [None] * len(questions)
+
+        def settle(i: int, result: RAGResult):
+            results[i] = result
+            if on_result:
+                try:
+                    on_result(i, result)
+                except Exception as e:
+                    logger.error(f"Batch result callback failed for question {i}: {e}")
+
+        def fail(i: int, e: Exception):
+            errors[i] = e
+            logger.error(f"Batch question {i} failed: {e}")
+            request = requests[i] or PreparedRequest(search_query=questions[i])
+            settle(i, self._result(request, traces[i], ERROR_RESPONSE, error=str(e)))
+
+        for i, e in list(errors.items()):
+            fail(i, e)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="rag-batch") as pool:
+            futures = {pool.submit(finish, i, meta_flags.get(i, False)): i
+                       for i in range(len(questions)) if i not in errors}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    settle(i, future.result())
+                except Exception as e:
+                    fail(i, e)
+        for trace in traces:
+            self._finish_trace(trace)
+
+        logger.info(f"Answered a batch of {len(questions)} questions ({len(errors)} failed) "
+                    f"in {time.perf_counter() - started:.2f}s with {max_workers} workers")
+        return results
+
+    def stream_response(self, question: str, chat_history: List[Dict[str, str]] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of generate_response. Yields ("sources", list) once retrieval is done,
+        then ("token", text) for every piece of the answer as the LLM produces it.
+        """
+        trace = Trace()
+        try:
+            request = self._prepare_request(question, chat_history or [], trace)
+            if request.cached:
+                response, sources = request.cached
+                yield "sources", sources
+                yield "token", response
+                return
+
+            yield "sources", request.sources
+            pieces = []
+            try:
+                with trace.span("generation", prompt_tokens=rag_prompt_tokens(request.prompt)) as span:
+                    started = time.perf_counter()
+                    for token in self.llm.stream(request.prompt, RAG_SYSTEM_PROMPT):
+                        if not pieces:
+                            span.set(ttft_ms=round((time.perf_counter() - started) * 1000, 1))
+                        pieces.append(token)
+                        yield "token", token
+                    span.set(completion_tokens=count_tokens("".join(pieces)))
+            except Exception as e:
+                logger.error(f"Error streaming response: {e}")
+                yield "token", ERROR_RESPONSE
+                return
+            self._remember(request, "".join(pieces))
+        finally:
+            # Also runs when the consumer stops reading early
+            self._finish_trace(trace)
+
+    def _queries_match(self, original: str, condensed: str) -> bool:
+        """True when the condensed query is close enough to the raw question to reuse its retrieval."""
+        if normalize_text(original).lower() == normalize_text(condensed).lower():
+            return True
+        try:
+            embed = self.vector_store.embedding_function.embed_query
+            a = np.asarray(embed(original), dtype=np.float32)
+            b = np.asarray(embed(condensed), dtype=np.float32)
+            denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+            return denom > 0 and float(np.dot(a, b)) / denom >= SPECULATIVE_RETRIEVAL_SIMILARITY
+        except Exception as e:
+            logger.warning(f"Could not compare queries for speculative retrieval: {e}")
+            return False
+
+    def _timed_retrieve(self, search_query: str, trace: Optional[Trace] = None) -> Tuple[Retrieval, float]:
+        started = time.perf_counter()
+        result = self._retrieve(search_query, trace)
+        return result, time.perf_counter() - started
+
+    def _record_speculation(self, hit: bool, seconds_saved: float):
+        with self._stats_lock:
+            stats = self.speculation_stats
+            stats["attempts"] += 1
+            stats["hits"] += int(hit)
+            stats["seconds_saved"] += seconds_saved
+            logger.info(
+                f"Speculative retrieval {'hit' if hit else 'miss'} (saved {seconds_saved:.2f}s); "
+                f"paid off {stats['hits']}/{stats['attempts']}, {stats['seconds_saved']:.2f}s saved in total"
+            )
+
+    async def _aprepare_request(self, question: str, chat_history: List[Dict[str, str]],
+                                trace: Optional[Trace] = None) -> PreparedRequest:
+        """
+        Async _prepare_request. With chat history, retrieval for the raw question starts at the
+        same time as condensation; its results are kept if the condensed query turns out to be
+        close enough to the question, otherwise retrieval is re-run on the condensed query.
+        """
+        trace = trace or Trace()
+        if not chat_history:
+            return await asyncio.to_thread(self._prepare_request, question, chat_history, trace)
+
+        with trace.span("history"):
+            formatted_history = self._format_chat_history(chat_history)
+        started = time.perf_counter()
+        # Speculative spans go to their own trace and are only merged in if the result is used
+        speculative_trace = Trace()
+        speculative = asyncio.ensure_future(asyncio.to_thread(self._timed_retrieve, question, speculative_trace))
+        # Never leave an unobserved exception behind if the speculative result goes unused
+        speculative.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        search_query = await asyncio.to_thread(self._condense_query, question, formatted_history, trace)
+        condense_seconds = time.perf_counter() - started
+
+        with trace.span("meta_check") as span:
+            is_meta_question = self._is_meta_question(search_query)
+            span.set(meta=is_meta_question)
+        request = PreparedRequest(search_query=search_query)
+        if await asyncio.to_thread(self._cached, request, is_meta_question, trace):
+            self._record_speculation(False, 0.0)
+            return request
+        if is_meta_question:
+            self._record_speculation(False, 0.0)
+            return self._traced_build_prompt(trace, request, question, formatted_history, "", [], is_meta_question)
+
+        if await asyncio.to_thread(self._queries_match, question, search_query):
+            request.retrieval, retrieve_seconds = await speculative
+            trace.spans.extend(speculative_trace.spans)
+            # Serial execution would have cost condensation + retrieval back to back
+            saved = max(0.0, condense_seconds + retrieve_seconds - (time.perf_counter() - started))
+            self._record_speculation(True, saved)
+        else:
+            request.retrieval, _ = await asyncio.to_thread(self._timed_retrieve, search_query, trace)
+            self._record_speculation(False, 0.0)
+
+        retrieval = request.retrieval
+        return self._traced_build_prompt(trace, request, question, formatted_history,
+                                         retrieval.context, retrieval.sources, is_meta_question)
+
+    async def agenerate_response(self, question: str,
+                                 chat_history: List[Dict[str, str]] = None) -> tuple[str, list[str]]:
+        """Async generate_response that overlaps speculative retrieval with query condensation."""
+        result = await self.agenerate(question, chat_history)
+        return result.answer, result.sources
+
+    async def agenerate(self, question: str, chat_history: List[Dict[str, str]] = None) -> RAGResult:
+        """Async generate: the full RAGResult, with speculative retrieval during condensation."""
+        trace = Trace()
+        try:
+            request = await self._aprepare_request(question, chat_history or [], trace)
+            if request.cached:
+                return self._cached_result(request, trace)
+
+            try:
+                with trace.span("generation", prompt_tokens=rag_prompt_tokens(request.prompt)) as span:
+                    response = await asyncio.to_thread(self.llm.generate, request.prompt, RAG_SYSTEM_PROMPT)
+                    span.set(completion_tokens=count_tokens(response))
+                self._remember(request, response)
+                return self._result(request, trace, response)
+            except Exception as e:
+                logger.error(f"Error generating response: {e}")
+                return self._result(request, trace, ERROR_RESPONSE, error=str(e))
+        finally:
+            self._finish_trace(trace)
 
     def evaluate_response(self, question: str, response: str, context: str) -> Dict[str, Any]:
         """Uses the LLM to evaluate a generated response against the context."""
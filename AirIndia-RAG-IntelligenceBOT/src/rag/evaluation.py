@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from config.prompts import TEST_QUESTIONS, GROUND_TRUTH, RAG_SYSTEM_PROMPT, RAG_PROMPT_TEMPLATE, EVALUATION_PROMPT
+from config.settings import EVAL_WORKERS, EVAL_CHECKPOINT_DIR, LOCAL_LLM_MODEL
+from src.logger import setup_logger
+from src.rag.engine import RAGEngine
+
+logger = setup_logger(__name__)
+
+RAGAS_METRICS = ("faithfulness", "answer_relevancy", "context_precision", "context_recall")
+REPORT_COLUMNS = ["question", "answer", "llm_judge_score", *RAGAS_METRICS, "llm_judge_reasoning",
+                  "sources", "ground_truth", "contexts"]
+
+
+class EvaluationRunner:
+    """
+    Generates each evaluation answer once, together with the passages it was grounded on, with
+    RAGEngine.generate_batch (bounded generation concurrency), and judges each answer on a worker
+    pool as soon as it is generated. Every finished step is appended to a JSONL checkpoint, so an
+    interrupted run picks up where it stopped; the LLM judge and RAGAS read the same stored
+    answers and contexts. The checkpoint is keyed by model, prompts and corpus version:
+    changing any of them starts a fresh run.
+    """
+
+    def __init__(
+        self,
+        engine: RAGEngine,
+        questions: Optional[List[str]] = None,
+        ground_truth: Optional[Dict[str, str]] = None,
+        checkpoint_dir: str = EVAL_CHECKPOINT_DIR,
+        workers: int = EVAL_WORKERS,
+        judge: bool = True,
+    ):
+        self.engine = engine
+        if engine.response_cache is not None:
+            logger.warning("The evaluated engine has a response cache; cached answers carry no contexts to judge")
+        self.questions = list(dict.fromkeys(questions or TEST_QUESTIONS))
+        self.ground_truth = GROUND_TRUTH if ground_truth is None else ground_truth
+        self.workers = max(1, workers)
+        self.judge = judge
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{self.run_key()}.jsonl")
+        self._lock = threading.Lock()
+
+    def run_key(self) -> str:
+        llm = self.engine.llm
+        identity = {
+            "model": getattr(llm, "model_id", None) or getattr(llm, "model_name", None) or type(llm).__name__,
+            "rag_prompt": RAG_SYSTEM_PROMPT + RAG_PROMPT_TEMPLATE,
+            "judge_prompt": EVALUATION_PROMPT,
+            "corpus": self.engine.vector_store.corpus_version(),
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def load(self) -> Dict[str, dict]:
+        """Merges the checkpointed steps into one record per question."""
+        records: Dict[str, dict] = {}
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        step = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted write
+                    records.setdefault(step["question"], {}).update(step)
+        except OSError:
+            pass
+        return records
+
+    def _checkpoint(self, step: dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(step) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _judge(self, question: str, record: dict) -> dict:
+        started = time.perf_counter()
+        verdict = self.engine.evaluate_response(question, record["answer"], "\n\n".join(record["contexts"]))
+        reasoning = verdict.get("reasoning", "No reasoning provided")
+        if str(reasoning).startswith("Evaluation failed"):
+            raise RuntimeError(reasoning)
+        step = {"question": question, "llm_judge_score": verdict.get("score", 0),
+                "llm_judge_reasoning": reasoning, "judge_seconds": round(time.perf_counter() - started, 3)}
+        self._checkpoint(step)
+        return step
+
+    def run(self) -> List[dict]:
+        """Generates and judges every question not already in the checkpoint; returns records in question order."""
+        started = time.perf_counter()
+        records = self.load()
+        to_answer = [q for q in self.questions if "answer" not in records.get(q, {})]
+        logger.info(f"Evaluation run {os.path.basename(self.checkpoint_path)}: "
+                    f"{len(self.questions) - len(to_answer)} answers restored from checkpoint, "
+                    f"{len(to_answer)} to generate with {self.workers} workers")
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="eval-judge") as pool:
+            judging = {pool.submit(self._judge, q, records[q]): q for q in self.questions
+                       if self.judge and "answer" in records.get(q, {}) and "llm_judge_score" not in records[q]}
+
+            def generated(i: int, result):
+                # Runs on this thread as each answer finishes: checkpoint it, then judge it while others generate
+                question = to_answer[i]
+                if result.error:
+                    failed.append(question)
+                    logger.error(f"Generation for '{question}' failed (retried on the next run): {result.error}")
+                    return
+                step = {"question": question, "answer": result.answer, "sources": result.sources,
+                        "contexts": result.contexts, "chunk_ids": result.chunk_ids, "scores": result.scores,
+                        "search_query": result.search_query, "timings_ms": result.timings_ms,
+                        "generation_seconds": round(result.timings_ms["total"] / 1000, 3)}
+                self._checkpoint(step)
+                records.setdefault(question, {}).update(step)
+                if self.judge:
+                    judging[pool.submit(self._judge, question, dict(records[question]))] = question
+
+            self.engine.generate_batch(to_answer, max_workers=self.workers, on_result=generated)
+            for future in as_completed(judging):
+                question = judging[future]
+                try:
+                    records[question].update(future.result())
+                except Exception as e:
+                    failed.append(question)
+                    logger.error(f"Judging '{question}' failed (retried on the next run): {e}")
+
+        logger.info(f"Evaluation finished in {time.perf_counter() - started:.2f}s ({len(to_answer)} answers "
+                    f"generated, {len(judging)} judged, {len(set(failed))} questions failed)")
+        return [dict(records[q], ground_truth=self.ground_truth.get(q)) for q in self.questions
+                if "answer" in records.get(q, {})]
+
+    def run_ragas(self, records: List[dict], llm=None, embeddings=None) -> List[dict]:
+        """
+        Scores the stored answers that have a ground truth with RAGAS in one batch; scores are
+        checkpointed too, so a completed RAGAS pass is not repeated on resume.
+        """
+        todo = [r for r in records if r.get("ground_truth") and not any(m in r for m in RAGAS_METRICS)]
+        if todo:
+            from datasets import Dataset
+            from ragas import evaluate
+            from ragas.embeddings import LangchainEmbeddingsWrapper
+            from ragas.llms import LangchainLLMWrapper
+            from ragas.metrics import faithfulness, answer_relevancy, context_precision, context_recall
+
+            if llm is None:
+                from langchain_ollama import OllamaLLM
+                llm = OllamaLLM(model=LOCAL_LLM_MODEL)
+            if embeddings is None:
+                embeddings = self.engine.vector_store.embedding_function
+
+            started = time.perf_counter()
+            dataset = Dataset.from_dict({
+                "question": [r["question"] for r in todo],
+                "answer": [r["answer"] for r in todo],
+                "contexts": [r["contexts"] for r in todo],
+                "ground_truth": [r["ground_truth"] for r in todo],
+            })
+            result = evaluate(
+                dataset=dataset,
+                metrics=[faithfulness, answer_relevancy, context_precision, context_recall],
+                llm=LangchainLLMWrapper(llm),
+                embeddings=LangchainEmbeddingsWrapper(embeddings),
+                raise_exceptions=False,
+            )
+            scores = result.to_pandas()
+            for record, (_, row) in zip(todo, scores.iterrows()):
+                step = {"question": record["question"]}
+                step.update({m: _score(row.get(m)) for m in RAGAS_METRICS if m in row})
+                self._checkpoint(step)
+                record.update(step)
+            logger.info(f"RAGAS scored {len(todo)} answers in {time.perf_counter() - started:.2f}s")
+        return records
+
+
+def _score(value) -> Optional[float]:
+    """RAGAS reports failed metrics as NaN; store them as null."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
+
+
+def write_report(records: List[dict], path: str):
+    """Writes the combined judge + RAGAS report as CSV."""
+    import pandas as pd
+
+    rows = [dict(r, sources=", ".join(r.get("sources", []))) for r in records]
+    df = pd.DataFrame(rows)
+    df = df[[c for c in REPORT_COLUMNS if c in df.columns]]
+    df.to_csv(path, index=False)
+    logger.info(f"Evaluation report with {len(df)} rows saved to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate, judge and RAGAS-score the evaluation questions once, resumably."
+    )
+    parser.add_argument("--workers", type=int, default=EVAL_WORKERS, help="Questions processed concurrently.")
+    parser.add_argument("--checkpoint-dir", type=str, default=EVAL_CHECKPOINT_DIR,
+                        help="Where per-question results are stored.")
+    parser.add_argument("--fresh", action="store_true", help="Discard this run's checkpoint and start over.")
+    parser.add_argument("--no-ragas", action="store_true", help="Skip the RAGAS metrics (LLM judge only).")
+    parser.add_argument("--output", type=str, default="tests/combined_rag_report.csv", help="Path for the CSV report.")
+    args = parser.parse_args()
+
+    from src.rag.vector_store import initialize_vector_store
+
+    # Answers must be freshly generated so their contexts are known
+    engine = RAGEngine(initialize_vector_store(), response_cache=None)
+    runner = EvaluationRunner(engine, checkpoint_dir=args.checkpoint_dir, workers=args.workers)
+    if args.fresh and os.path.exists(runner.checkpoint_path):
+        os.remove(runner.checkpoint_path)
+    results = runner.run()
+    if not args.no_ragas:
+        results = runner.run_ragas(results)
+    write_report(results, args.output)
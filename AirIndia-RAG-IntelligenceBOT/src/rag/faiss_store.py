@@ -0,0 +1,201 @@
+import hashlib
+import json
+import math
+import os
+import time
+from typing import List, Optional
+import numpy as np
+from config.settings import (
+    FAISS_INDEX_TYPE, FAISS_HNSW_M, FAISS_HNSW_EF_CONSTRUCTION, FAISS_HNSW_EF_SEARCH,
+    FAISS_IVF_NLIST, FAISS_IVF_NPROBE, FAISS_PQ_M, FAISS_PQ_NBITS
+)
+from src.logger import setup_logger
+from src.rag.numpy_store import NumpyBackend, dequantize
+
+logger = setup_logger(__name__)
+
+INDEX_TYPES = ("hnsw", "ivf", "ivfpq", "flat")
+
+
+def ids_fingerprint(ids: List[str]) -> str:
+    """Identifies the exact row order an index was built over."""
+    digest = hashlib.sha256()
+    for doc_id in ids:
+        digest.update(doc_id.encode("utf-8") + b"\0")
+    return digest.hexdigest()[:16]
+
+
+def default_params() -> dict:
+    return {
+        "hnsw_m": FAISS_HNSW_M,
+        "ef_construction": FAISS_HNSW_EF_CONSTRUCTION,
+        "ef_search": FAISS_HNSW_EF_SEARCH,
+        "nlist": FAISS_IVF_NLIST,
+        "nprobe": FAISS_IVF_NPROBE,
+        "pq_m": FAISS_PQ_M,
+        "pq_nbits": FAISS_PQ_NBITS,
+    }
+
+
+def build_faiss_index(matrix: np.ndarray, index_type: str, params: dict):
+    """Builds an inner-product (cosine, on normalized rows) FAISS index over the matrix."""
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+    n, dim = matrix.shape
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        nlist = min(n, params["nlist"] or max(1, int(4 * math.sqrt(n))))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            if dim % params["pq_m"]:
+                raise ValueError(f"FAISS_PQ_M={params['pq_m']} must divide the embedding dimension {dim}")
+            # PQ training needs at least 2^nbits points per sub-quantizer codebook
+            nbits = max(1, min(params["pq_nbits"], int(math.log2(n))))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, params["pq_m"], nbits, faiss.METRIC_INNER_PRODUCT)
+        index.train(matrix)
+    index.add(matrix)
+    return index
+
+
+def apply_search_params(index, index_type: str, params: dict):
+    import faiss
+
+    if index_type == "hnsw":
+        index.hnsw.efSearch = params["ef_search"]
+    elif index_type in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+
+
+class FaissBackend(NumpyBackend):
+    """
+    Approximate search through a FAISS index (HNSW, IVF, IVF-PQ or flat) persisted on disk and
+    read memory-mapped where the index type allows. Chunks and exact vectors are kept in the
+    NumPy store layout; the index is derived from them and rebuilt after ingestion. Until an
+    index matches the stored rows, search falls back to exact NumPy search.
+    """
+
+    name = "faiss"
+
+    def __init__(self, embedding_function, persist_directory: str, collection_name: str,
+                 index_type: str = FAISS_INDEX_TYPE, params: Optional[dict] = None, **kwargs):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        self.index_type = index_type
+        self.params = {**default_params(), **(params or {})}
+        self._index = None
+        self._index_meta = {}
+        self._index_stamp = None
+        self._fingerprint = None
+        self._warned_stale = False
+        super().__init__(embedding_function, persist_directory, collection_name, **kwargs)
+        self.index_path = os.path.join(self.path, "index.faiss")
+        self.index_meta_path = os.path.join(self.path, "index.json")
+
+    def _set_rows(self, ids, texts, metadatas, vectors, scales):
+        super()._set_rows(ids, texts, metadatas, vectors, scales)
+        self._fingerprint = ids_fingerprint(ids)
+
+    def _load_index(self):
+        """Loads (or reloads, after a rebuild in another process) the persisted index."""
+        import faiss
+
+        try:
+            stat = os.stat(self.index_meta_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            self._index, self._index_meta, self._index_stamp = None, {}, None
+            return
+        if stamp == self._index_stamp:
+            return
+        started = time.perf_counter()
+        with open(self.index_meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        try:
+            index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type supports mmap reads
+            index = faiss.read_index(self.index_path)
+        apply_search_params(index, meta["type"], {**meta["params"], **self._search_overrides()})
+        self._index, self._index_meta, self._index_stamp = index, meta, stamp
+        logger.info(f"Loaded FAISS {meta['type']} index ({index.ntotal} vectors) "
+                    f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def _search_overrides(self) -> dict:
+        """Search-time knobs come from the current settings, not the ones the index was built with."""
+        return {"ef_search": self.params["ef_search"], "nprobe": self.params["nprobe"]}
+
+    def index_stale(self) -> bool:
+        self._refresh()
+        with self._lock:
+            self._load_index()
+            return bool(self.ids) and self._index_meta.get("fingerprint") != self._fingerprint
+
+    def build_index(self) -> dict:
+        """Builds the configured index over the stored vectors and persists it atomically."""
+        import faiss
+
+        self._refresh()
+        with self._lock:
+            ids, vectors, scales = self.ids, self.vectors, self.scales
+            fingerprint = self._fingerprint
+        if not ids:
+            return {}
+        matrix = dequantize(vectors, scales)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        started = time.perf_counter()
+        index = build_faiss_index(matrix, self.index_type, self.params)
+        build_seconds = time.perf_counter() - started
+
+        faiss.write_index(index, f"{self.index_path}.tmp")
+        os.replace(f"{self.index_path}.tmp", self.index_path)
+        meta = {"type": self.index_type, "params": self.params, "rows": len(ids), "fingerprint": fingerprint}
+        with open(f"{self.index_meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{self.index_meta_path}.tmp", self.index_meta_path)
+        self._warned_stale = False
+
+        stats = {
+            "type": self.index_type,
+            "rows": len(ids),
+            "build_seconds": round(build_seconds, 3),
+            "index_bytes": os.path.getsize(self.index_path),
+        }
+        logger.info(f"Built FAISS {self.index_type} index: {stats['rows']} vectors, "
+                    f"{stats['index_bytes'] / 1024:.1f} KB in {build_seconds:.2f}s")
+        return stats
+
+    def search_by_vectors(self, vectors, k, families=None):
+        if families:
+            # A family is a small slice of the corpus: exact search over its rows beats post-filtering ANN hits
+            return self.exact_search_by_vectors(vectors, k, families)
+        self._refresh()
+        with self._lock:
+            self._load_index()
+            index, ids = self._index, self.ids
+            fresh = index is not None and self._index_meta.get("fingerprint") == self._fingerprint
+        if not fresh:
+            if ids and not self._warned_stale:
+                self._warned_stale = True
+                logger.warning("FAISS index missing or out of date; using exact search until it is rebuilt "
+                               "(python -m src.rag.build_index).")
+            return self.exact_search_by_vectors(vectors, k)
+
+        rows = [i for i, vector in enumerate(vectors) if len(vector)]
+        hits = [[] for _ in vectors]
+        if not ids or not rows:
+            return hits
+        queries = np.asarray([vectors[i] for i in rows], dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores, found = index.search(queries, min(k, len(ids)))
+        for i, row_scores, row_ids in zip(rows, scores, found):
+            hits[i] = [(ids[j], float(score)) for score, j in zip(row_scores, row_ids) if j >= 0]
+        return hits
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+from config.prompts import HISTORY_SUMMARY_PROMPT
+from config.settings import HISTORY_TOKEN_BUDGET, HISTORY_RECENT_TURNS, HISTORY_SUMMARY_MAX_TOKENS
+from src.llm.base import LLMProvider
+from src.logger import setup_logger
+from src.rag.tokens import count_tokens, truncate_tokens
+
+logger = setup_logger(__name__)
+
+SUMMARY_PREFIX = "Summary of earlier conversation: "
+
+
+def format_messages(messages: List[Dict[str, str]]) -> str:
+    """Formats chat messages as "User: ..." / "Assistant: ..." lines."""
+    formatted_history = ""
+    for message in messages:
+        role = "User" if message["role"] == "user" else "Assistant"
+        formatted_history += f"{role}: {message['content']}\n"
+    return formatted_history
+
+
+class ChatHistoryManager:
+    """
+    Keeps prompt history within a token budget. The last N turns stay verbatim, fewer if they do
+    not fit beside the summary; older turns are folded into a rolling summary that is updated
+    incrementally. Summaries are cached by a hash of the message prefix they cover, so each
+    session's summary is extended, never recomputed.
+    """
+
+    def __init__(
+        self,
+        llm: LLMProvider,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        recent_turns: int = HISTORY_RECENT_TURNS,
+        summary_max_tokens: int = HISTORY_SUMMARY_MAX_TOKENS,
+        max_cached_summaries: int = 512,
+    ):
+        self.llm = llm
+        self.token_budget = token_budget
+        self.recent_messages = recent_turns * 2
+        self.summary_max_tokens = summary_max_tokens
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prefix_hashes(messages: List[Dict[str, str]]) -> List[str]:
+        """hashes[i] identifies messages[:i]."""
+        hashes = [hashlib.sha256(b"").hexdigest()]
+        for message in messages:
+            digest = hashlib.sha256(hashes[-1].encode("utf-8"))
+            digest.update(f"{message['role']}\0{message['content']}".encode("utf-8"))
+            hashes.append(digest.hexdigest())
+        return hashes
+
+    def _summarize(self, summary: str, new_messages: List[Dict[str, str]]) -> str:
+        prompt = HISTORY_SUMMARY_PROMPT.format(
+            max_words=int(self.summary_max_tokens * 0.75),
+            summary=summary or "(none)",
+            new_lines=format_messages(new_messages),
+        )
+        return truncate_tokens(self.llm.generate(prompt).strip(), self.summary_max_tokens)
+
+    def _summary_for(self, messages: List[Dict[str, str]], cutoff: int) -> str:
+        """Returns the summary of messages[:cutoff], extending the longest cached prefix summary."""
+        hashes = self._prefix_hashes(messages[:cutoff])
+        with self._lock:
+            start, summary = 0, ""
+            for i in range(cutoff, 0, -1):
+                if hashes[i] in self._summaries:
+                    start, summary = i, self._summaries[hashes[i]]
+                    self._summaries.move_to_end(hashes[i])
+                    break
+        if start == cutoff:
+            return summary
+
+        logger.info(f"Summarizing {cutoff - start} older messages into the rolling history summary...")
+        try:
+            summary = self._summarize(summary, messages[start:cutoff])
+        except Exception as e:
+            # Not cached, so the next turn retries from the last good summary
+            logger.warning(f"History summarization failed, keeping previous summary: {e}")
+            return summary
+        with self._lock:
+            self._summaries[hashes[cutoff]] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def format(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Formats history for a prompt. History that fits the budget is returned verbatim;
+        otherwise older turns are replaced by the rolling summary, and recent turns that still do
+        not fit are folded in too. A last message too long for the budget on its own is cut down
+        to its most recent tokens.
+        """
+        full = format_messages(messages)
+        full_tokens = count_tokens(full)
+        if full_tokens <= self.token_budget:
+            return full
+
+        # Keep as many recent messages verbatim as fit beside a full-length summary
+        available = self.token_budget - self.summary_max_tokens - count_tokens(SUMMARY_PREFIX)
+        message_tokens = [count_tokens(format_messages([message])) for message in messages]
+        cutoff = max(0, len(messages) - self.recent_messages)
+        while cutoff < len(messages) - 1 and sum(message_tokens[cutoff:]) > available:
+            cutoff += 1
+
+        summary = ""
+        if cutoff:
+            summary = truncate_tokens(f"{SUMMARY_PREFIX}{self._summary_for(messages, cutoff)}\n", self.token_budget)
+        recent = truncate_tokens(format_messages(messages[cutoff:]), self.token_budget - count_tokens(summary),
+                                keep_end=True)
+        managed = summary + recent
+        logger.info(f"Chat history tokens: {full_tokens} -> {count_tokens(managed)} "
+                    f"({cutoff} older messages summarized)")
+        return managed
@@ -1,40 +1,77 @@
 
 import os
+import time
 import argparse
 from src.rag.vector_store import VectorStoreManager
 from src.rag.embeddings import get_embedding_function
-from config.settings import VECTOR_DB_DIR
+from src.rag.manifest import IngestionManifest
+from src.rag.pipeline import IngestionPipeline
+from src.rag.router import FAMILY_RULES_REVISION
+from config.settings import VECTOR_DB_DIR, INGEST_MANIFEST_PATH, CHUNK_SIZE, CHUNK_OVERLAP
 from src.logger import setup_logger
 
 logger = setup_logger(__name__)
 
-def ingest_data(docs_dir: str):
+def ingest_data(docs_dir: str, full_rebuild: bool = False):
     """
-    Ingests PDF documents from the specified directory into the vector store.
+    Incrementally ingests PDF documents from the specified directory into the vector store.
+    Only new or changed files are parsed and embedded (through the streaming pipeline);
+    chunks of removed files are deleted.
     """
     if not os.path.exists(docs_dir):
         logger.error(f"Documents directory '{docs_dir}' not found.")
         return
 
+    start_time = time.time()
     logger.info("Initializing embedding model...")
     embeddings = get_embedding_function()
     
     logger.info("Initializing vector store manager...")
     vs_manager = VectorStoreManager(embeddings)
 
-    logger.info(f"Loading and splitting documents from {docs_dir}...")
-    documents = vs_manager.load_and_split_documents(docs_dir)
-    
-    if documents:
-        logger.info(f"Adding {len(documents)} chunks to the vector store...")
-        vs_manager.populate_vector_store(documents)
-        logger.info("Data ingestion completed successfully.")
+    manifest = IngestionManifest(INGEST_MANIFEST_PATH)
+    # A new family-tagging revision re-ingests every file so its chunks carry the new tags
+    chunk_params = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "families": FAMILY_RULES_REVISION}
+    changes = manifest.diff(docs_dir, chunk_params)
+    if full_rebuild:
+        # Diff first so chunks of deleted files are still removed, then re-ingest everything else
+        changes.changed += changes.unchanged
+        changes.unchanged = []
+    logger.info(f"Ingestion plan for {docs_dir}: {changes.summary()}")
+
+    for source in changes.removed:
+        logger.info(f"Removing chunks of deleted file: {source}")
+        vs_manager.delete_chunks(manifest.remove(source))
+        manifest.save()
+
+    def on_source_done(source, ids):
+        manifest.record(source, ids, chunk_params)
+        manifest.save()
+
+    pipeline = IngestionPipeline(vs_manager, on_source_done=on_source_done)
+    summary = pipeline.run(changes.to_ingest) if changes.to_ingest else {"synced": [], "failed": []}
+
+    manifest.save()
+    if changes.to_ingest:
+        logger.info(pipeline.report())
+    if changes.to_ingest or changes.removed or not os.path.exists(vs_manager.keyword_index_path):
+        vs_manager.rebuild_keyword_index()
+    if changes.to_ingest or changes.removed or vs_manager.backend.index_stale():
+        vs_manager.backend.build_index()
+    if hasattr(embeddings, "stats"):
+        logger.info(f"Embedding cache stats: {embeddings.stats()}")
+    if summary["failed"]:
+        logger.warning(f"Files with failures (retried next run): {summary['failed']}")
+    if changes.to_ingest or changes.removed:
+        logger.info(f"Data ingestion completed: {len(summary['synced'])} files synced "
+                    f"in {time.time() - start_time:.2f}s.")
     else:
-        logger.warning("No documents were processed.")
+        logger.info("Vector store already up to date; nothing to ingest.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest PDF documents into Chroma Vector Store.")
     parser.add_argument("--docs-dir", type=str, default="AirIndia", help="Path to the directory containing PDF documents.")
+    parser.add_argument("--full", action="store_true", help="Re-ingest every PDF, even unchanged ones.")
     args = parser.parse_args()
     
-    ingest_data(args.docs_dir)
+    ingest_data(args.docs_dir, full_rebuild=args.full)
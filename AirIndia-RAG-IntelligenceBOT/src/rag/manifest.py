@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Streams a file through SHA-256 without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_version(path: str) -> str:
+    """
+    Short fingerprint of the chunk IDs recorded in the manifest. It changes whenever
+    ingestion adds, updates or removes chunks, so it doubles as a corpus version for caches.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            files = json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return "empty"
+    digest = hashlib.sha256()
+    for source in sorted(files):
+        digest.update(source.encode("utf-8"))
+        digest.update("".join(files[source].get("chunk_ids", [])).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def scan_pdfs(directory: str) -> List[str]:
+    """Returns all PDF paths under a directory, in a stable order."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+@dataclass
+class ManifestChanges:
+    """Result of comparing the documents directory against the manifest."""
+    new: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def to_ingest(self) -> List[str]:
+        return self.new + self.changed
+
+    def summary(self) -> str:
+        return (f"{len(self.new)} new, {len(self.changed)} changed, "
+                f"{len(self.removed)} removed, {len(self.unchanged)} unchanged")
+
+
+class IngestionManifest:
+    """
+    Tracks which source files are in the vector store and which chunk IDs each one produced.
+    Entries are keyed by source path and record size, mtime, content hash and chunking parameters.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read ingestion manifest {path}, starting fresh: {e}")
+
+    def diff(self, directory: str, chunk_params: dict) -> ManifestChanges:
+        """Classifies PDFs as new/changed/unchanged and manifest entries as removed."""
+        changes = ManifestChanges()
+        current = scan_pdfs(directory)
+        for source in current:
+            entry = self.files.get(source)
+            if entry is None:
+                changes.new.append(source)
+                continue
+            if entry.get("chunk_params") != chunk_params:
+                changes.changed.append(source)
+                continue
+            stat = os.stat(source)
+            if stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]:
+                changes.unchanged.append(source)
+                continue
+            # Size/mtime differ: only the content hash decides whether it really changed
+            if file_sha256(source) == entry["sha256"]:
+                entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+                changes.unchanged.append(source)
+            else:
+                changes.changed.append(source)
+        current_set = set(current)
+        changes.removed = [source for source in self.files if source not in current_set]
+        return changes
+
+    def record(self, source: str, chunk_ids: List[str], chunk_params: dict):
+        stat = os.stat(source)
+        self.files[source] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_sha256(source),
+            "chunk_params": chunk_params,
+            "chunk_ids": chunk_ids,
+        }
+
+    def remove(self, source: str) -> List[str]:
+        """Forgets a source and returns the chunk IDs it owned."""
+        entry = self.files.pop(source, None)
+        return entry["chunk_ids"] if entry else []
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir and not os.path.exists(manifest_dir):
+            os.makedirs(manifest_dir)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
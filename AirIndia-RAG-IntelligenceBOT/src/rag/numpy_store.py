@@ -0,0 +1,326 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from config.settings import NUMPY_STORE_DTYPE
+from src.logger import setup_logger
+from src.rag.vector_backends import VectorBackend
+
+logger = setup_logger(__name__)
+
+SUPPORTED_DTYPES = ("float16", "int8")
+
+
+def quantize(vectors, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    L2-normalizes rows (so a dot product is cosine similarity) and stores them as float16, or as
+    int8 with one float32 scale per row (symmetric quantization: row ~= int8_row * scale).
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported NumPy store dtype: {dtype}")
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def dequantize(vectors: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Inverse of quantize (up to rounding): float32 rows."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix if scales is None else matrix * np.asarray(scales, dtype=np.float32)[:, None]
+
+
+def exact_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, without sorting the whole array."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class NumpyBackend(VectorBackend):
+    """
+    In-process exact vector search over memory-mapped float16 / int8 matrices. Chunk text and
+    metadata live in a JSONL side file whose rows line up with the matrix rows. Loading is an
+    mmap plus reading the side file; search is a blocked matrix-vector product and argpartition.
+    A commit rewrites every file atomically, so inside `deferred_writes()` (ingestion runs in
+    one) upserts and deletes are buffered in memory and committed once when the block ends;
+    outside it every call commits.
+    """
+
+    name = "numpy"
+
+    def __init__(self, embedding_function, persist_directory: str, collection_name: str,
+                 dtype: str = NUMPY_STORE_DTYPE, block_rows: int = 4096):
+        super().__init__(embedding_function)
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported NumPy store dtype: {dtype}")
+        self.dtype = dtype
+        self.block_rows = block_rows
+        self.path = os.path.join(persist_directory, f"{collection_name}_{self.name}")
+        self.vectors_path = os.path.join(self.path, "vectors.npy")
+        self.scales_path = os.path.join(self.path, "scales.npy")
+        self.chunks_path = os.path.join(self.path, "chunks.jsonl")
+        self._lock = threading.RLock()
+        self._stamp = None
+        # Buffered writes: new row batches, stored IDs they replace or delete, and whether the
+        # in-memory rows are ahead of the files
+        self._pending: List[tuple] = []
+        self._dropped = set()
+        self._dirty = False
+        self._defer_depth = 0
+        self._clear()
+        self._refresh()
+
+    def _clear(self):
+        self._set_rows([], [], [], None, None)
+
+    def _set_rows(self, ids: List[str], texts: List[str], metadatas: List[dict],
+                  vectors: Optional[np.ndarray], scales: Optional[np.ndarray]):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self._rows = {doc_id: i for i, doc_id in enumerate(ids)}
+        self.families = np.asarray([metadata.get("family", "") for metadata in metadatas], dtype=object)
+        self.vectors = vectors
+        self.scales = scales
+
+    def _unsaved(self) -> bool:
+        return bool(self._pending or self._dropped or self._dirty)
+
+    def _refresh(self):
+        """Applies buffered writes, or (re)loads the store when the side file changed on disk."""
+        if self._unsaved():
+            with self._lock:
+                self._materialize()
+            return
+        self._reload()
+
+    def _reload(self):
+        """(Re)loads the store when the side file changed, e.g. after ingestion in another process."""
+        try:
+            stat = os.stat(self.chunks_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp is None:
+                self._clear()
+            elif not self._load():
+                return
+            self._stamp = stamp
+
+    def _load(self) -> bool:
+        started = time.perf_counter()
+        with open(self.chunks_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            rows = [json.loads(line) for line in f]
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+        scales = np.load(self.scales_path, mmap_mode="r") if header["dtype"] == "int8" else None
+        if vectors.shape[0] != len(rows):
+            logger.warning(f"NumPy store at {self.path} is mid-write ({vectors.shape[0]} vectors, "
+                           f"{len(rows)} rows); keeping the previous snapshot")
+            return False
+        if header["dtype"] != self.dtype:
+            logger.warning(f"NumPy store holds {header['dtype']} vectors; NUMPY_STORE_DTYPE={self.dtype} "
+                           f"applies after the next full ingestion")
+        self.dtype = header["dtype"]
+        self._set_rows([row["id"] for row in rows], [row["text"] for row in rows],
+                       [row["metadata"] for row in rows], vectors, scales)
+        logger.info(f"Loaded NumPy vector store: {len(rows)} x {vectors.shape[1] if vectors.ndim == 2 else 0} "
+                    f"{self.dtype} ({self.size_bytes() / 1024:.1f} KB) "
+                    f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return True
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(p) for p in (self.vectors_path, self.scales_path, self.chunks_path)
+                   if os.path.exists(p))
+
+    def _save(self, ids, texts, metadatas, vectors, scales):
+        os.makedirs(self.path, exist_ok=True)
+
+        def replace_npy(path, array):
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{path}.tmp", path)
+
+        # The side file goes last: readers treat it as the commit point of a write
+        replace_npy(self.vectors_path, vectors)
+        if scales is not None:
+            replace_npy(self.scales_path, scales)
+        elif os.path.exists(self.scales_path):
+            os.remove(self.scales_path)
+        with open(f"{self.chunks_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"dtype": self.dtype, "rows": len(ids)}) + "\n")
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+        os.replace(f"{self.chunks_path}.tmp", self.chunks_path)
+        self._stamp = None
+        self._reload()
+
+    def _keep_rows(self, drop: set) -> List[int]:
+        return [i for i, doc_id in enumerate(self.ids) if doc_id not in drop]
+
+    def _materialize(self):
+        """Folds the buffered batches and deletions into the in-memory rows (not yet the files)."""
+        if not (self._pending or self._dropped):
+            return
+        keep = self._keep_rows(self._dropped)
+        ids = [self.ids[i] for i in keep]
+        texts = [self.texts[i] for i in keep]
+        metadatas = [self.metadatas[i] for i in keep]
+        vectors = [np.asarray(self.vectors[keep])] if keep else []
+        scales = [np.asarray(self.scales[keep])] if keep and self.scales is not None else []
+        for batch_ids, batch_texts, batch_metadatas, batch_vectors, batch_scales in self._pending:
+            ids += batch_ids
+            texts += batch_texts
+            metadatas += batch_metadatas
+            vectors.append(batch_vectors)
+            if batch_scales is not None:
+                scales.append(batch_scales)
+        vectors = np.concatenate(vectors) if vectors else None
+        scales = np.concatenate(scales) if scales else None
+        last = {doc_id: i for i, doc_id in enumerate(ids)}
+        if len(last) < len(ids):
+            # An ID upserted twice while buffered keeps its latest row
+            rows = sorted(last.values())
+            ids, texts, metadatas = [ids[i] for i in rows], [texts[i] for i in rows], [metadatas[i] for i in rows]
+            vectors = vectors[rows]
+            scales = None if scales is None else scales[rows]
+        self._set_rows(ids, texts, metadatas, vectors, scales)
+        self._pending, self._dropped = [], set()
+        self._dirty = True
+
+    def flush(self):
+        """Commits buffered writes to disk with one atomic rewrite."""
+        with self._lock:
+            self._materialize()
+            if not self._dirty:
+                return
+            self._dirty = False
+            if self.ids:
+                self._save(self.ids, self.texts, self.metadatas, np.asarray(self.vectors),
+                           None if self.scales is None else np.asarray(self.scales))
+                return
+            for path in (self.chunks_path, self.vectors_path, self.scales_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._reload()
+
+    @contextmanager
+    def deferred_writes(self) -> Iterator[bool]:
+        with self._lock:
+            self._defer_depth += 1
+        try:
+            yield True
+        finally:
+            with self._lock:
+                self._defer_depth -= 1
+                if not self._defer_depth:
+                    self.flush()
+
+    def upsert(self, ids, texts, metadatas, embeddings):
+        if not ids:
+            return
+        if not self._unsaved():
+            self._reload()
+        with self._lock:
+            vectors, scales = quantize(embeddings, self.dtype)
+            self._dropped.update(set(ids) & set(self._rows))
+            self._pending.append((list(ids), list(texts), [dict(m) for m in metadatas], vectors, scales))
+            if not self._defer_depth:
+                self.flush()
+
+    def delete(self, ids):
+        if not self._unsaved():
+            self._reload()
+        with self._lock:
+            drop = set(ids)
+            self._dropped.update(drop & set(self._rows))
+            for n, (batch_ids, batch_texts, batch_metadatas, batch_vectors, batch_scales) in enumerate(self._pending):
+                rows = [i for i, doc_id in enumerate(batch_ids) if doc_id not in drop]
+                if len(rows) < len(batch_ids):
+                    self._pending[n] = ([batch_ids[i] for i in rows], [batch_texts[i] for i in rows],
+                                        [batch_metadatas[i] for i in rows], batch_vectors[rows],
+                                        None if batch_scales is None else batch_scales[rows])
+            if not self._defer_depth:
+                self.flush()
+
+    def ids_for_source(self, source):
+        self._refresh()
+        with self._lock:
+            return [doc_id for doc_id, metadata in zip(self.ids, self.metadatas) if metadata.get("source") == source]
+
+    def iter_texts(self, page_size=1000):
+        self._refresh()
+        with self._lock:
+            pairs = list(zip(self.ids, self.texts))
+        yield from pairs
+
+    def iter_records(self, page_size=1000):
+        self._refresh()
+        with self._lock:
+            ids, texts, metadatas, stored, scales = self.ids, self.texts, self.metadatas, self.vectors, self.scales
+        for start in range(0, len(ids), page_size):
+            end = start + page_size
+            yield (ids[start:end], texts[start:end], metadatas[start:end],
+                   dequantize(stored[start:end], None if scales is None else scales[start:end]))
+
+    def get_documents(self, ids):
+        self._refresh()
+        with self._lock:
+            rows = [(doc_id, self._rows[doc_id]) for doc_id in ids if doc_id in self._rows]
+            return {
+                doc_id: Document(page_content=self.texts[i], metadata=dict(self.metadatas[i]), id=doc_id)
+                for doc_id, i in rows
+            }
+
+    def search_by_vector(self, vector, k, families=None):
+        return self.search_by_vectors([vector], k, families)[0]
+
+    def search_by_vectors(self, vectors, k, families=None):
+        return self.exact_search_by_vectors(vectors, k, families)
+
+    def exact_search_by_vectors(self, vectors, k, families=None) -> List[List[Tuple[str, float]]]:
+        """
+        Exact top-k over the stored vectors (also the ground truth for ANN subclasses). With
+        `families`, only the rows of those document families are read and scored.
+        """
+        self._refresh()
+        with self._lock:
+            ids, stored, scales, labels = self.ids, self.vectors, self.scales, self.families
+        rows = [i for i, vector in enumerate(vectors) if len(vector)]
+        hits = [[] for _ in vectors]
+        if not ids or stored is None or not rows:
+            return hits
+        candidates = np.flatnonzero(np.isin(labels, list(families))) if families else None
+        candidate_ids = ids if candidates is None else [ids[j] for j in candidates]
+        queries = np.asarray([vectors[i] for i in rows], dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        # Blocked so only block_rows rows are ever converted to float32 at once; every block
+        # is scored against all queries in one matrix product
+        scores = np.empty((len(candidate_ids), len(rows)), dtype=np.float32)
+        for start in range(0, len(candidate_ids), self.block_rows):
+            window = slice(start, start + self.block_rows)
+            block = np.asarray(stored[window if candidates is None else candidates[window]], dtype=np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+        if scales is not None:
+            scores *= (scales if candidates is None else scales[candidates])[:, None]
+        for column, i in enumerate(rows):
+            hits[i] = [(candidate_ids[j], float(scores[j, column])) for j in exact_top_k(scores[:, column], k)]
+        return hits
+
+    def count(self):
+        self._refresh()
+        return len(self.ids)
@@ -0,0 +1,245 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+from config.settings import PDF_CACHE_DIR, PDF_CACHE_MAX_MB
+from src.logger import setup_logger
+from src.rag.manifest import file_sha256
+
+logger = setup_logger(__name__)
+
+ENTRY_SUFFIX = ".jsonl.gz"
+# Bump when parse_page_range changes what it extracts
+EXTRACTION_REVISION = 1
+
+Page = Tuple[str, dict]
+
+
+@lru_cache(maxsize=1)
+def parser_version() -> str:
+    import pypdf
+    return f"pypdf-{pypdf.__version__}-r{EXTRACTION_REVISION}"
+
+
+def parse_page_range(path: str, start: int, end: int) -> List[Page]:
+    """Extracts pages [start, end) of a PDF. Runs inside a worker process during ingestion."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    total_pages = len(reader.pages)
+    labels = reader.page_labels
+    pages = []
+    for index in range(start, min(end, total_pages)):
+        metadata = {
+            "source": path,
+            "total_pages": total_pages,
+            "page": index,
+            "page_label": labels[index] if index < len(labels) else str(index + 1),
+        }
+        pages.append((reader.pages[index].extract_text(), metadata))
+    return pages
+
+
+class EntryWriter:
+    """Streams one PDF's pages into a temporary file that becomes the cache entry on commit."""
+
+    def __init__(self, cache: "PdfTextCache", digest: str, source: str):
+        self.cache = cache
+        self.path = cache.entry_path(digest)
+        self.tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+        header = {"source": os.path.basename(source), "sha256": digest, "parser": parser_version(),
+                  "created": time.time()}
+        self._file.write(json.dumps(header) + "\n")
+        self.pages = 0
+
+    def append(self, pages: List[Page]):
+        for text, metadata in pages:
+            meta = {k: v for k, v in metadata.items() if k != "source"}
+            self._file.write(json.dumps({"text": text, "metadata": meta}) + "\n")
+        self.pages += len(pages)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        logger.debug(f"Cached extracted text of {self.pages} pages at {self.path}")
+        self.cache.enforce_cap()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class PdfTextCache:
+    """
+    Extracted PDF pages on disk. Each parsed PDF is one gzipped JSONL file named after its
+    content hash and the parser version (a header line, then one line per page), so
+    re-chunking and rebuilds read pages back instead of parsing the PDF again. Entries are
+    evicted least-recently-used first above the size cap.
+    """
+
+    def __init__(self, cache_dir: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def entry_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.{parser_version()}{ENTRY_SUFFIX}")
+
+    def lookup(self, path: str) -> Tuple[str, Optional[str]]:
+        """Returns (content digest, cache entry path or None). A hit refreshes the entry's LRU time."""
+        digest = file_sha256(path)
+        entry = self.entry_path(digest)
+        with self._lock:
+            if os.path.exists(entry):
+                self.hits += 1
+                os.utime(entry)
+                return digest, entry
+            self.misses += 1
+        return digest, None
+
+    def iter_pages(self, entry: str, source: str, batch_size: int = 16) -> Iterator[List[Page]]:
+        """Yields a cached PDF's pages in batches, with `source` as their source path."""
+        batch = []
+        with gzip.open(entry, "rt", encoding="utf-8") as f:
+            next(f)  # header
+            for line in f:
+                record = json.loads(line)
+                batch.append((record["text"], dict(record["metadata"], source=source)))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def load(self, path: str) -> List[Page]:
+        """All pages of a PDF, read from the cache or parsed (and then cached)."""
+        digest, entry = self.lookup(path)
+        if entry:
+            try:
+                return [page for batch in self.iter_pages(entry, path) for page in batch]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Discarding unreadable PDF cache entry {entry}: {e}")
+                self.remove(entry)
+        pages = parse_page_range(path, 0, 2 ** 31)
+        writer = self.writer(digest, path)
+        writer.append(pages)
+        writer.commit()
+        return pages
+
+    def writer(self, digest: str, source: str) -> EntryWriter:
+        return EntryWriter(self, digest, source)
+
+    def remove(self, entry: str):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def entries(self) -> List[dict]:
+        """Every entry's header with its size, page count and last use, most recently used first."""
+        result = []
+        for name in self._entry_names():
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    header = json.loads(next(f))
+                    pages = sum(1 for _ in f)
+                stat = os.stat(path)
+            except (OSError, ValueError, StopIteration):
+                header, pages, stat = {"source": "?", "parser": "unreadable"}, 0, None
+            result.append(dict(header, file=name, pages=pages, bytes=stat.st_size if stat else 0,
+                               last_used=stat.st_mtime if stat else 0.0))
+        return sorted(result, key=lambda e: e["last_used"], reverse=True)
+
+    def _entry_names(self) -> List[str]:
+        try:
+            return [n for n in os.listdir(self.cache_dir) if n.endswith(ENTRY_SUFFIX)]
+        except OSError:
+            return []
+
+    def prune(self, max_bytes: Optional[int] = None, keep_other_parsers: bool = False) -> int:
+        """
+        Deletes entries written by other parser versions (unless kept), then least-recently-used
+        entries until the cache fits in `max_bytes`. Returns the number of entries removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        current = f".{parser_version()}{ENTRY_SUFFIX}"
+        removed = 0
+        sized = []
+        with self._lock:
+            for name in self._entry_names():
+                path = os.path.join(self.cache_dir, name)
+                if not keep_other_parsers and not name.endswith(current):
+                    self.remove(path)
+                    removed += 1
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                sized.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in sized)
+            for _, size, path in sorted(sized):
+                if total <= max_bytes:
+                    break
+                self.remove(path)
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} PDF text cache entries ({total / (1024 * 1024):.1f} MB left)")
+        return removed
+
+    def enforce_cap(self):
+        """LRU eviction back under the size cap; entries of other parser versions are left to `prune`."""
+        self.prune(keep_other_parsers=True)
+
+    def clear(self) -> int:
+        names = self._entry_names()
+        for name in names:
+            self.remove(os.path.join(self.cache_dir, name))
+        return len(names)
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {
+            "entries": len(entries),
+            "pages": sum(e["pages"] for e in entries),
+            "bytes": sum(e["bytes"] for e in entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or prune the extracted PDF text cache.")
+    parser.add_argument("command", choices=["list", "prune", "clear"])
+    parser.add_argument("--cache-dir", type=str, default=PDF_CACHE_DIR, help="Cache directory.")
+    parser.add_argument("--max-mb", type=float, default=PDF_CACHE_MAX_MB, help="Size cap applied by prune.")
+    args = parser.parse_args()
+
+    cache = PdfTextCache(args.cache_dir, int(args.max_mb * 1024 * 1024))
+    if args.command == "list":
+        entries = cache.entries()
+        current = parser_version()
+        for e in entries:
+            stale = "" if e.get("parser") == current else "  (other parser)"
+            print(f"{e['source'][:60]:<60} {e['pages']:>5} pages {e['bytes'] / 1024:>9.1f} KB  "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(e['last_used']))}  "
+                  f"{e.get('parser', '?')}{stale}")
+        total = sum(e["bytes"] for e in entries)
+        print(f"{len(entries)} entries, {total / (1024 * 1024):.1f} MB of {args.max_mb:g} MB cap in {args.cache_dir}")
+    elif args.command == "prune":
+        print(f"Removed {cache.prune()} entries")
+    else:
+        print(f"Removed {cache.clear()} entries")
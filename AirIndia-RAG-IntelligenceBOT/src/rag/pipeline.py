@@ -0,0 +1,337 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config.settings import (
+    CHUNK_SIZE, CHUNK_OVERLAP, INGEST_PARSE_WORKERS, INGEST_PAGES_PER_TASK,
+    INGEST_EMBED_BATCH_SIZE, INGEST_QUEUE_SIZE, PDF_CACHE_ENABLED, PDF_CACHE_DIR
+)
+from src.logger import setup_logger
+from src.rag.pdf_cache import PdfTextCache, parse_page_range
+from src.rag.router import document_family
+from src.rag.vector_store import VectorStoreManager, chunk_id
+
+logger = setup_logger(__name__)
+
+_DONE = object()
+
+
+def plan_tasks(paths: Iterable[str], pages_per_task: int) -> Tuple[List[Tuple[str, int, int, bool]], List[str]]:
+    """
+    Splits each PDF into page-range tasks: (path, start, end, is_last_range_of_file). Also
+    returns the PDFs that could not be opened.
+    """
+    from pypdf import PdfReader
+
+    tasks, unreadable = [], []
+    for path in paths:
+        try:
+            total_pages = len(PdfReader(path).pages)
+        except Exception as e:
+            logger.error(f"Failed to open {path}: {e}")
+            unreadable.append(path)
+            continue
+        starts = list(range(0, total_pages, pages_per_task)) or [0]
+        for start in starts:
+            tasks.append((path, start, start + pages_per_task, start == starts[-1]))
+    return tasks, unreadable
+
+
+class StageStats:
+    """Counts items and busy time for one pipeline stage."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.busy += seconds
+
+    def report(self, wall: float) -> str:
+        rate = self.items / wall if wall > 0 else 0.0
+        return (f"{self.name:<8} {self.items:>7} {self.unit:<7} "
+                f"busy {self.busy:7.2f}s  {rate:8.1f} {self.unit}/s")
+
+
+class IngestionPipeline:
+    """
+    Streaming parse -> split -> embed -> upsert pipeline.
+
+    PDFs are parsed page range by page range in a process pool, and every stage runs in its
+    own thread connected by bounded queues, so memory stays flat however large the corpus is.
+    Extracted pages are streamed into the PDF text cache; PDFs already in it are read back
+    from there without being parsed.
+    Markers flow through the queues behind each file's last chunk; when the upsert stage sees
+    one it deletes the file's stale chunks and calls `on_source_done`. Backends that buffer
+    writes commit once at the end of the run, and `on_source_done` is then called only after
+    that commit, so nothing is reported done before it is on disk.
+    """
+
+    def __init__(
+        self,
+        vs_manager: VectorStoreManager,
+        parse_workers: int = INGEST_PARSE_WORKERS,
+        pages_per_task: int = INGEST_PAGES_PER_TASK,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        on_source_done: Optional[Callable[[str, List[str]], None]] = None,
+        pdf_cache: Optional[PdfTextCache] = None,
+        use_pdf_cache: bool = PDF_CACHE_ENABLED,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+    ):
+        self.vs_manager = vs_manager
+        if pdf_cache is None and use_pdf_cache:
+            pdf_cache = PdfTextCache(PDF_CACHE_DIR)
+        self.pdf_cache = pdf_cache
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+        self.on_source_done = on_source_done
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            add_start_index=True
+        )
+        self.stats = {
+            "parse": StageStats("parse", "pages"),
+            "split": StageStats("split", "chunks"),
+            "embed": StageStats("embed", "chunks"),
+            "upsert": StageStats("upsert", "chunks"),
+        }
+        self.cached_pages = 0
+        self.wall_time = 0.0
+        self._errors: List[BaseException] = []
+        self._writes_deferred = False
+        self._done: List[Tuple[str, List[str]]] = []
+
+    # -- stages -------------------------------------------------------------
+
+    def _replay_cached(self, cached: Dict[str, str], out_q: queue.Queue) -> List[str]:
+        """Emits the pages of PDFs found in the text cache; returns those whose entry was unreadable."""
+        unreadable = []
+        for path, entry in cached.items():
+            started = time.time()
+            try:
+                for pages in self.pdf_cache.iter_pages(entry, path, self.pages_per_task):
+                    self.stats["parse"].add(len(pages), time.time() - started)
+                    self.cached_pages += len(pages)
+                    out_q.put(("pages", pages))
+                    started = time.time()
+            except (OSError, ValueError, KeyError) as e:
+                # Pages already emitted are deduplicated by chunk ID when the PDF is parsed again
+                logger.warning(f"Discarding unreadable PDF cache entry for {path}: {e}")
+                self.pdf_cache.remove(entry)
+                unreadable.append(path)
+                continue
+            out_q.put(("end", path))
+        return unreadable
+
+    def _parse_stage(self, paths: List[str], cached: Dict[str, str], digests: Dict[str, str], out_q: queue.Queue):
+        """
+        Replays cached PDFs, then keeps a bounded window of page-range futures in flight and
+        emits results in order, writing each fully parsed PDF to the text cache.
+        """
+        paths = paths + self._replay_cached(cached, out_q)
+        tasks, unreadable = plan_tasks(paths, self.pages_per_task)
+        for path in unreadable:
+            out_q.put(("failed", path))
+            out_q.put(("end", path))
+        writers = {}
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            pending = deque()
+            task_iter = iter(tasks)
+            window = self.parse_workers * 2
+            while True:
+                while len(pending) < window:
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    path, start, end, last = task
+                    pending.append((path, last, time.time(), pool.submit(parse_page_range, path, start, end)))
+                if not pending:
+                    break
+                path, last, submitted, future = pending.popleft()
+                if self.pdf_cache is not None and path not in writers:
+                    writers[path] = self.pdf_cache.writer(digests[path], path)
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to parse {path}: {e}")
+                    out_q.put(("failed", path))
+                    pages = []
+                    if writers.get(path) is not None:
+                        writers[path].discard()
+                        writers[path] = None
+                self.stats["parse"].add(len(pages), time.time() - submitted)
+                if pages:
+                    if writers.get(path) is not None:
+                        writers[path].append(pages)
+                    out_q.put(("pages", pages))
+                if last:
+                    if writers.get(path) is not None:
+                        writers.pop(path).commit()
+                    out_q.put(("end", path))
+
+    def _split_stage(self, in_q: queue.Queue, out_q: queue.Queue, existing: Dict[str, set]):
+        batch: List[Tuple[str, Document]] = []
+        source_ids: Dict[str, Dict[str, None]] = {}  # insertion-ordered sets
+
+        def flush():
+            if batch:
+                out_q.put(("chunks", list(batch)))
+                batch.clear()
+
+        for kind, payload in self._consume(in_q):
+            if kind == "pages":
+                started = time.time()
+                docs = [Document(page_content=text, metadata=dict(meta, family=document_family(meta["source"])))
+                        for text, meta in payload]
+                chunks = self.splitter.split_documents(docs)
+                for chunk in chunks:
+                    cid = chunk_id(chunk)
+                    ids = source_ids.setdefault(chunk.metadata["source"], {})
+                    if cid in ids:
+                        continue
+                    ids[cid] = None
+                    # Chunks already stored under the same content-derived ID need no re-embedding
+                    if cid not in existing.get(chunk.metadata["source"], ()):
+                        batch.append((cid, chunk))
+                self.stats["split"].add(len(chunks), time.time() - started)
+                if len(batch) >= self.embed_batch_size:
+                    flush()
+            elif kind == "end":
+                flush()
+                out_q.put(("end", (payload, list(source_ids.pop(payload, {})))))
+            else:
+                out_q.put((kind, payload))
+        flush()
+
+    def _embed_stage(self, in_q: queue.Queue, out_q: queue.Queue):
+        embeddings = self.vs_manager.embedding_function
+        for kind, payload in self._consume(in_q):
+            if kind != "chunks":
+                out_q.put((kind, payload))
+                continue
+            started = time.time()
+            vectors = embeddings.embed_documents([doc.page_content for _, doc in payload])
+            self.stats["embed"].add(len(payload), time.time() - started)
+            kept = [(cid, doc, vec) for (cid, doc), vec in zip(payload, vectors) if vec]
+            for source in {doc.metadata["source"] for (_, doc), vec in zip(payload, vectors) if not vec}:
+                out_q.put(("failed", source))
+            if kept:
+                out_q.put(("vectors", kept))
+
+    def _upsert_stage(self, in_q: queue.Queue, existing: Dict[str, set], summary: dict):
+        failed_sources = set()
+        for kind, payload in self._consume(in_q):
+            if kind == "vectors":
+                started = time.time()
+                self.vs_manager.upsert_embeddings(
+                    ids=[cid for cid, _, _ in payload],
+                    documents=[doc for _, doc, _ in payload],
+                    embeddings=[vec for _, _, vec in payload],
+                )
+                self.stats["upsert"].add(len(payload), time.time() - started)
+                logger.info(f"Upserted {self.stats['upsert'].items} chunks so far...")
+            elif kind == "failed":
+                failed_sources.add(payload)
+            elif kind == "end":
+                source, ids = payload
+                if source in failed_sources:
+                    logger.warning(f"{source} had failures; it will be retried on the next run.")
+                    summary["failed"].append(source)
+                    continue
+                keep = set(ids)
+                self.vs_manager.delete_chunks([i for i in existing.get(source, ()) if i not in keep])
+                summary["synced"].append(source)
+                if self._writes_deferred:
+                    self._done.append((source, ids))
+                elif self.on_source_done:
+                    self.on_source_done(source, ids)
+
+    # -- plumbing -----------------------------------------------------------
+
+    def _consume(self, in_q: queue.Queue):
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                return
+            yield item
+
+    def _run_stage(self, target, in_q: Optional[queue.Queue], out_q: Optional[queue.Queue], *args):
+        try:
+            target(*args)
+        except BaseException as e:
+            logger.error(f"Ingestion stage {target.__name__} failed: {e}", exc_info=True)
+            self._errors.append(e)
+            # Keep draining so upstream stages never block on a full queue
+            if in_q is not None:
+                for _ in self._consume(in_q):
+                    pass
+        finally:
+            if out_q is not None:
+                out_q.put(_DONE)
+
+    def run(self, paths: List[str]) -> dict:
+        """Ingests the given PDFs and returns which sources were synced or failed."""
+        started = time.time()
+        existing = {path: set(self.vs_manager.source_chunk_ids(path)) for path in paths}
+        cached, digests, to_parse = {}, {}, []
+        for path in paths:
+            if self.pdf_cache is None:
+                to_parse.append(path)
+                continue
+            digests[path], entry = self.pdf_cache.lookup(path)
+            if entry:
+                cached[path] = entry
+            else:
+                to_parse.append(path)
+        if cached:
+            logger.info(f"{len(cached)} of {len(paths)} PDFs found in the text cache; parsing {len(to_parse)}")
+        summary = {"synced": [], "failed": []}
+
+        pages_q = queue.Queue(maxsize=self.queue_size)
+        chunks_q = queue.Queue(maxsize=self.queue_size)
+        vectors_q = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._run_stage, name="ingest-parse",
+                             args=(self._parse_stage, None, pages_q, to_parse, cached, digests, pages_q)),
+            threading.Thread(target=self._run_stage, name="ingest-split",
+                             args=(self._split_stage, pages_q, chunks_q, pages_q, chunks_q, existing)),
+            threading.Thread(target=self._run_stage, name="ingest-embed",
+                             args=(self._embed_stage, chunks_q, vectors_q, chunks_q, vectors_q)),
+            threading.Thread(target=self._run_stage, name="ingest-upsert",
+                             args=(self._upsert_stage, vectors_q, None, vectors_q, existing, summary)),
+        ]
+        with self.vs_manager.deferred_writes() as deferred:
+            self._writes_deferred, self._done = deferred, []
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # The buffered writes are committed now
+        if self.on_source_done:
+            for source, ids in self._done:
+                self.on_source_done(source, ids)
+
+        self.wall_time = time.time() - started
+        if self._errors:
+            raise RuntimeError(f"Ingestion pipeline failed: {self._errors[0]}") from self._errors[0]
+        return summary
+
+    def report(self) -> str:
+        lines = [f"Ingestion pipeline finished in {self.wall_time:.2f}s "
+                 f"({self.parse_workers} parse workers, embed batch {self.embed_batch_size}, "
+                 f"{self.cached_pages} pages from the PDF text cache)"]
+        lines.extend(stat.report(self.wall_time) for stat in self.stats.values())
+        return "\n".join(lines)
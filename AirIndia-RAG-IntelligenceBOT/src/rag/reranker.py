@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional
+from langchain_core.documents import Document
+from config.settings import RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_N, RERANK_BUDGET_MS
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores over-fetched candidates with a small local cross-encoder in one batched CPU pass
+    and keeps the best few. Each call has a latency budget: if the predicted or actual scoring
+    time exceeds it, the candidates are returned in their original (vector) order instead.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        candidates: int = RERANK_CANDIDATES,
+        top_n: int = RERANK_TOP_N,
+        budget_ms: float = RERANK_BUDGET_MS,
+        model=None,
+    ):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.top_n = top_n
+        self.budget_ms = budget_ms
+        self._model = model
+        self._model_lock = threading.Lock()
+        # A single scoring thread: a pass that overruns its budget must not pile up behind others
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._busy = threading.Event()
+        self.ms_per_pair: Optional[float] = None  # EWMA of observed scoring cost
+        self.reranked = 0
+        self.fallbacks = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    logger.info(f"Loading cross-encoder reranker {self.model_name} on CPU...")
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def _score(self, query: str, docs: List[Document]) -> List[float]:
+        self._busy.set()
+        try:
+            started = time.time()
+            pairs = [(query, doc.page_content) for doc in docs]
+            scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            per_pair = (time.time() - started) * 1000 / len(pairs)
+            self.ms_per_pair = per_pair if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * per_pair
+            return [float(score) for score in scores]
+        finally:
+            self._busy.clear()
+
+    def _fallback(self, docs: List[Document], top_n: int, reason: str) -> List[Document]:
+        self.fallbacks += 1
+        logger.info(f"Rerank skipped ({reason}); using vector order.")
+        return docs[:top_n]
+
+    def rerank(self, query: str, docs: List[Document], top_n: Optional[int] = None) -> List[Document]:
+        """Returns the top_n documents by cross-encoder score, or vector order when over budget."""
+        top_n = top_n or self.top_n
+        if len(docs) <= 1:
+            return docs[:top_n]
+        if self._busy.is_set():
+            return self._fallback(docs, top_n, "reranker busy with an overrunning request")
+        if self.ms_per_pair is not None and self.ms_per_pair * len(docs) > self.budget_ms:
+            # Score only as many candidates as the budget allows
+            affordable = int(self.budget_ms / self.ms_per_pair)
+            if affordable < top_n:
+                return self._fallback(docs, top_n, f"predicted {self.ms_per_pair * len(docs):.0f}ms over budget")
+            docs = docs[:affordable]
+
+        started = time.time()
+        future = self._executor.submit(self._score, query, docs)
+        try:
+            # The first call also loads the model, so it is not held to the budget
+            timeout = None if self.ms_per_pair is None else self.budget_ms / 1000
+            scores = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return self._fallback(docs, top_n, f"exceeded {self.budget_ms:.0f}ms budget")
+        except Exception as e:
+            logger.error(f"Reranking failed: {e}")
+            return self._fallback(docs, top_n, "error")
+
+        ranked = [doc for _, doc in sorted(zip(scores, docs), key=lambda pair: pair[0], reverse=True)]
+        self.reranked += 1
+        logger.info(f"Reranked {len(docs)} candidates -> top {top_n} in {(time.time() - started) * 1000:.0f}ms")
+        return ranked[:top_n]
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import (
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_SIMILARITY
+)
+from src.logger import setup_logger
+from src.rag.embedding_cache import normalize_text
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    vector: Optional[np.ndarray]
+    response: str
+    sources: List[str]
+    created: float
+
+
+class ResponseCache:
+    """
+    Two-tier answer cache: an exact tier keyed by the normalized query and a near-duplicate
+    tier that matches on query-embedding cosine similarity. Entries expire after a TTL, the
+    least recently used entry is evicted at capacity, and everything is dropped when the
+    corpus version changes (i.e. after ingestion touches the collection).
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+    ):
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        # Query vectors computed by a missed get(), reused by the put() that usually follows
+        self._recent_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _embed(self, query: str, vector: Optional[Sequence[float]] = None) -> Optional[np.ndarray]:
+        if vector is None:
+            if self.embed_fn is None:
+                return None
+            try:
+                vector = self.embed_fn(query)
+            except Exception as e:
+                logger.warning(f"Could not embed query for response cache: {e}")
+                return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _check_version(self, version: str):
+        if version != self.version:
+            if self._entries:
+                logger.info(f"Corpus version changed ({self.version} -> {version}); clearing response cache.")
+            self._entries.clear()
+            self.version = version
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created > self.ttl_seconds
+
+    def get(self, query: str, version: str,
+            vector: Optional[Sequence[float]] = None) -> Optional[Tuple[str, List[str]]]:
+        """
+        Returns a cached (response, sources) for the query, or None on a miss. Pass the query's
+        embedding (from the same model as `embed_fn`) when the caller already has it.
+        """
+        key = normalize_text(query).lower()
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                logger.info(f"Response cache exact hit for: {query} ({self.stats_line()})")
+                return entry.response, list(entry.sources)
+
+        vector = self._embed(query, vector)
+        with self._lock:
+            if vector is not None:
+                self._recent_vectors[key] = vector
+                while len(self._recent_vectors) > 32:
+                    self._recent_vectors.popitem(last=False)
+            best_key, best_score = None, -1.0
+            if vector is not None:
+                for cached_key, cached in list(self._entries.items()):
+                    if self._expired(cached, now):
+                        del self._entries[cached_key]
+                        continue
+                    if cached.vector is None or cached.vector.shape != vector.shape:
+                        continue
+                    score = float(np.dot(vector, cached.vector))
+                    if score > best_score:
+                        best_key, best_score = cached_key, score
+            if best_key is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                entry = self._entries[best_key]
+                logger.info(f"Response cache semantic hit ({best_score:.3f}) for: {query} "
+                            f"-> {entry.query} ({self.stats_line()})")
+                return entry.response, list(entry.sources)
+            self.misses += 1
+            logger.info(f"Response cache miss for: {query} ({self.stats_line()})")
+            return None
+
+    def put(self, query: str, version: str, response: str, sources: List[str]):
+        key = normalize_text(query).lower()
+        with self._lock:
+            vector = self._recent_vectors.pop(key, None)
+        if vector is None:
+            vector = self._embed(query)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = CachedAnswer(query, vector, response, list(sources), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+    def stats_line(self) -> str:
+        stats = self.stats()
+        return (f"exact {stats['exact_hits']}, semantic {stats['semantic_hits']}, "
+                f"miss {stats['misses']}, hit ratio {stats['hit_ratio']:.1%}")
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from config.settings import ROUTER_MIN_SIMILARITY, ROUTER_MARGIN
+from src.logger import setup_logger
+from src.rag.bm25 import tokenize
+
+logger = setup_logger(__name__)
+
+GENERAL_FAMILY = "general"
+# Bump when DOCUMENT_FAMILIES changes how files are tagged; the next ingestion re-tags every file
+FAMILY_RULES_REVISION = 1
+
+# Per family: lowercase file-name fragments that tag a document, and query terms that route to it
+DOCUMENT_FAMILIES = {
+    "routes": {
+        "files": ("routes",),
+        "keywords": ("route", "routes", "destination", "destinations", "domestic", "international", "fly", "flies",
+                     "non-stop", "nonstop", "connectivity", "city", "cities", "network", "continents"),
+    },
+    "regulations": {
+        "files": ("regulation", "aiesl"),
+        "keywords": ("aiesl", "employee", "employees", "staff", "regulation", "regulations", "leave", "pay",
+                     "salary", "retirement", "gratuity", "disciplinary", "misconduct", "enquiry", "penalty",
+                     "promotion", "probation", "conduct", "increment", "suspension", "resignation"),
+    },
+    "fact_sheet": {
+        "files": ("fact sheet", "factsheet"),
+        "keywords": ("baggage", "luggage", "fleet", "aircraft", "seat", "seats", "cabin", "economy", "business",
+                     "premium", "lounge", "loyalty", "maharaja", "alliance", "partner", "partners", "interline",
+                     "codeshare", "inflight", "entertainment", "hub", "hubs", "founder", "founders", "founded"),
+    },
+    "history": {
+        "files": ("disaster", "crash", "accident"),
+        "keywords": ("history", "historical", "disaster", "disasters", "crash", "crashes", "accident", "accidents",
+                     "incident", "hijack", "hijacking", "bombing", "kanishka", "fatalities", "death", "killed",
+                     "nationalized", "nationalised"),
+    },
+}
+
+
+def document_family(source: str) -> str:
+    """The family a PDF belongs to, from its file name; unmatched files are "general"."""
+    name = os.path.basename(source).lower()
+    for family, rules in DOCUMENT_FAMILIES.items():
+        if any(fragment in name for fragment in rules["files"]):
+            return family
+    return GENERAL_FAMILY
+
+
+@dataclass
+class Route:
+    families: Optional[List[str]]  # None searches the whole collection
+    method: str  # "keyword", "embedding" or "all"
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def label(self) -> str:
+        return "+".join(self.families) if self.families else "all"
+
+
+class FamilyCentroids:
+    """Per-family mean of the stored (normalized) chunk embeddings: the router's classifier."""
+
+    def __init__(self):
+        self.sums: Dict[str, np.ndarray] = {}
+        self.counts: Counter = Counter()
+        self.untagged = 0
+
+    def add(self, metadatas: Sequence[dict], vectors):
+        labels = [(metadata or {}).get("family") for metadata in metadatas]
+        self.untagged += labels.count(None)
+        if not len(vectors):
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        for family in set(labels) - {None}:
+            rows = [i for i, label in enumerate(labels) if label == family]
+            self.sums[family] = self.sums.get(family, 0) + matrix[rows].sum(axis=0)
+            self.counts[family] += len(rows)
+
+    def save(self, path: str):
+        families = {
+            family: {"chunks": self.counts[family],
+                     "centroid": (total / max(float(np.linalg.norm(total)), 1e-12)).round(6).tolist()}
+            for family, total in sorted(self.sums.items())
+        }
+        payload = {"revision": FAMILY_RULES_REVISION, "untagged": self.untagged, "families": families}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+class QueryRouter:
+    """
+    Picks the document families a query should search, without an LLM call. Keyword rules
+    decide first; families tied on keyword matches are all searched. Queries without a keyword
+    match go to the family whose centroid is nearest the query embedding, plus any family within
+    `margin` of it. The query is not routed (every family is searched) when the centroids are
+    missing or stale, some chunks are untagged, or no family is a clear match.
+    """
+
+    def __init__(self, embedding_function, family_index_path: str,
+                 min_similarity: float = ROUTER_MIN_SIMILARITY, margin: float = ROUTER_MARGIN):
+        self.embedding_function = embedding_function
+        self.family_index_path = family_index_path
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.keywords = {family: set(rules["keywords"]) for family, rules in DOCUMENT_FAMILIES.items()}
+        self.families: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.decisions: Counter = Counter()
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> bool:
+        """(Re)loads the family centroids after ingestion rewrote them; False if routing is unavailable."""
+        try:
+            mtime = os.path.getmtime(self.family_index_path)
+        except OSError:
+            return False
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self.families, self.centroids = [], None
+                try:
+                    with open(self.family_index_path, "r", encoding="utf-8") as f:
+                        payload = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to load document family index: {e}")
+                    return False
+                if payload.get("revision") != FAMILY_RULES_REVISION or payload.get("untagged"):
+                    logger.warning(f"{payload.get('untagged', 0)} chunks lack a current document family; "
+                                   f"query routing is off until `make ingest` re-tags them")
+                    return False
+                self.families = list(payload["families"])
+                if self.families:
+                    self.centroids = np.asarray([payload["families"][f]["centroid"] for f in self.families],
+                                                dtype=np.float32)
+                logger.info(f"Query router loaded {len(self.families)} document families: "
+                            + ", ".join(f"{f} ({payload['families'][f]['chunks']} chunks)" for f in self.families))
+            return len(self.families) > 1
+
+    def _keyword_route(self, query: str) -> Optional[Route]:
+        terms = set(tokenize(query))
+        scores = {f: len(terms & self.keywords[f]) for f in self.families if f in self.keywords}
+        best = max(scores.values(), default=0)
+        if not best:
+            return None
+        return Route([f for f, score in scores.items() if score == best], "keyword", scores)
+
+    def _embedding_route(self, query: str, vector: Optional[Sequence[float]]) -> Route:
+        if vector is None:
+            vector = self.embedding_function.embed_query(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        if not vector.size:
+            return Route(None, "all")
+        similarities = self.centroids @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        scores = {f: round(float(s), 3) for f, s in zip(self.families, similarities)}
+        best = float(similarities.max())
+        chosen = [f for f, s in zip(self.families, similarities) if s >= best - self.margin]
+        if best < self.min_similarity or len(chosen) == len(self.families):
+            return Route(None, "all", scores)
+        return Route(chosen, "embedding", scores)
+
+    def route(self, query: str, vector: Optional[Sequence[float]] = None) -> Route:
+        """Routes a query; pass its embedding when the caller already has it so it is not embedded twice."""
+        started = time.perf_counter()
+        if not self._load():
+            return Route(None, "all")
+        route = self._keyword_route(query) or self._embedding_route(query, vector)
+        if route.families is not None:
+            if len(route.families) == len(self.families):
+                route.families = None
+            elif GENERAL_FAMILY in self.families and GENERAL_FAMILY not in route.families:
+                route.families.append(GENERAL_FAMILY)  # untyped documents stay searchable
+        with self._lock:
+            self.decisions[route.method] += 1
+        logger.info(f"Routed query to {route.label} by {route.method} in "
+                    f"{(time.perf_counter() - started) * 1000:.1f}ms (scores {route.scores})")
+        return route
+
+    def stats_line(self) -> str:
+        with self._lock:
+            decisions = dict(self.decisions)
+        total = sum(decisions.values())
+        routed = total - decisions.get("all", 0)
+        return (f"{routed}/{total} queries routed ({decisions.get('keyword', 0)} by keyword, "
+                f"{decisions.get('embedding', 0)} by embedding)")
+
+
+def evaluate_routing(manager, labeled: Dict[str, Sequence[str]], k: int = 3) -> dict:
+    """
+    Routing accuracy on labeled questions (a routed question is correct when it searches one of
+    its expected families), and routed vs. unrouted search latency and off-topic context tokens
+    (tokens of retrieved chunks outside the expected families).
+    """
+    from src.rag.tokens import count_tokens
+
+    router = manager.router or QueryRouter(manager.embedding_function, manager.family_index_path)
+    routed, correct, families_searched = 0, 0, []
+    latency = {"all": [], "routed": []}
+    off_topic = {"all": [], "routed": []}
+    manager.similarity_search(next(iter(labeled)), k=k, route=False)  # first call loads the indexes
+    for question, expected in labeled.items():
+        route = router.route(question)
+        if route.families is not None:
+            routed += 1
+            correct += bool(set(route.families) & set(expected))
+            families_searched.append(len(route.families))
+            if not set(route.families) & set(expected):
+                logger.warning(f"Misrouted to {route.label} (expected {'/'.join(expected)}): {question}")
+        for mode, families in (("all", None), ("routed", route.families)):
+            started = time.perf_counter()
+            scored = manager.similarity_search_with_scores(question, k=k, route=False, families=families)
+            latency[mode].append((time.perf_counter() - started) * 1000)
+            off_topic[mode].append(sum(count_tokens(doc.page_content) for doc, _ in scored
+                                       if doc.metadata.get("family") not in expected))
+    report = {
+        "questions": len(labeled),
+        "routed": routed,
+        "accuracy": round(correct / routed, 3) if routed else None,
+        "mean_families_searched": round(float(np.mean(families_searched)), 2) if families_searched else None,
+        **{f"{mode}_p50_ms": round(float(np.percentile(latency[mode], 50)), 3) for mode in latency},
+        **{f"{mode}_off_topic_tokens": round(float(np.mean(off_topic[mode])), 1) for mode in off_topic},
+    }
+    logger.info(f"Routing accuracy {correct}/{routed} routed questions ({routed}/{len(labeled)} routed); "
+                f"p50 search {report['all_p50_ms']}ms -> {report['routed_p50_ms']}ms, off-topic context "
+                f"tokens {report['all_off_topic_tokens']} -> {report['routed_off_topic_tokens']}")
+    return report
+
+
+if __name__ == "__main__":
+    from config.prompts import ROUTING_EVAL
+    from src.rag.vector_store import initialize_vector_store
+
+    parser = argparse.ArgumentParser(description="Evaluate query routing on the labeled routing questions.")
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per question.")
+    parser.add_argument("--output", type=str, help="Optional path for the JSON results.")
+    args = parser.parse_args()
+
+    report = evaluate_routing(initialize_vector_store(), ROUTING_EVAL, args.k)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import List
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class _ApproximateTokenizer:
+    """Roughly 4 characters per token; used only when the tiktoken encoding cannot be loaded."""
+
+    def encode(self, text: str, disallowed_special=()) -> List[int]:
+        return list(range((len(text) + 3) // 4))
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Shared cl100k_base tokenizer, loaded once per process."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, approximating token counts: {e}")
+        return _ApproximateTokenizer()
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return len(get_tokenizer().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Cuts text to max_tokens, keeping its start (or its end with keep_end)."""
+    if max_tokens <= 0:
+        return ""
+    tokenizer = get_tokenizer()
+    tokens = tokenizer.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    if not hasattr(tokenizer, "decode"):
+        return text[-max_tokens * 4:] if keep_end else text[:max_tokens * 4]  # approximate tokenizer
+    return tokenizer.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
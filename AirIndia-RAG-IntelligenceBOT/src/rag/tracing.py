@@ -0,0 +1,225 @@
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (Prometheus-style, cumulative on export)
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+QUANTILES = (0.5, 0.95, 0.99)
+# Numeric span attributes that are accumulated into counters
+COUNTED_ATTRIBUTES = ("prompt_tokens", "completion_tokens", "context_tokens", "tokens_saved", "docs_retrieved")
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """Spans of one request. A stage may be entered more than once; its durations are summed."""
+
+    def __init__(self, name: str = "rag_request"):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.started_unix = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: List[Span] = []
+        self.attributes: Dict[str, Any] = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, start_ms=(time.perf_counter() - self._t0) * 1000, attributes=dict(attributes))
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            self.spans.append(span)  # list.append is atomic, so threads may add spans concurrently
+
+    def add_span(self, name: str, duration_ms: float, **attributes) -> Span:
+        """Records a stage measured elsewhere, e.g. one batched call shared by several requests."""
+        span = Span(name, start_ms=self.elapsed_ms() - duration_ms, duration_ms=duration_ms, attributes=attributes)
+        self.spans.append(span)
+        return span
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        return totals
+
+    def attribute_totals(self, keys) -> Dict[str, Dict[str, float]]:
+        """Numeric span attributes (e.g. token counts) summed per stage."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            for key in keys:
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage = totals.setdefault(span.name, {})
+                    stage[key] = stage.get(key, 0) + value
+        return totals
+
+    def summary_line(self) -> str:
+        stages = ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.stage_totals().items())
+        return f"{stages}, total={self.elapsed_ms():.0f}ms"
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts for export plus a window of recent samples for exact percentiles."""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = DEFAULT_BUCKETS_MS, window: int = 2048):
+        self.buckets_ms = tuple(buckets_ms)
+        self.bucket_counts = [0] * (len(self.buckets_ms) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms: float):
+        index = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class MetricsRegistry:
+    """In-process per-stage latency histograms and token/document counters fed by request traces."""
+
+    def __init__(self, window: int = 2048, service_name: str = "airindia-rag"):
+        self.window = window
+        self.service_name = service_name
+        self.started_unix_nano = time.time_ns()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage: str) -> LatencyHistogram:
+        if stage not in self.histograms:
+            self.histograms[stage] = LatencyHistogram(window=self.window)
+        return self.histograms[stage]
+
+    def record(self, trace: Trace):
+        total_ms = trace.elapsed_ms()
+        with self._lock:
+            self.requests += 1
+            for stage, ms in trace.stage_totals().items():
+                self._histogram(stage).observe(ms)
+            self._histogram("total").observe(total_ms)
+            for span in trace.spans:
+                for key in COUNTED_ATTRIBUTES:
+                    value = span.attributes.get(key)
+                    if isinstance(value, (int, float)):
+                        self.counters[(key, span.name)] = self.counters.get((key, span.name), 0) + value
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count and p50/p95/p99 in milliseconds over the recent window."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": hist.count,
+                    **{f"p{int(q * 100)}_ms": round(hist.percentile(q), 1) for q in QUANTILES},
+                }
+                for stage, hist in self.histograms.items()
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            lines += ["# HELP rag_stage_duration_seconds Duration of RAG pipeline stages.",
+                      "# TYPE rag_stage_duration_seconds histogram"]
+            for stage, hist in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(list(hist.buckets_ms) + [math.inf], hist.bucket_counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else f"{bound / 1000:g}"
+                    lines.append(f'rag_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'rag_stage_duration_seconds_sum{{stage="{stage}"}} {hist.sum_ms / 1000:.6f}')
+                lines.append(f'rag_stage_duration_seconds_count{{stage="{stage}"}} {hist.count}')
+
+            lines += [f"# HELP rag_stage_latency_seconds Stage latency quantiles over the last {self.window} requests.",
+                      "# TYPE rag_stage_latency_seconds summary"]
+            for stage, hist in self.histograms.items():
+                for q in QUANTILES:
+                    lines.append(f'rag_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} '
+                                 f'{hist.percentile(q) / 1000:.6f}')
+                lines.append(f'rag_stage_latency_seconds_sum{{stage="{stage}"}} {sum(hist.recent) / 1000:.6f}')
+                lines.append(f'rag_stage_latency_seconds_count{{stage="{stage}"}} {len(hist.recent)}')
+
+            lines += ["# HELP rag_stage_attribute_total Tokens and documents accumulated per stage.",
+                      "# TYPE rag_stage_attribute_total counter"]
+            for (key, stage), value in sorted(self.counters.items()):
+                lines.append(f'rag_stage_attribute_total{{stage="{stage}",attribute="{key}"}} {value:g}')
+
+            lines += ["# HELP rag_requests_total Requests traced.", "# TYPE rag_requests_total counter",
+                      f"rag_requests_total {self.requests}"]
+        return "\n".join(lines) + "\n"
+
+    def to_otel_json(self) -> Dict[str, Any]:
+        """The same metrics as an OTLP/JSON ExportMetricsServiceRequest (cumulative temporality)."""
+        now = str(time.time_ns())
+        start = str(self.started_unix_nano)
+
+        def attributes(**values):
+            return [{"key": key, "value": {"stringValue": value}} for key, value in values.items()]
+
+        with self._lock:
+            histogram_points = [
+                {
+                    "attributes": attributes(stage=stage),
+                    "startTimeUnixNano": start,
+                    "timeUnixNano": now,
+                    "count": str(hist.count),
+                    "sum": hist.sum_ms,
+                    "min": hist.min_ms if hist.count else 0.0,
+                    "max": hist.max_ms,
+                    "bucketCounts": [str(count) for count in hist.bucket_counts],
+                    "explicitBounds": list(hist.buckets_ms),
+                }
+                for stage, hist in self.histograms.items()
+            ]
+            counter_points = [
+                {"attributes": attributes(stage=stage, attribute=key), "startTimeUnixNano": start,
+                 "timeUnixNano": now, "asDouble": float(value)}
+                for (key, stage), value in sorted(self.counters.items())
+            ]
+        metrics = [
+            {"name": "rag.stage.duration", "unit": "ms",
+             "histogram": {"aggregationTemporality": 2, "dataPoints": histogram_points}},
+            {"name": "rag.stage.attribute", "unit": "1",
+             "sum": {"aggregationTemporality": 2, "isMonotonic": True, "dataPoints": counter_points}},
+        ]
+        return {"resourceMetrics": [{
+            "resource": {"attributes": attributes(**{"service.name": self.service_name})},
+            "scopeMetrics": [{"scope": {"name": __name__}, "metrics": metrics}],
+        }]}
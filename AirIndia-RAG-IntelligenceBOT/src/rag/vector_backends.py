@@ -0,0 +1,206 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class VectorBackend(ABC):
+    """
+    Chunk storage and dense search behind VectorStoreManager. Chunking, ingestion bookkeeping
+    and hybrid (BM25) fusion stay in the manager; a backend only stores and searches vectors.
+    """
+
+    name = "base"
+
+    def __init__(self, embedding_function):
+        self.embedding_function = embedding_function
+
+    @abstractmethod
+    def upsert(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings: List[List[float]]):
+        """Inserts or replaces chunks whose embeddings are already computed."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        pass
+
+    @abstractmethod
+    def ids_for_source(self, source: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    def iter_texts(self, page_size: int = 1000) -> Iterator[Tuple[str, str]]:
+        """Yields (chunk_id, text) for every stored chunk."""
+
+    @abstractmethod
+    def iter_records(self, page_size: int = 1000) -> Iterator[Tuple[List[str], List[str], List[dict], list]]:
+        """Yields pages of (ids, texts, metadatas, embeddings); used to build side indexes, benchmark or migrate."""
+
+    @abstractmethod
+    def get_documents(self, ids: List[str]) -> Dict[str, Document]:
+        pass
+
+    @abstractmethod
+    def search_by_vector(self, vector: List[float], k: int,
+                         families: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """Returns the top-k (chunk_id, score) pairs, best first, optionally only among chunks of the given families."""
+
+    def search_by_vectors(self, vectors: List[List[float]], k: int,
+                          families: Optional[Sequence[str]] = None) -> List[List[Tuple[str, float]]]:
+        """search_by_vector for several queries; backends override this with one batched query."""
+        return [self.search_by_vector(vector, k, families) if len(vector) else [] for vector in vectors]
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    @contextmanager
+    def deferred_writes(self) -> Iterator[bool]:
+        """
+        Lets a backend buffer the writes made inside the block and commit them once at its end.
+        Yields whether writes are actually deferred; backends that write through yield False.
+        """
+        yield False
+
+    def index_stale(self) -> bool:
+        """True when a derived search index must be rebuilt after writes (ANN backends)."""
+        return False
+
+    def build_index(self) -> dict:
+        """Rebuilds any derived search index; backends that search their storage directly have none."""
+        return {}
+
+    def search_with_scores(self, query: str, k: int = 3,
+                           families: Optional[Sequence[str]] = None) -> List[Tuple[Document, float]]:
+        """Top-k documents with their similarity scores (larger is closer), best first."""
+        vector = self.embedding_function.embed_query(query)
+        if not len(vector):
+            return []
+        hits = self.search_by_vector(vector, k, families)
+        found = self.get_documents([doc_id for doc_id, _ in hits])
+        return [(found[doc_id], score) for doc_id, score in hits if doc_id in found]
+
+    def search(self, query: str, k: int = 3, families: Optional[Sequence[str]] = None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query, k, families)]
+
+    def search_many_with_scores(self, queries: List[str], k: int = 3,
+                                families: Optional[Sequence[str]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        search_with_scores for many queries at once: one batched embedding call, one batched
+        vector query and one document fetch for all hits.
+        """
+        if not queries:
+            return []
+        return self.search_vectors_with_scores(self.embedding_function.embed_documents(list(queries)), k, families)
+
+    def search_vectors_with_scores(self, vectors: List[List[float]], k: int = 3,
+                                   families: Optional[Sequence[str]] = None) -> List[List[Tuple[Document, float]]]:
+        """search_many_with_scores for queries the caller has already embedded."""
+        hits = self.search_by_vectors(vectors, k, families)
+        found = self.get_documents(list(dict.fromkeys(doc_id for row in hits for doc_id, _ in row)))
+        return [[(found[doc_id], score) for doc_id, score in row if doc_id in found] for row in hits]
+
+
+def family_filter(families: Optional[Sequence[str]]) -> Optional[dict]:
+    """Chroma `where` clause restricting a search to chunks of the given document families."""
+    if not families:
+        return None
+    return {"family": {"$in": list(families)}}
+
+
+class ChromaBackend(VectorBackend):
+    """The default backend: a persistent langchain_chroma collection (HNSW)."""
+
+    name = "chroma"
+
+    def __init__(self, embedding_function, persist_directory: str, collection_name: str):
+        super().__init__(embedding_function)
+        self.store = Chroma(
+            collection_name=collection_name,
+            embedding_function=embedding_function,
+            persist_directory=persist_directory,
+        )
+
+    def upsert(self, ids, texts, metadatas, embeddings):
+        self.store._collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.store.delete(ids=ids)
+
+    def ids_for_source(self, source):
+        return self.store.get(where={"source": source}, include=[])["ids"]
+
+    def iter_texts(self, page_size=1000):
+        offset = 0
+        while True:
+            page = self.store.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield from zip(page["ids"], page["documents"])
+            offset += len(page["ids"])
+
+    def iter_records(self, page_size=1000):
+        offset = 0
+        while True:
+            page = self.store.get(include=["documents", "metadatas", "embeddings"], limit=page_size, offset=offset)
+            if not len(page["ids"]):
+                return
+            yield page["ids"], page["documents"], page["metadatas"], page["embeddings"]
+            offset += len(page["ids"])
+
+    def get_documents(self, ids):
+        if not ids:
+            return {}
+        found = self.store.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            doc_id: Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+        }
+
+    def search_by_vector(self, vector, k, families=None):
+        result = self.store._collection.query(
+            query_embeddings=[[float(x) for x in vector]], n_results=k, where=family_filter(families),
+            include=["distances"]
+        )
+        # Chroma returns distances (smaller is closer); negate so larger is better like the other backends
+        return [(doc_id, -float(distance)) for doc_id, distance in zip(result["ids"][0], result["distances"][0])]
+
+    def search_by_vectors(self, vectors, k, families=None):
+        rows = [i for i, vector in enumerate(vectors) if len(vector)]
+        hits = [[] for _ in vectors]
+        if not rows:
+            return hits
+        result = self.store._collection.query(
+            query_embeddings=[[float(x) for x in vectors[i]] for i in rows], n_results=k,
+            where=family_filter(families), include=["distances"]
+        )
+        for i, ids, distances in zip(rows, result["ids"], result["distances"]):
+            hits[i] = [(doc_id, -float(distance)) for doc_id, distance in zip(ids, distances)]
+        return hits
+
+    def search_with_scores(self, query, k=3, families=None):
+        # Distances are negated so larger is better like the other backends
+        return [(doc, -float(distance)) for doc, distance
+                in self.store.similarity_search_with_score(query, k=k, filter=family_filter(families))]
+
+    def search(self, query, k=3, families=None):
+        return self.store.similarity_search(query, k=k, filter=family_filter(families))
+
+    def count(self):
+        return self.store._collection.count()
+
+
+def create_backend(name: str, embedding_function, persist_directory: str, collection_name: str) -> VectorBackend:
+    """Instantiates the configured backend; optional backends are imported only when selected."""
+    if name == "chroma":
+        return ChromaBackend(embedding_function, persist_directory, collection_name)
+    if name == "numpy":
+        from src.rag.numpy_store import NumpyBackend
+        return NumpyBackend(embedding_function, persist_directory, collection_name)
+    if name == "faiss":
+        from src.rag.faiss_store import FaissBackend
+        return FaissBackend(embedding_function, persist_directory, collection_name)
+    raise ValueError(f"Unknown VECTOR_BACKEND: {name}")
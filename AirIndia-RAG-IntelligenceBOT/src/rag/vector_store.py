@@ -1,36 +1,85 @@
 
+import hashlib
 import os
-from typing import List
-from uuid import uuid4
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain_chroma import Chroma
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from config.settings import VECTOR_DB_DIR, COLLECTION_NAME, CHUNK_SIZE, CHUNK_OVERLAP
+from config.settings import (
+    VECTOR_DB_DIR, COLLECTION_NAME, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_MANIFEST_PATH,
+    HYBRID_SEARCH_ENABLED, HYBRID_FETCH_K, RRF_K, VECTOR_BACKEND, PDF_CACHE_ENABLED, PDF_CACHE_DIR, ROUTER_ENABLED
+)
 from src.logger import setup_logger
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion_scores
 from src.rag.embeddings import get_embedding_function
+from src.rag.manifest import manifest_version, scan_pdfs
+from src.rag.pdf_cache import PdfTextCache, parse_page_range
+from src.rag.router import FamilyCentroids, QueryRouter, document_family
+from src.rag.vector_backends import VectorBackend, create_backend
 
 logger = setup_logger(__name__)
 
+def chunk_id(doc: Document) -> str:
+    """Deterministic, content-derived ID for a chunk: re-ingesting the same text upserts in place."""
+    parts = [
+        str(doc.metadata.get('source', '')),
+        str(doc.metadata.get('page', '')),
+        str(doc.metadata.get('start_index', '')),
+        doc.page_content,
+    ]
+    # Re-tagging a chunk with another document family must replace it, not skip it as unchanged
+    if doc.metadata.get('family'):
+        parts.insert(3, doc.metadata['family'])
+    key = "\0".join(parts)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
 class VectorStoreManager:
-    """Manages the creation, persistence, and querying of the Chroma Vector Store."""
+    """Manages the creation, persistence, and querying of the vector store (Chroma or NumPy backend)."""
     
-    def __init__(self, embedding_function):
+    def __init__(self, embedding_function, backend: Optional[VectorBackend] = None,
+                 persist_directory: Optional[str] = None):
         self.embedding_function = embedding_function
-        self.persist_directory = VECTOR_DB_DIR
+        self.persist_directory = persist_directory or VECTOR_DB_DIR
         self.collection_name = COLLECTION_NAME
-        self.vector_store = Chroma(
-            collection_name=self.collection_name,
-            embedding_function=self.embedding_function,
-            persist_directory=self.persist_directory,
+        self.backend = backend or create_backend(
+            VECTOR_BACKEND, self.embedding_function, self.persist_directory, self.collection_name
         )
+        logger.info(f"Using {self.backend.name} vector store backend.")
+        self.keyword_index_path = os.path.join(self.persist_directory, f"{self.collection_name}_bm25.json.gz")
+        self.family_index_path = os.path.join(self.persist_directory, f"{self.collection_name}_families.json")
+        self.router = QueryRouter(embedding_function, self.family_index_path) if ROUTER_ENABLED else None
+        self._keyword_index = None
+        self._keyword_index_mtime = None
+        self._search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+
+    def corpus_version(self) -> str:
+        """Version of the indexed corpus; cached by manifest mtime so it is cheap to call per request."""
+        try:
+            stat = os.stat(INGEST_MANIFEST_PATH)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if stamp != getattr(self, "_manifest_stamp", False):
+            self._manifest_stamp = stamp
+            self._corpus_version = manifest_version(INGEST_MANIFEST_PATH)
+        return self._corpus_version
 
-    def load_and_split_documents(self, directory: str) -> List[Document]:
-        """Loads PDFs from a directory and splits them into chunks."""
+    def load_and_split_documents(self, directory: str, files: Optional[List[str]] = None) -> List[Document]:
+        """
+        Loads PDFs from a directory (or only the given files) and splits them into chunks.
+        Pages come from the PDF text cache when the file was parsed before.
+        """
         logger.info(f"Loading documents from {directory}...")
         try:
-            loader = PyPDFDirectoryLoader(directory, glob="**/*.pdf")
-            documents = loader.load()
+            cache = PdfTextCache(PDF_CACHE_DIR) if PDF_CACHE_ENABLED else None
+            documents = []
+            for path in (scan_pdfs(directory) if files is None else files):
+                pages = cache.load(path) if cache else parse_page_range(path, 0, 2 ** 31)
+                family = document_family(path)
+                documents.extend(Document(page_content=text, metadata=dict(meta, family=family))
+                                 for text, meta in pages)
             unique_sources = {doc.metadata.get('source', 'unknown') for doc in documents}
             logger.info(f"files found: {len(unique_sources)}")
             for source in unique_sources:
@@ -40,7 +89,8 @@ class VectorStoreManager:
 
             text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=CHUNK_SIZE, 
-                chunk_overlap=CHUNK_OVERLAP
+                chunk_overlap=CHUNK_OVERLAP,
+                add_start_index=True
             )
             texts = text_splitter.split_documents(documents)
             logger.info(f"Split into {len(texts)} chunks.")
@@ -49,30 +99,226 @@ class VectorStoreManager:
             logger.error(f"Failed to load/split documents: {e}")
             return []
 
-    def populate_vector_store(self, documents: List[Document]):
-        """Adds documents to the vector store."""
+    def populate_vector_store(self, documents: List[Document]) -> List[str]:
+        """Upserts documents into the vector store under content-derived IDs and returns the IDs."""
         if not documents:
             logger.warning("No documents to add to vector store.")
-            return
+            return []
 
         logger.info("Adding documents to vector store...")
         try:
-            ids = [str(uuid4()) for _ in range(len(documents))]
-            # Batch adding logic could be implemented here for large sets
-            self.vector_store.add_documents(documents=documents, ids=ids)
+            # Deduplicate identical chunks so a batch never carries the same ID twice
+            unique = {chunk_id(doc): doc for doc in documents}
+            docs = list(unique.values())
+            embeddings = self.embedding_function.embed_documents([doc.page_content for doc in docs])
+            # Chunks whose embedding failed are left out
+            kept = [(doc_id, doc, vector) for doc_id, doc, vector in zip(unique, docs, embeddings) if len(vector)]
+            ids = [doc_id for doc_id, _, _ in kept]
+            self.upsert_embeddings(ids, [doc for _, doc, _ in kept], [vector for _, _, vector in kept])
             logger.info("Successfully populated vector store.")
+            return ids
         except Exception as e:
             logger.error(f"Failed to populate vector store: {e}")
+            return []
+
+    def upsert_embeddings(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]):
+        """Upserts chunks whose embeddings were already computed by the caller."""
+        self.backend.upsert(ids, [doc.page_content for doc in documents], [doc.metadata for doc in documents],
+                            embeddings)
+
+    def deferred_writes(self):
+        """Context manager that batches the backend's writes until it exits (see VectorBackend)."""
+        return self.backend.deferred_writes()
 
-    def similarity_search(self, query: str, k: int = 3) -> List[Document]:
-        """Searches the vector store for relevant documents."""
+    def delete_chunks(self, ids: List[str]):
+        """Removes chunks from the vector store by ID."""
+        if not ids:
+            return
         try:
-            results = self.vector_store.similarity_search(query, k=k)
-            return results
+            self.backend.delete(ids)
+            logger.info(f"Deleted {len(ids)} chunks from vector store.")
+        except Exception as e:
+            logger.error(f"Failed to delete chunks: {e}")
+
+    def source_chunk_ids(self, source: str) -> List[str]:
+        """Returns the IDs of all chunks currently stored for a source file."""
+        try:
+            return self.backend.ids_for_source(source)
+        except Exception as e:
+            logger.error(f"Failed to look up chunks for {source}: {e}")
+            return []
+
+    def count(self) -> int:
+        """Number of chunks currently stored."""
+        return self.backend.count()
+
+    def rebuild_keyword_index(self, page_size: int = 1000) -> dict:
+        """
+        Rebuilds the persisted BM25 index from the collection, paging through stored chunks. The
+        same pass labels each chunk's document family in the index and writes the per-family
+        embedding centroids the query router classifies with.
+        """
+        started = time.time()
+        centroids = FamilyCentroids()
+        families = []
+
+        def texts():
+            for ids, page_texts, metadatas, vectors in self.backend.iter_records(page_size):
+                families.extend((metadata or {}).get("family", "") for metadata in metadatas)
+                centroids.add(metadatas, vectors)
+                yield from zip(ids, page_texts)
+
+        index = BM25Index.build(texts())
+        index.families = families
+        index.save(self.keyword_index_path)
+        centroids.save(self.family_index_path)
+        stats = {
+            "chunks": len(index.ids),
+            "terms": len(index.postings),
+            "families": dict(centroids.counts),
+            "build_seconds": time.time() - started,
+            "size_bytes": os.path.getsize(self.keyword_index_path),
+        }
+        logger.info(
+            f"Built BM25 index: {stats['chunks']} chunks, {stats['terms']} terms, "
+            f"{stats['size_bytes'] / 1024:.1f} KB in {stats['build_seconds']:.2f}s; document families "
+            f"{stats['families']}" + (f", {centroids.untagged} chunks untagged" if centroids.untagged else "")
+        )
+        return stats
+
+    def _load_keyword_index(self) -> Optional[BM25Index]:
+        """Loads the BM25 index, reloading it when ingestion (possibly in another process) rewrote it."""
+        try:
+            mtime = os.path.getmtime(self.keyword_index_path)
+        except OSError:
+            return None
+        if mtime != self._keyword_index_mtime:
+            try:
+                self._keyword_index = BM25Index.load(self.keyword_index_path)
+                self._keyword_index_mtime = mtime
+            except Exception as e:
+                logger.error(f"Failed to load BM25 index: {e}")
+                return None
+        return self._keyword_index
+
+    def _documents_by_id(self, ids: List[str]) -> dict:
+        return self.backend.get_documents(ids)
+
+    def route(self, query: str, vector: Optional[List[float]] = None) -> Optional[List[str]]:
+        """The document families the router restricts this query to, or None to search everything."""
+        return self.router.route(query, vector=vector).families if self.router else None
+
+    def dense_search(self, query: str, k: int = 3, families: Optional[Sequence[str]] = None,
+                     vector: Optional[List[float]] = None) -> List[Document]:
+        """Pure vector similarity search."""
+        return [doc for doc, _ in self.dense_search_with_scores(query, k=k, families=families, vector=vector)]
+
+    def dense_search_with_scores(self, query: str, k: int = 3, families: Optional[Sequence[str]] = None,
+                                 vector: Optional[List[float]] = None) -> List[Tuple[Document, float]]:
+        """Dense search; with `vector` (the query's embedding) the query is not embedded again."""
+        try:
+            if vector is None:
+                return self.backend.search_with_scores(query, k=k, families=families)
+            return self.backend.search_vectors_with_scores([vector], k=k, families=families)[0]
         except Exception as e:
             logger.error(f"Error during similarity search: {e}")
             return []
 
+    def similarity_search(self, query: str, k: int = 3, route: bool = True) -> List[Document]:
+        """
+        Searches the vector store for relevant documents. With hybrid search enabled, dense and
+        BM25 retrieval run in parallel and are merged with reciprocal rank fusion. With `route`,
+        both only search the document families the query router picks.
+        """
+        return [doc for doc, _ in self.similarity_search_with_scores(query, k=k, route=route)]
+
+    def similarity_search_with_scores(self, query: str, k: int = 3, route: bool = True,
+                                      families: Optional[Sequence[str]] = None) -> List[Tuple[Document, float]]:
+        """
+        similarity_search with each document's score: the RRF score in hybrid mode, else the dense
+        score. Explicit `families` take precedence over the router.
+        """
+        vector = None
+        if families is None and route and self.router:
+            # Embedded once here: the router's classifier and the dense search share the vector
+            try:
+                vector = self.embedding_function.embed_query(query)
+            except Exception as e:
+                logger.error(f"Failed to embed query: {e}")
+                return []
+            families = self.route(query, vector)
+        index = self._load_keyword_index() if HYBRID_SEARCH_ENABLED else None
+        if index is None:
+            return self.dense_search_with_scores(query, k=k, families=families, vector=vector)
+
+        started = time.time()
+        fetch_k = max(k, HYBRID_FETCH_K)
+        try:
+            dense_future = self._search_pool.submit(self.dense_search, query, fetch_k, families, vector)
+            keyword_hits = index.search(query, k=fetch_k, families=families)
+            keyword_ms = (time.time() - started) * 1000
+            dense = dense_future.result()
+
+            dense_ids = [getattr(doc, "id", None) or chunk_id(doc) for doc in dense]
+            fused = reciprocal_rank_fusion_scores([dense_ids, [doc_id for doc_id, _ in keyword_hits]], k=RRF_K)[:k]
+            by_id = dict(zip(dense_ids, dense))
+            by_id.update(self._documents_by_id([doc_id for doc_id, _ in fused if doc_id not in by_id]))
+            results = [(by_id[doc_id], score) for doc_id, score in fused if doc_id in by_id]
+            logger.debug(
+                f"Hybrid search: {len(dense)} dense + {len(keyword_hits)} BM25 hits -> {len(results)} "
+                f"(bm25 {keyword_ms:.1f}ms, total {(time.time() - started) * 1000:.1f}ms)"
+            )
+            return results
+        except Exception as e:
+            logger.error(f"Error during hybrid search, falling back to dense search: {e}")
+            return self.dense_search_with_scores(query, k=k, families=families, vector=vector)
+
+    def similarity_search_many(self, queries: List[str], k: int = 3, route: bool = True,
+                               vectors: Optional[List[List[float]]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        similarity_search_with_scores for a batch of queries: all queries are embedded in one call
+        (unless their `vectors` are passed in), routed with those vectors, and the queries routed to
+        the same families are searched in one vector query; BM25 and fusion still run per query.
+        """
+        if not queries:
+            return []
+        index = self._load_keyword_index() if HYBRID_SEARCH_ENABLED else None
+        fetch_k = k if index is None else max(k, HYBRID_FETCH_K)
+        started = time.time()
+        routes: List[tuple] = [()] * len(queries)
+        dense: List[list] = [[] for _ in queries]
+        try:
+            if vectors is None:
+                vectors = self.embedding_function.embed_documents(list(queries))
+            if route and self.router:
+                routes = [tuple(self.route(query, vector) or ()) for query, vector in zip(queries, vectors)]
+            groups: Dict[tuple, List[int]] = defaultdict(list)
+            for i, families in enumerate(routes):
+                groups[families].append(i)
+            for families, rows in groups.items():
+                found = self.backend.search_vectors_with_scores([vectors[i] for i in rows], k=fetch_k,
+                                                                families=list(families) or None)
+                for i, hits in zip(rows, found):
+                    dense[i] = hits
+        except Exception as e:
+            logger.error(f"Batched search failed, searching queries one by one: {e}")
+            return [self.similarity_search_with_scores(query, k=k, route=route) for query in queries]
+        if index is None:
+            return [hits[:k] for hits in dense]
+
+        results = []
+        for query, hits, families in zip(queries, dense, routes):
+            docs = [doc for doc, _ in hits]
+            dense_ids = [getattr(doc, "id", None) or chunk_id(doc) for doc in docs]
+            keyword_ids = [doc_id for doc_id, _ in index.search(query, k=fetch_k, families=list(families) or None)]
+            fused = reciprocal_rank_fusion_scores([dense_ids, keyword_ids], k=RRF_K)[:k]
+            by_id = dict(zip(dense_ids, docs))
+            by_id.update(self._documents_by_id([doc_id for doc_id, _ in fused if doc_id not in by_id]))
+            results.append([(by_id[doc_id], score) for doc_id, score in fused if doc_id in by_id])
+        logger.debug(f"Batched hybrid search: {len(queries)} queries ({len(groups)} routes) "
+                     f"in {(time.time() - started) * 1000:.1f}ms")
+        return results
+
 def initialize_vector_store():
     embeddings = get_embedding_function()
     return VectorStoreManager(embeddings)
@@ -3,6 +3,22 @@ import pytest
 import os
 import csv
 
+
+@pytest.fixture(scope="session")
+def evaluation_runner():
+    """One engine and one checkpointed evaluation run shared by all quality evaluation tests."""
+    from src.rag.engine import RAGEngine
+    from src.rag.evaluation import EvaluationRunner
+    from src.rag.vector_store import initialize_vector_store
+    return EvaluationRunner(RAGEngine(initialize_vector_store(), response_cache=None))
+
+
+@pytest.fixture(scope="session")
+def evaluation_records(evaluation_runner):
+    """Generated answers, contexts and judge verdicts; resumes from the checkpoint if interrupted."""
+    return evaluation_runner.run()
+
+
 def pytest_sessionfinish(session, exitstatus):
     """
     Called after whole test run finished, right before returning the exit status to the system.
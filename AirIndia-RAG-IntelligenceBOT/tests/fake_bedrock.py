@@ -0,0 +1,108 @@
+"""
+A local stand-in for the Bedrock runtime HTTP API.
+
+Point a boto3 ``bedrock-runtime`` client at ``FakeBedrockServer.endpoint_url`` to exercise
+the embedding and generation code paths without AWS. The server simulates per-call latency,
+a concurrency capacity above which it throttles, and validation failures for any input
+containing ``FAIL``.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+EMBEDDING_DIM = 8
+
+
+def fake_embedding(text: str) -> list:
+    """Deterministic pseudo-embedding derived from the text hash."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255.0 for b in digest[:EMBEDDING_DIM]]
+
+
+class FakeBedrockServer:
+    """Threaded HTTP server mimicking ``InvokeModel`` for Titan embeddings and Nova chat models."""
+
+    def __init__(self, latency: float = 0.0, capacity: int = 0, reply: str = "Fake answer."):
+        self.latency = latency
+        self.capacity = capacity  # 0 means unlimited
+        self.reply = reply
+        self.calls = 0
+        self.throttled = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, error_type: str = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if error_type:
+                    self.send_header("x-amzn-ErrorType", error_type)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                model_id = unquote(self.path.split("/")[2]) if self.path.startswith("/model/") else ""
+
+                with server._lock:
+                    server.calls += 1
+                    if server.capacity and server._in_flight >= server.capacity:
+                        server.throttled += 1
+                        throttle = True
+                    else:
+                        throttle = False
+                        server._in_flight += 1
+                        server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                if throttle:
+                    return self._send(429, {"message": "Too many requests"}, "ThrottlingException")
+
+                try:
+                    time.sleep(server.latency)
+                    if "inputText" in request:
+                        text = request["inputText"]
+                        if "FAIL" in text:
+                            return self._send(400, {"message": "Malformed input"}, "ValidationException")
+                        return self._send(200, {
+                            "embedding": fake_embedding(text),
+                            "inputTextTokenCount": len(text.split()),
+                        })
+                    return self._send(200, {
+                        "output": {"message": {"role": "assistant", "content": [{"text": server.reply}]}},
+                        "stopReason": "end_turn",
+                        "usage": {"inputTokens": 0, "outputTokens": len(server.reply.split())},
+                        "modelId": model_id,
+                    })
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+        return Handler
@@ -0,0 +1,136 @@
+"""
+A local stand-in for the Ollama ``/api/generate`` endpoint.
+
+Point ``OllamaProvider(base_url=FakeOllamaServer.endpoint_url)`` at it to measure cold and warm
+latency without a model server. Like Ollama, it serves one request at a time and keeps one
+model resident. It pays ``load_latency`` to load a model that is absent, expired by its
+keep-alive, or loaded with another ``num_ctx``. Prompt evaluation costs ``token_latency``
+per token, except for the prefix shared with the previous request, which comes from the KV
+cache. Tokens are approximated as 4 characters.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_KEEP_ALIVE = 300.0
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(value) -> float:
+    """Seconds the model stays loaded after a request; negative values mean forever."""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", value.strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2) or "s"]
+    return float("inf") if seconds < 0 else seconds
+
+
+def _shared_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server mimicking Ollama's streaming generate API, model loading and prefix caching."""
+
+    def __init__(self, load_latency: float = 0.5, token_latency: float = 0.0, reply: str = "Fake answer."):
+        self.load_latency = load_latency
+        self.token_latency = token_latency
+        self.reply = reply
+        self.loads = 0
+        self.requests = []  # one dict per request: options, keep_alive, loaded, evaluated/reused tokens
+        self._loaded = None  # (model, num_ctx)
+        self._expires_at = 0.0
+        self._cached_prompt = ""
+        self._model_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def expire(self):
+        """Unloads the model, as if its keep-alive had run out."""
+        with self._model_lock:
+            self._loaded = None
+
+    def _serve(self, request: dict) -> dict:
+        """Runs one request against the simulated model; returns the final (done) response fields."""
+        options = request.get("options") or {}
+        model = (request.get("model"), options.get("num_ctx"))
+        with self._model_lock:
+            started = time.perf_counter()
+            loaded = self._loaded != model or time.monotonic() > self._expires_at
+            if loaded:
+                time.sleep(self.load_latency)
+                self.loads += 1
+                self._loaded, self._cached_prompt = model, ""
+            load_seconds = time.perf_counter() - started
+
+            system, prompt = request.get("system") or "", request.get("prompt") or ""
+            evaluated = reused = 0
+            if system or prompt:
+                rendered = f"<system>{system}</system><user>{prompt}</user><assistant>"
+                reused = _shared_prefix(rendered, self._cached_prompt) // 4
+                evaluated = len(rendered) // 4 - reused
+                time.sleep(self.token_latency * evaluated)
+                self._cached_prompt = rendered
+            self._expires_at = time.monotonic() + keep_alive_seconds(request.get("keep_alive"))
+            self.requests.append({"options": options, "keep_alive": request.get("keep_alive"), "loaded": loaded,
+                                  "evaluated_tokens": evaluated, "reused_tokens": reused})
+            return {
+                "done": True,
+                "done_reason": "stop" if system or prompt else "load",
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "load_duration": int(load_seconds * 1e9),
+                "prompt_eval_count": evaluated,
+                "eval_count": len(self.reply.split()) if system or prompt else 0,
+            }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    body = json.dumps({"error": f"unsupported path {self.path}"}).encode("utf-8")
+                    self.send_response(404)
+                else:
+                    final = server._serve(request)
+                    words = server.reply.split(" ") if final["done_reason"] == "stop" else []
+                    base = {"model": request.get("model"), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+                    lines = [dict(base, response=w if i == 0 else f" {w}", done=False) for i, w in enumerate(words)]
+                    lines.append(dict(base, response="", **final))
+                    body = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,96 @@
+"""Deterministic, offline stand-ins for the embedding model and LLM providers."""
+import hashlib
+import math
+import time
+from langchain.embeddings.base import Embeddings
+from src.llm.base import LLMProvider
+
+
+class HashEmbeddings(Embeddings):
+    """Bag-of-words hashing embeddings: similar texts get similar vectors, no model download needed."""
+
+    model_name = "hash-embeddings-test"
+
+    def __init__(self, dim: int = 64, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency  # simulated model/network time per call
+        self.embedded = 0
+
+    def _vector(self, text: str) -> list:
+        vector = [0.0] * self.dim
+        for word in text.lower().split():
+            bucket = int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dim
+            vector[bucket] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self._vector(text)
+
+
+class StubLLM(LLMProvider):
+    """LLM provider with a canned answer and simulated latency; records every prompt it sees."""
+
+    def __init__(self, answer: str = "Economy passengers may check two bags of 23kg each.", latency: float = 0.0):
+        self.answer = answer
+        self.latency = latency
+        self.prompts = []
+
+    def generate(self, prompt, system_prompt=None):
+        self.prompts.append(prompt)
+        time.sleep(self.latency)
+        return self.answer
+
+    def evaluate(self, prompt):
+        return '{"score": 5, "reasoning": "stub"}'
+
+    def stream(self, prompt, system_prompt=None):
+        self.prompts.append(prompt)
+        time.sleep(self.latency)
+        for word in self.answer.split(" "):
+            yield word + " "
+
+
+class StubVectorStore:
+    """In-memory stand-in for VectorStoreManager: exact cosine search over HashEmbeddings."""
+
+    def __init__(self, documents, embedding_function=None, latency: float = 0.0):
+        self.embedding_function = embedding_function or HashEmbeddings()
+        self.documents = list(documents)
+        self.latency = latency
+        self.queries = []
+        self.batches = []
+        self._vectors = self.embedding_function.embed_documents([d.page_content for d in self.documents])
+
+    @property
+    def searches(self):
+        return len(self.queries)
+
+    def corpus_version(self):
+        return "stub"
+
+    def similarity_search(self, query, k=3):
+        return [doc for doc, _ in self.similarity_search_with_scores(query, k)]
+
+    def similarity_search_with_scores(self, query, k=3):
+        self.queries.append(query)
+        time.sleep(self.latency)
+        return self._rank(self.embedding_function.embed_query(query), k)
+
+    def similarity_search_many(self, queries, k=3, vectors=None):
+        self.queries.extend(queries)
+        self.batches.append(len(queries))
+        time.sleep(self.latency)
+        if vectors is None:
+            vectors = self.embedding_function.embed_documents(queries)
+        return [self._rank(q, k) for q in vectors]
+
+    def _rank(self, q, k):
+        scored = [(doc, sum(a * b for a, b in zip(q, vector))) for doc, vector in zip(self.documents, self._vectors)]
+        return sorted(scored, key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from src.llm import bedrock_client
+from src.llm.bedrock_client import ModelGate, TokenBucket, get_bedrock_client, parse_model_overrides
+from src.llm.bedrock_provider import BedrockProvider
+from tests.fake_bedrock import FakeBedrockServer
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    bedrock_client.reset_bedrock_clients()
+    yield
+    bedrock_client.reset_bedrock_clients()
+
+
+def test_parse_model_overrides():
+    assert parse_model_overrides("eu.amazon.nova-pro-v1:0=4, amazon.titan-embed-text-v2:0=32,bad") == {
+        "eu.amazon.nova-pro-v1:0": 4.0,
+        "amazon.titan-embed-text-v2:0": 32.0,
+    }
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    # The first call uses the initial token, the next ten wait 20ms each
+    assert time.perf_counter() - started >= 0.18
+
+
+def test_client_is_shared_and_pooled():
+    client = get_bedrock_client("us-east-1", "http://127.0.0.1:1")
+    assert get_bedrock_client("us-east-1", "http://127.0.0.1:1") is client
+    assert get_bedrock_client("eu-west-3", "http://127.0.0.1:1") is not client
+    assert client.meta.config.max_pool_connections == bedrock_client.BEDROCK_MAX_POOL_CONNECTIONS
+    assert client.meta.config.retries["total_max_attempts"] == 1
+
+    provider = BedrockProvider(model_id="nova", region="us-east-1", endpoint_url="http://127.0.0.1:1")
+    assert provider.client is client
+    assert provider.gate is bedrock_client.get_model_gate("nova")
+
+
+def test_concurrent_sessions_respect_model_concurrency():
+    bedrock_client._gates["nova"] = ModelGate("nova", max_concurrency=2)
+    with FakeBedrockServer(latency=0.05) as server:
+        provider = BedrockProvider(model_id="nova", region="us-east-1", endpoint_url=server.endpoint_url)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            answers = list(pool.map(lambda i: provider.generate(f"question {i}"), range(12)))
+        elapsed = time.perf_counter() - started
+
+    assert answers == ["Fake answer."] * 12
+    assert server.max_in_flight <= 2 and server.throttled == 0
+    assert elapsed >= 6 * 0.05
+    assert provider.gate.stats()["calls"] == 12
+
+
+def test_throttles_are_retried_by_the_provider_not_botocore():
+    with FakeBedrockServer(latency=0.05, capacity=1) as server:
+        provider = BedrockProvider(model_id="nova", region="us-east-1", endpoint_url=server.endpoint_url,
+                                   max_attempts=20)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            answers = list(pool.map(lambda i: provider.generate(f"question {i}"), range(4)))
+
+    assert answers == ["Fake answer."] * 4
+    assert server.throttled > 0
+    # Every HTTP request went through the gate: botocore made no retries of its own
+    assert server.calls == provider.gate.stats()["calls"] == 4 + server.throttled
+
+
+def test_connection_errors_are_retried_by_the_provider():
+    # Nothing listens on port 1: every attempt fails to connect and is retried with backoff
+    provider = BedrockProvider(model_id="nova", region="us-east-1", endpoint_url="http://127.0.0.1:1", max_attempts=3)
+    with pytest.raises(EndpointConnectionError):
+        provider.generate("question")
+    assert provider.gate.stats()["calls"] == 3
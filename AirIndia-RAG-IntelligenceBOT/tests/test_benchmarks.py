@@ -0,0 +1,24 @@
+import os
+import shutil
+from benchmarks.perf import compare_reports, run_benchmarks
+from tests.test_ingest import PDF_DIR
+
+
+def test_benchmark_suite_runs_offline(tmp_path):
+    shutil.copy(os.path.join(PDF_DIR, "International Routes Feb 2025.pdf"), tmp_path)
+
+    report = run_benchmarks(docs_dir=str(tmp_path), backend="numpy", embed_latency=0.0, llm_latency=0.0,
+                            concurrency=[1, 2], requests_per_worker=2, retrieval_rounds=1,
+                            ollama_load_latency=0.2, ollama_token_latency=0.0)
+
+    assert report["ingestion"]["pages"] == 1 and report["ingestion"]["chunks"] > 0
+    assert report["retrieval"]["hybrid"]["count"] == report["config"]["questions"]
+    assert report["serving"]["2"]["requests"] == 4 and report["serving"]["2"]["qps"] > 0
+    assert "generation" in report["serving"]["1"]["stage_p50_ms"]
+    assert report["ollama"]["cold_first_request_ms"] >= 200 > report["ollama"]["warm_first_request_ms"]
+    assert report["ollama"]["reloads_after_warm_up"] == 0 and report["ollama"]["prefix_reuse_ratio"] > 0.5
+    assert report["peak_rss_mb"]["self"] > 0
+
+    lines = compare_reports(report, report)
+    assert any(line.startswith("serving.1.qps") and "(+0.0%)" in line for line in lines)
+    assert not any(line.startswith("meta.") for line in lines)
@@ -0,0 +1,27 @@
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion_scores, tokenize
+
+
+def test_tokenize_keeps_codes_and_their_parts():
+    tokens = tokenize("Flight AI-101 from DEL/BOM under clause 12.3")
+    assert {"ai-101", "ai", "101", "del/bom", "del", "bom", "12.3"} <= set(tokens)
+    assert "from" not in tokens
+
+
+def test_exact_code_ranks_first_and_roundtrips(tmp_path):
+    index = BM25Index.build([
+        ("a", "Baggage allowance for economy class passengers"),
+        ("b", "Flight AI-101 operates Delhi to New York daily"),
+        ("c", "Flight schedules are subject to change"),
+    ])
+    assert index.search("AI-101 schedule", k=2)[0][0] == "b"
+
+    path = str(tmp_path / "bm25.json.gz")
+    index.save(path)
+    assert BM25Index.load(path).search("AI-101", k=1) == index.search("AI-101", k=1)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion_scores([["x", "y", "z"], ["y", "w"]], k=60)
+    assert fused[0] == ("y", 1 / 62 + 1 / 61)
+    assert {doc_id for doc_id, _ in fused} == {"x", "y", "z", "w"}
+    assert [score for _, score in fused] == sorted((score for _, score in fused), reverse=True)
@@ -0,0 +1,43 @@
+import os
+import shutil
+from src.rag.chunk_sweep import answer_coverage, parse_grid, recommend, sweep
+from src.rag.embedding_cache import CachedEmbeddings
+from src.rag.pdf_cache import PdfTextCache
+from tests.stubs import HashEmbeddings
+from tests.test_ingest import PDF_DIR, SAMPLE_PDFS
+
+GROUND_TRUTH = {
+    "Which international destinations does Air India fly to?":
+        "Air India flies to London, New York, Singapore and Dubai.",
+    "When was Air India founded?": "Air India was founded as Tata Airlines in 1932.",
+}
+
+
+def test_sweep_builds_each_config_from_cached_pages(tmp_path):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for name in SAMPLE_PDFS:
+        shutil.copy(os.path.join(PDF_DIR, name), docs_dir / name)
+    embeddings = CachedEmbeddings(HashEmbeddings(), path=str(tmp_path / "embeddings.sqlite"))
+
+    report = sweep(str(docs_dir), [(1000, 200), (1000, 200), (500, 50)], output_dir=str(tmp_path / "sweep"),
+                   backend="numpy", embeddings=embeddings, pdf_cache=PdfTextCache(str(tmp_path / "pdf_text")),
+                   ground_truth=GROUND_TRUTH)
+
+    first, repeat, small = (report["configs"][name] for name in ("c1000_o200", "c1000_o200", "c500_o50"))
+    assert len(report["configs"]) == 2  # a repeated config is built once
+    assert first["pages_from_cache"] == 0 and small["pages_from_cache"] > 0
+    assert small["chunks"] > first["chunks"] > 0 and small["index_bytes"] > 0
+    assert 0.0 <= small["hit_rate"] <= 1.0 and small["p95_ms"] >= small["p50_ms"]
+    assert report["recommended"] in report["configs"]
+
+
+def test_recommend_prefers_fewest_tokens_at_equal_quality():
+    results = {
+        "c1000_o200": {"hit_rate": 1.0, "answer_coverage": 0.80, "context_tokens": 900},
+        "c600_o100": {"hit_rate": 1.0, "answer_coverage": 0.78, "context_tokens": 550},
+        "c400_o50": {"hit_rate": 0.5, "answer_coverage": 0.60, "context_tokens": 300},
+    }
+    assert recommend(results, tolerance=0.05) == "c600_o100"
+    assert answer_coverage("Flights to London and Dubai", "London, Dubai and Paris") > 0.5
+    assert parse_grid("800:150, 400") == [(800, 150), (400, 0)]
@@ -0,0 +1,57 @@
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.rag.context import ContextPacker
+from src.rag.tokens import count_tokens
+
+PAGE = " ".join(f"Sentence {i} describes baggage allowance rule number {i}." for i in range(60))
+
+
+def page_chunks(source="policy.pdf", page=0):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=80, add_start_index=True)
+    return splitter.split_documents([Document(page_content=PAGE, metadata={"source": source, "page": page})])
+
+
+def test_overlapping_chunks_are_merged_without_repeating_text():
+    chunks = page_chunks()[:3]
+    packed = ContextPacker(token_budget=10_000).pack([chunks[1], chunks[0], chunks[2]])
+
+    assert len(packed.docs) == 1
+    assert PAGE.startswith(packed.text)
+    assert packed.text.count("Sentence 3 ") == 1
+    assert packed.tokens_saved > 0
+
+
+def test_duplicates_dropped_and_budget_respected():
+    first = page_chunks("a.pdf")[0]
+    copy = Document(page_content=first.page_content, metadata={"source": "copy.pdf", "page": 0})
+    other = Document(page_content="Pets travel in the cabin only on domestic flights.", metadata={"source": "pets.pdf"})
+
+    packer = ContextPacker(token_budget=40)
+    packed = packer.pack([first, copy, other])
+
+    # The most relevant passage is kept, cut to the budget; the copy is dropped and the rest is over budget
+    assert [doc.metadata["source"] for doc in packed.docs] == ["a.pdf"]
+    assert first.page_content.startswith(packed.text) and 0 < packed.tokens_after <= 40
+    assert packer.requests == 1 and packer.tokens_saved_total == packed.tokens_saved > 0
+
+    packed = ContextPacker(token_budget=10_000).pack([first, copy, other])
+    assert [doc.metadata["source"] for doc in packed.docs] == ["a.pdf", "pets.pdf"]
+
+
+def test_mmr_prefers_diverse_passages():
+    relevant = Document(page_content="Checked baggage allowance is 25 kg in economy class.", metadata={"source": "a"})
+    near_copy = Document(page_content="Checked baggage allowance is 25 kg in economy class cabins.",
+                         metadata={"source": "b"})
+    different = Document(page_content="Unaccompanied minors need a signed consent form.", metadata={"source": "c"})
+
+    packed = ContextPacker(token_budget=10_000, mmr_lambda=0.5).pack([relevant, near_copy, different])
+    assert [doc.metadata["source"] for doc in packed.docs] == ["a", "c", "b"]
+
+
+def test_merged_span_larger_than_the_budget_is_cut_to_it():
+    chunks = page_chunks()[:6]
+    assert sum(count_tokens(chunk.page_content) for chunk in chunks) > 100
+
+    packed = ContextPacker(token_budget=100).pack(chunks)
+    assert len(packed.docs) == 1  # the six chunks merge into one span
+    assert PAGE.startswith(packed.text) and 0 < packed.tokens_after <= 100
@@ -0,0 +1,52 @@
+from langchain.embeddings.base import Embeddings
+from src.rag.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    model_name = "counting-test-model"
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(t)), 1.0, 2.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_reingest_hits_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    texts = ["Baggage allowance is 23kg.", "Flight AI101 departs DEL.", "Baggage allowance is 23kg."]
+
+    first = CachedEmbeddings(CountingEmbeddings(), path=path)
+    vectors = first.embed_documents(texts)
+    assert first.embeddings.embedded == 2  # duplicate text embedded once
+    assert vectors[0] == vectors[2]
+
+    # A new process over the same corpus (with whitespace noise) embeds nothing
+    second = CachedEmbeddings(CountingEmbeddings(), path=path)
+    again = second.embed_documents(["Baggage  allowance is 23kg. ", "Flight AI101 departs DEL."])
+    assert second.embeddings.embedded == 0
+    assert again == vectors[:2]
+    assert second.stats()["hit_ratio"] == 1.0
+
+
+def test_lru_eviction_respects_size_cap(tmp_path):
+    # Each 3-float vector is 12 bytes; cap the cache at roughly five entries
+    cache = CachedEmbeddings(CountingEmbeddings(), path=str(tmp_path / "cache.sqlite"), max_bytes=60)
+    for i in range(10):
+        cache.embed_documents([f"text {i}"])
+    assert cache.stats()["bytes"] <= 60
+    assert cache.stats()["entries"] < 10
+
+
+def test_replaced_entries_are_not_counted_twice(tmp_path):
+    cache = CachedEmbeddings(CountingEmbeddings(), path=str(tmp_path / "cache.sqlite"))
+    cache.embed_documents(["Baggage allowance is 23kg.", "Flight AI101 departs DEL."])
+    # Two callers that missed at the same time both store the same key
+    cache._store({cache._key("Flight AI101 departs DEL."): [1.0, 2.0, 3.0]})
+
+    on_disk = cache._conn.execute("SELECT SUM(size) FROM embeddings").fetchone()[0]
+    assert cache.stats()["bytes"] == on_disk == 2 * 3 * 4
@@ -0,0 +1,82 @@
+import pytest
+from botocore.exceptions import ConnectionClosedError, ReadTimeoutError
+from src.rag import embeddings as embeddings_module
+from src.rag.embeddings import AmazonTitanEmbedding
+from tests.fake_bedrock import FakeBedrockServer, fake_embedding
+
+
+class WhitespaceTokenizer:
+    """Offline stand-in for tiktoken: one token per whitespace-separated word."""
+
+    def encode_batch(self, texts, disallowed_special=()):
+        return [text.split() for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def titan_factory(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(embeddings_module.tiktoken, "get_encoding", lambda name: WhitespaceTokenizer())
+
+    def _factory(server, **kwargs):
+        return AmazonTitanEmbedding(region_name="us-east-1", endpoint_url=server.endpoint_url, **kwargs)
+    return _factory
+
+
+def test_embed_documents_preserves_order_under_throttling(titan_factory):
+    texts = [f"chunk number {i}" for i in range(40)]
+    with FakeBedrockServer(latency=0.01, capacity=3) as server:
+        embedder = titan_factory(server, max_workers=8)
+        vectors = embedder.embed_documents(texts)
+
+    assert vectors == [fake_embedding(t) for t in texts]
+    assert embedder.last_stats["failed_indices"] == []
+    assert embedder.last_stats["chunks_per_sec"] > 0
+
+
+def test_failed_embeddings_keep_their_position(titan_factory):
+    texts = ["first", "second FAIL", "third"]
+    with FakeBedrockServer() as server:
+        embedder = titan_factory(server, max_workers=2)
+        vectors = embedder.embed_documents(texts)
+
+    assert len(vectors) == 3
+    assert vectors[0] == fake_embedding("first")
+    assert vectors[1] == []
+    assert vectors[2] == fake_embedding("third")
+    assert embedder.last_stats["failed_indices"] == [1]
+
+
+def test_long_text_is_truncated_once(titan_factory):
+    with FakeBedrockServer() as server:
+        embedder = titan_factory(server)
+        embedder.max_tokens = 5
+        vector = embedder.embed_query("one two three four five six seven")
+
+    assert vector == fake_embedding("one two three four five")
+
+
+def test_dropped_connections_are_retried(titan_factory):
+    with FakeBedrockServer() as server:
+        embedder = titan_factory(server)
+        invoke_model = embedder.client.invoke_model
+        failures = [ReadTimeoutError(endpoint_url=server.endpoint_url),
+                    ConnectionClosedError(endpoint_url=server.endpoint_url)]
+
+        def flaky_invoke_model(**kwargs):
+            if failures:
+                raise failures.pop(0)
+            return invoke_model(**kwargs)
+
+        embedder.client.invoke_model = flaky_invoke_model
+        try:
+            vector = embedder.embed_query("first")
+        finally:
+            del embedder.client.invoke_model
+
+    assert vector == fake_embedding("first")
+    assert failures == [] and server.calls == 1
+    assert embedder.limiter.limit == embedder.max_workers  # transport errors do not count as throttles
@@ -0,0 +1,158 @@
+import asyncio
+from langchain_core.documents import Document
+from src.rag.engine import RAGEngine
+from src.rag.response_cache import ResponseCache
+from tests.stubs import HashEmbeddings, StubLLM, StubVectorStore
+
+DOCS = [
+    Document(page_content="Economy baggage allowance is two pieces of 23kg",
+             metadata={"source": "AirIndia/Fact Sheet.pdf"}),
+    Document(page_content="Air India was founded by J.R.D. Tata in 1932", metadata={"source": "AirIndia/History.pdf"}),
+]
+
+
+def make_engine(**kwargs):
+    store = StubVectorStore(DOCS)
+    return RAGEngine(store, llm_provider=StubLLM(), **kwargs), store
+
+
+def test_stream_yields_sources_then_tokens():
+    engine, _ = make_engine(response_cache=None)
+    events = list(engine.stream_response("What is the baggage allowance?"))
+
+    assert events[0][0] == "sources"
+    assert "Fact Sheet.pdf" in events[0][1]
+    tokens = [payload for kind, payload in events[1:]]
+    assert all(kind == "token" for kind, _ in events[1:])
+    assert "".join(tokens).strip() == engine.llm.answer
+
+
+def test_cached_answer_skips_retrieval_and_generation():
+    cache = ResponseCache(embed_fn=None)
+    engine, store = make_engine(response_cache=cache)
+
+    first = engine.generate_response("What is the baggage allowance?")
+    second = engine.generate_response("what is the baggage allowance?")
+
+    assert first == second
+    assert store.searches == 1
+    assert len(engine.llm.prompts) == 1
+
+
+class CondensingLLM(StubLLM):
+    """Returns `condensed` for the condensation prompt and the canned answer otherwise."""
+
+    def __init__(self, condensed, latency=0.0):
+        super().__init__(latency=latency)
+        self.condensed = condensed
+
+    def generate(self, prompt, system_prompt=None):
+        answer = super().generate(prompt, system_prompt)
+        return self.condensed if "Standalone search query" in prompt else answer
+
+
+HISTORY = [
+    {"role": "user", "content": "Tell me about Air India"},
+    {"role": "assistant", "content": "Air India is India's flag carrier."},
+]
+
+
+def test_async_speculative_retrieval_hit_saves_time():
+    store = StubVectorStore(DOCS, latency=0.1)
+    llm = CondensingLLM("What is the baggage allowance?", latency=0.1)
+    engine = RAGEngine(store, llm_provider=llm, response_cache=None)
+
+    _, sources = asyncio.run(engine.agenerate_response("What is the baggage allowance?", HISTORY))
+
+    assert "Fact Sheet.pdf" in sources
+    assert store.queries == ["What is the baggage allowance?"]
+    assert engine.speculation_stats["hits"] == 1
+    assert engine.speculation_stats["seconds_saved"] > 0.05
+
+
+def test_async_speculative_retrieval_miss_reretrieves():
+    store = StubVectorStore(DOCS)
+    engine = RAGEngine(store, llm_provider=CondensingLLM("Who founded Air India in 1932?"), response_cache=None)
+
+    _, sources = asyncio.run(engine.agenerate_response("Who started it?", HISTORY))
+
+    assert "History.pdf" in sources
+    assert sorted(store.queries) == ["Who founded Air India in 1932?", "Who started it?"]
+    assert engine.speculation_stats == {"attempts": 1, "hits": 0, "seconds_saved": 0.0}
+
+
+def test_generate_returns_structured_result():
+    store = StubVectorStore(DOCS)
+    engine = RAGEngine(store, llm_provider=CondensingLLM("What is the economy baggage allowance?"), response_cache=None)
+
+    result = engine.generate("And for economy?", HISTORY)
+
+    assert not hasattr(result, "__dict__")  # slots dataclass
+    assert result.search_query == "What is the economy baggage allowance?"
+    assert result.answer == engine.llm.answer and "Fact Sheet.pdf" in result.sources
+    assert result.chunk_texts[0] == DOCS[0].page_content
+    assert len(set(result.chunk_ids)) == len(DOCS)
+    assert result.scores == sorted(result.scores, reverse=True)
+    assert {"condense", "retrieval", "generation", "total"} <= result.timings_ms.keys()
+    assert result.tokens["generation"]["completion_tokens"] > 0
+    assert engine.generate_response("And for economy?", HISTORY) == (result.answer, result.sources)
+    assert store.searches == 2
+
+
+class FailingOnLLM(StubLLM):
+    def __init__(self, fail_on):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def generate(self, prompt, system_prompt=None):
+        if self.fail_on in prompt:
+            raise RuntimeError("model unavailable")
+        return super().generate(prompt, system_prompt)
+
+
+def test_generate_batch_searches_once_and_keeps_per_question_errors():
+    store = StubVectorStore(DOCS)
+    questions = ["What is the baggage allowance?", "Who founded Air India?", "What is the economy allowance?"]
+    engine = RAGEngine(store, llm_provider=FailingOnLLM(fail_on=questions[1]), response_cache=None)
+
+    results = engine.generate_batch(questions, max_workers=2)
+
+    assert store.batches == [3] and store.searches == 3
+    assert [r.search_query for r in results] == questions
+    assert results[0].answer == engine.llm.answer and "Fact Sheet.pdf" in results[0].sources
+    assert results[1].error == "model unavailable" and results[1].sources == []
+    assert results[2].error is None
+    assert all(r.timings_ms["retrieval"] > 0 for r in results)
+    assert engine.metrics.summary()["total"]["count"] == 3
+
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.calls = {"embed_query": 0, "embed_documents": 0}
+
+    def embed_documents(self, texts):
+        self.calls["embed_documents"] += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls["embed_query"] += 1
+        return super().embed_query(text)
+
+
+def test_generate_batch_embeds_the_questions_once_for_cache_and_search():
+    embeddings = CountingEmbeddings()
+    store = StubVectorStore(DOCS, embedding_function=embeddings)
+    engine = RAGEngine(store, llm_provider=StubLLM(), response_cache=ResponseCache(embed_fn=embeddings.embed_query))
+    questions = ["What is the baggage allowance?", "Who founded Air India?", "What are all the questions I asked you?"]
+
+    embeddings.calls.update(embed_query=0, embed_documents=0)
+    engine.generate_batch(questions, max_workers=2)
+    assert embeddings.calls == {"embed_query": 0, "embed_documents": 1}
+    assert store.batches == [2]  # the meta question is neither embedded nor searched
+
+    # The second batch is answered from the cache; the lookups still share one embedding call
+    embeddings.calls.update(embed_query=0, embed_documents=0)
+    results = engine.generate_batch([q.lower() for q in questions[:2]], max_workers=2)
+    assert all(r.cached for r in results) and store.batches == [2]
+    assert embeddings.calls == {"embed_query": 0, "embed_documents": 1}
@@ -0,0 +1,66 @@
+import json
+import time
+from src.rag.engine import RAGEngine
+from src.rag.evaluation import EvaluationRunner
+from tests.stubs import StubLLM, StubVectorStore
+from tests.test_engine import DOCS
+
+QUESTIONS = ["What is the baggage allowance?", "Who founded Air India?", "When was Air India founded?"]
+
+
+class FlakyLLM(StubLLM):
+    """Fails generation of prompts containing `fail_on` until it is cleared, and stalls on `slow_on`."""
+
+    def __init__(self, fail_on=None, slow_on=None):
+        super().__init__()
+        self.fail_on = fail_on
+        self.slow_on = slow_on
+
+    def generate(self, prompt, system_prompt=None):
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("model unavailable")
+        if self.slow_on and self.slow_on in prompt:
+            time.sleep(0.3)
+        return super().generate(prompt, system_prompt)
+
+
+def make_runner(tmp_path, llm):
+    engine = RAGEngine(StubVectorStore(DOCS), llm_provider=llm, response_cache=None)
+    return EvaluationRunner(engine, questions=QUESTIONS, ground_truth={}, checkpoint_dir=str(tmp_path), workers=3)
+
+
+def test_answers_are_generated_once_with_contexts(tmp_path):
+    runner = make_runner(tmp_path, StubLLM())
+    records = runner.run()
+
+    assert [r["question"] for r in records] == QUESTIONS
+    assert all(r["contexts"] and r["sources"] and r["llm_judge_score"] == 5 for r in records)
+    assert any("23kg" in context for context in records[0]["contexts"])
+    assert len(runner.engine.llm.prompts) == len(QUESTIONS)
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    llm = FlakyLLM(fail_on=QUESTIONS[1])
+    first = make_runner(tmp_path, llm).run()
+    assert [r["question"] for r in first] == [QUESTIONS[0], QUESTIONS[2]]
+
+    llm.fail_on = None
+    llm.prompts.clear()
+    runner = make_runner(tmp_path, llm)
+    second = runner.run()
+
+    assert [r["question"] for r in second] == QUESTIONS
+    assert len(llm.prompts) == 1  # only the question that failed is generated again
+    assert second[0]["answer"] == first[0]["answer"]
+
+
+def test_each_answer_is_checkpointed_and_judged_as_it_finishes(tmp_path):
+    runner = make_runner(tmp_path, FlakyLLM(slow_on=QUESTIONS[0]))
+    records = runner.run()
+
+    with open(runner.checkpoint_path, encoding="utf-8") as f:
+        steps = [(step["question"], "answer" if "answer" in step else "judge") for step in map(json.loads, f)]
+    # The fast questions were stored and judged while the slow one was still generating
+    assert steps.index((QUESTIONS[1], "judge")) < steps.index((QUESTIONS[0], "answer"))
+    assert steps.index((QUESTIONS[2], "judge")) < steps.index((QUESTIONS[0], "answer"))
+    assert records[0]["generation_seconds"] >= 0.3 and all(r["llm_judge_score"] == 5 for r in records)
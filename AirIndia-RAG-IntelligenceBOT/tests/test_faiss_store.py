@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from src.rag.faiss_store import FaissBackend
+
+
+def random_corpus(n=400, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = [f"id-{i}" for i in range(n)]
+    metadatas = [{"source": f"{i % 4}.pdf"} for i in range(n)]
+    return ids, [f"text {i}" for i in range(n)], metadatas, rng.normal(size=(n, dim))
+
+
+def test_index_is_rebuilt_after_writes_with_exact_fallback(tmp_path):
+    ids, texts, metadatas, matrix = random_corpus()
+    backend = FaissBackend(None, str(tmp_path), "test", index_type="hnsw")
+    backend.upsert(ids, texts, metadatas, matrix)
+
+    # No index yet: results come from exact search
+    assert backend.index_stale()
+    assert backend.search_by_vector(matrix[7], 1)[0][0] == "id-7"
+
+    stats = backend.build_index()
+    assert stats["rows"] == len(ids) and stats["index_bytes"] > 0
+    reloaded = FaissBackend(None, str(tmp_path), "test", index_type="hnsw")
+    assert not reloaded.index_stale()
+    assert reloaded.search_by_vector(matrix[7], 1)[0][0] == "id-7"
+
+    reloaded.delete(["id-7"])
+    assert reloaded.index_stale()
+    assert "id-7" not in [doc_id for doc_id, _ in reloaded.search_by_vector(matrix[7], 5)]
+
+
+@pytest.mark.parametrize("index_type, min_recall", [("flat", 1.0), ("hnsw", 0.9), ("ivf", 0.5), ("ivfpq", 0.2)])
+def test_index_types_recall_against_exact(tmp_path, index_type, min_recall):
+    ids, texts, metadatas, matrix = random_corpus()
+    backend = FaissBackend(None, str(tmp_path), "test", index_type=index_type,
+                           params={"pq_m": 8, "nprobe": 8, "ef_search": 64})
+    backend.upsert(ids, texts, metadatas, matrix)
+    backend.build_index()
+
+    queries = matrix[:50] + np.random.default_rng(1).normal(scale=0.1, size=(50, matrix.shape[1]))
+    recalls = []
+    for query in queries:
+        expected = {doc_id for doc_id, _ in backend.exact_search_by_vectors([query], 5)[0]}
+        found = {doc_id for doc_id, _ in backend.search_by_vector(query, 5)}
+        recalls.append(len(found & expected) / 5)
+    assert np.mean(recalls) >= min_recall
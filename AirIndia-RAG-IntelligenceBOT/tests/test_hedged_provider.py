@@ -0,0 +1,147 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.llm.hedged_provider import CircuitBreaker, HedgedProvider
+from tests.stubs import StubLLM
+
+
+class FailingLLM(StubLLM):
+    def generate(self, prompt, system_prompt=None):
+        super().generate(prompt, system_prompt)
+        raise RuntimeError("ThrottlingException")
+
+
+class TailLatencyLLM(StubLLM):
+    """Fast, except every `every`-th call, which takes `slow` seconds."""
+
+    def __init__(self, answer, fast, slow, every):
+        super().__init__(answer, latency=fast)
+        self.slow, self.every = slow, every
+
+    def generate(self, prompt, system_prompt=None):
+        self.prompts.append(prompt)
+        time.sleep(self.slow if len(self.prompts) % self.every == 0 else self.latency)
+        return self.answer
+
+
+class ClosableStreamLLM(StubLLM):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = False
+
+    def stream(self, prompt, system_prompt=None):
+        try:
+            yield from super().stream(prompt, system_prompt)
+        finally:
+            self.closed = True
+
+
+def test_slow_primary_is_hedged_to_secondary():
+    primary, secondary = StubLLM("primary", latency=0.5), StubLLM("secondary", latency=0.02)
+    llm = HedgedProvider(primary, secondary, initial_delay=0.05)
+
+    started = time.perf_counter()
+    assert llm.generate("q") == "secondary"
+    assert time.perf_counter() - started < 0.3
+    assert llm.stats["hedged"] == 1 and llm.stats["hedge_wins"] == 1
+
+
+def test_fast_primary_is_not_hedged():
+    primary, secondary = StubLLM("primary", latency=0.01), StubLLM("secondary")
+    llm = HedgedProvider(primary, secondary, initial_delay=0.2)
+
+    assert llm.generate("q") == "primary"
+    assert secondary.prompts == [] and llm.stats["hedged"] == 0
+
+
+def test_hedging_at_observed_percentile_cuts_tail_latency():
+    primary = TailLatencyLLM("primary", fast=0.01, slow=0.4, every=5)
+    llm = HedgedProvider(primary, StubLLM("secondary", latency=0.02), hedge_percentile=0.75, min_samples=4,
+                         initial_delay=1.0, min_delay=0.02)
+    for _ in range(4):
+        llm.generate("warm-up")  # four fast samples set the hedge threshold
+
+    latencies = []
+    for _ in range(10):
+        started = time.perf_counter()
+        llm.generate("q")
+        latencies.append(time.perf_counter() - started)
+
+    assert max(latencies) < 0.2
+    assert llm.stats["hedge_wins"] == 2
+
+
+def test_failing_primary_fails_over_then_trips_circuit():
+    primary, secondary = FailingLLM("primary"), StubLLM("secondary")
+    llm = HedgedProvider(primary, secondary, initial_delay=1.0, error_rate=0.5, min_calls=2, cooldown=60)
+
+    assert [llm.generate("q") for _ in range(4)] == ["secondary"] * 4
+    assert len(primary.prompts) == 2  # the last two calls skip the open circuit
+    assert llm.stats["failovers"] == 2 and llm.stats["short_circuited"] == 2
+    assert llm.upstreams[0].breaker.state == "open"
+
+
+def test_all_providers_failing_raises():
+    llm = HedgedProvider(FailingLLM("a"), FailingLLM("b"), initial_delay=1.0)
+    with pytest.raises(RuntimeError):
+        llm.generate("q")
+
+
+def test_circuit_half_opens_after_cooldown():
+    breaker = CircuitBreaker("test", error_rate=0.5, window=4, min_calls=2, cooldown=0.05)
+    breaker.record(False, breaker.allow())
+    breaker.record(False, breaker.allow())
+    assert breaker.allow() is None
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    trial = breaker.allow()
+    assert trial is not None
+    assert breaker.allow() is None and not breaker.available()  # one trial call at a time
+    breaker.record(False, trial)
+    assert breaker.state == "open" and breaker.trips == 2
+
+    time.sleep(0.06)
+    trial = breaker.allow()
+    breaker.record(True, trial)
+    assert breaker.state == "closed" and breaker.trips == 2
+    assert breaker.allow() is not None and breaker.allow() is not None
+
+
+def test_only_the_trial_call_settles_a_half_open_circuit():
+    breaker = CircuitBreaker("test", error_rate=0.5, window=4, min_calls=2, cooldown=0.05)
+    slow = breaker.allow()  # admitted while closed; still running when the circuit opens
+    breaker.record(False, breaker.allow())
+    breaker.record(False, breaker.allow())
+
+    time.sleep(0.06)
+    trial = breaker.allow()
+    breaker.record(True, slow)
+    assert breaker.state == "half-open" and breaker.allow() is None  # the stale success is ignored
+    breaker.record(False, slow)
+    assert breaker.state == "half-open" and breaker.trips == 1  # and so is a stale failure
+
+    breaker.record(True, trial)
+    assert breaker.state == "closed"
+
+
+def test_half_open_primary_gets_a_single_trial_call():
+    primary, secondary = StubLLM("primary", latency=0.1), StubLLM("secondary")
+    llm = HedgedProvider(primary, secondary, initial_delay=1.0, cooldown=60)
+    breaker = llm.upstreams[0].breaker
+    breaker.opened_at = time.monotonic() - 61  # cooled down: half-open
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        answers = list(pool.map(lambda _: llm.generate("q"), range(3)))
+
+    assert sorted(answers) == ["primary", "secondary", "secondary"]
+    assert len(primary.prompts) == 1 and breaker.state == "closed"
+
+
+def test_stream_races_first_token_and_cancels_loser():
+    primary = ClosableStreamLLM("slow primary answer", latency=0.3)
+    llm = HedgedProvider(primary, StubLLM("fast secondary answer"), initial_delay=0.05)
+
+    assert "".join(llm.stream("q")).strip() == "fast secondary answer"
+    time.sleep(0.4)
+    assert primary.closed
@@ -0,0 +1,60 @@
+from src.rag.history import ChatHistoryManager, format_messages
+from src.rag.tokens import count_tokens
+from tests.stubs import StubLLM
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i} about baggage " + "detail " * 40})
+        messages.append({"role": "assistant", "content": f"Answer {i} " + "explanation " * 40})
+    return messages
+
+
+def test_short_history_is_verbatim():
+    llm = StubLLM(answer="summary")
+    manager = ChatHistoryManager(llm, token_budget=10_000)
+    formatted = manager.format(conversation(2))
+    assert formatted.startswith("User: Question 0")
+    assert llm.prompts == []
+
+
+def test_long_history_is_summarized_incrementally():
+    llm = StubLLM(answer="User asked about baggage.")
+    history = conversation(4)
+    # Room for the two recent turns beside the summary, but not for the whole conversation
+    budget = count_tokens(format_messages(history[-4:])) + 60
+    manager = ChatHistoryManager(llm, token_budget=budget, recent_turns=2, summary_max_tokens=50)
+
+    formatted = manager.format(history)
+    assert formatted.startswith("Summary of earlier conversation: User asked about baggage.")
+    assert "Question 0" not in formatted and "Question 3" in formatted
+    assert len(llm.prompts) == 1
+
+    # Same history again: cached summary, no new LLM call
+    manager.format(history)
+    assert len(llm.prompts) == 1
+
+    # One more turn: only the newly aged-out turn is folded into the summary
+    history = conversation(5)
+    manager.format(history)
+    assert len(llm.prompts) == 2
+    assert "Question 2" in llm.prompts[-1] and "Question 1" not in llm.prompts[-1]
+
+
+def test_recent_turns_that_overflow_the_budget_are_folded_and_cut():
+    llm = StubLLM(answer="User asked about baggage.")
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i} " + "detail " * 10}
+               for i in range(6)]
+    budget = count_tokens(format_messages(history[-2:])) + 20
+    manager = ChatHistoryManager(llm, token_budget=budget, recent_turns=3, summary_max_tokens=10)
+
+    # Three recent turns and nothing older, but they alone are over budget
+    formatted = manager.format(history)
+    assert count_tokens(formatted) <= budget
+    assert formatted.startswith("Summary of earlier conversation:") and "Message 5" in formatted
+    assert "Message 0" not in formatted and len(llm.prompts) == 1
+
+    huge = [{"role": "user", "content": "Question about baggage " + "detail " * 500 + "final words"}]
+    formatted = manager.format(huge)
+    assert count_tokens(formatted) <= budget and formatted.rstrip().endswith("final words")
@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import shutil
+import pytest
+from src.rag import ingest, pipeline, vector_store
+from tests.stubs import HashEmbeddings
+
+PDF_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "AirIndia")
+SAMPLE_PDFS = ["Air India Fact Sheet.pdf", "International Routes Feb 2025.pdf"]
+
+
+BACKENDS = [
+    "chroma",
+    "numpy",
+    pytest.param("faiss", marks=pytest.mark.skipif(importlib.util.find_spec("faiss") is None,
+                                                   reason="faiss not installed")),
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def ingest_env(tmp_path, monkeypatch, request):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for name in SAMPLE_PDFS:
+        shutil.copy(os.path.join(PDF_DIR, name), docs_dir / name)
+
+    embeddings = HashEmbeddings()
+    monkeypatch.setattr(vector_store, "VECTOR_DB_DIR", str(tmp_path / "db"))
+    monkeypatch.setattr(vector_store, "VECTOR_BACKEND", request.param)
+    monkeypatch.setattr(ingest, "INGEST_MANIFEST_PATH", str(tmp_path / "db" / "manifest.json"))
+    monkeypatch.setattr(pipeline, "PDF_CACHE_DIR", str(tmp_path / "pdf_text"))
+    monkeypatch.setattr(ingest, "get_embedding_function", lambda: embeddings)
+    return str(docs_dir), embeddings
+
+
+def _count():
+    manager = vector_store.VectorStoreManager(HashEmbeddings())
+    return manager.count()
+
+
+def test_reingest_is_idempotent_and_incremental(ingest_env):
+    docs_dir, embeddings = ingest_env
+
+    ingest.ingest_data(docs_dir)
+    first_count = _count()
+    first_embedded = embeddings.embedded
+    assert first_count > 0
+
+    # Unchanged corpus: nothing is embedded and the collection does not grow
+    ingest.ingest_data(docs_dir)
+    assert embeddings.embedded == first_embedded
+    assert _count() == first_count
+
+    # Removing a file deletes exactly its chunks
+    os.remove(os.path.join(docs_dir, SAMPLE_PDFS[1]))
+    ingest.ingest_data(docs_dir)
+    remaining = _count()
+    assert 0 < remaining < first_count
+    assert embeddings.embedded == first_embedded
+
+
+def test_full_rebuild_removes_chunks_of_deleted_files(ingest_env):
+    docs_dir, embeddings = ingest_env
+    ingest.ingest_data(docs_dir)
+    deleted = os.path.join(docs_dir, SAMPLE_PDFS[1])
+    kept = os.path.join(docs_dir, SAMPLE_PDFS[0])
+    manager = vector_store.VectorStoreManager(HashEmbeddings())
+    kept_count = len(manager.source_chunk_ids(kept))
+    assert kept_count and manager.source_chunk_ids(deleted)
+
+    os.remove(deleted)
+    ingest.ingest_data(docs_dir, full_rebuild=True)
+    manager = vector_store.VectorStoreManager(HashEmbeddings())
+    assert manager.source_chunk_ids(deleted) == []
+    assert _count() == len(manager.source_chunk_ids(kept)) == kept_count
+
+    # The manifest still lists the kept file, so the next incremental run has nothing to do
+    embedded = embeddings.embedded
+    ingest.ingest_data(docs_dir)
+    assert embeddings.embedded == embedded and _count() == kept_count
+
+
+def test_ingest_builds_keyword_index_for_hybrid_search(ingest_env):
+    docs_dir, _ = ingest_env
+    ingest.ingest_data(docs_dir)
+
+    manager = vector_store.VectorStoreManager(HashEmbeddings())
+    assert os.path.exists(manager.keyword_index_path)
+    assert not manager.backend.index_stale()
+    results = manager.similarity_search("Air India international routes", k=3)
+    assert 0 < len(results) <= 3
+    assert all(doc.metadata.get("source") for doc in results)
+    scores = [score for _, score in manager.similarity_search_with_scores("Air India international routes", k=3)]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_batched_search_matches_single_queries(ingest_env):
+    docs_dir, _ = ingest_env
+    ingest.ingest_data(docs_dir)
+
+    manager = vector_store.VectorStoreManager(HashEmbeddings())
+    queries = ["Air India international routes", "Fact sheet fleet", "Domestic destinations"]
+    batched = manager.similarity_search_many(queries, k=3)
+    for query, hits in zip(queries, batched):
+        single = manager.similarity_search_with_scores(query, k=3)
+        assert [doc.page_content for doc, _ in hits] == [doc.page_content for doc, _ in single]
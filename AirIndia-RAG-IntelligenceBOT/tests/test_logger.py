@@ -0,0 +1,18 @@
+from src.logger import tail_file
+
+
+def test_tail_file_reads_last_lines_across_blocks(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"line {i}\n" for i in range(1000)))
+
+    assert tail_file(str(path), lines=3, block_size=16) == "line 997\nline 998\nline 999"
+    assert tail_file(str(path), lines=2000).count("\n") == 999
+
+
+def test_tail_file_handles_short_and_empty_files(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("only line")
+    assert tail_file(str(path), lines=20) == "only line"
+
+    path.write_text("")
+    assert tail_file(str(path), lines=20) == ""
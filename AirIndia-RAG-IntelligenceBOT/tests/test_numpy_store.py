@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from src.rag.numpy_store import NumpyBackend, exact_top_k
+from tests.stubs import HashEmbeddings
+
+TEXTS = [
+    "Checked baggage allowance for economy class",
+    "Pets are allowed in the cabin on domestic flights",
+    "Refunds for cancelled international tickets",
+    "Unaccompanied minors travelling alone need a consent form",
+    "Lounge access for business class passengers",
+]
+
+
+def populate(backend, embeddings):
+    ids = [f"id-{i}" for i in range(len(TEXTS))]
+    metadatas = [{"source": "a.pdf" if i % 2 else "b.pdf", "page": i} for i in range(len(TEXTS))]
+    backend.upsert(ids, TEXTS, metadatas, embeddings.embed_documents(TEXTS))
+    return ids
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_exact_search_and_reload(tmp_path, dtype):
+    embeddings = HashEmbeddings()
+    backend = NumpyBackend(embeddings, str(tmp_path), "test", dtype=dtype, block_rows=2)
+    populate(backend, embeddings)
+
+    for i, text in enumerate(TEXTS):
+        assert backend.search(text, k=1)[0].id == f"id-{i}"
+
+    # A fresh instance maps the persisted matrix instead of re-reading it into memory
+    reloaded = NumpyBackend(embeddings, str(tmp_path), "test", dtype=dtype)
+    assert isinstance(reloaded.vectors, np.memmap)
+    assert reloaded.vectors.dtype == np.dtype(dtype)
+    assert reloaded.search(TEXTS[3], k=2)[0].metadata == {"source": "a.pdf", "page": 3}
+
+
+def test_upsert_replaces_and_delete_removes(tmp_path):
+    embeddings = HashEmbeddings()
+    backend = NumpyBackend(embeddings, str(tmp_path), "test")
+    populate(backend, embeddings)
+
+    backend.upsert(["id-0"], ["Excess baggage fees"], [{"source": "b.pdf"}],
+                   embeddings.embed_documents(["Excess baggage fees"]))
+    assert backend.count() == len(TEXTS)
+    assert backend.get_documents(["id-0"])["id-0"].page_content == "Excess baggage fees"
+
+    backend.delete(backend.ids_for_source("a.pdf"))
+    assert sorted(backend.ids_for_source("b.pdf")) == ["id-0", "id-2", "id-4"]
+    assert backend.count() == 3
+
+    backend.delete(["id-0", "id-2", "id-4"])
+    assert backend.count() == 0 and backend.search("baggage") == []
+
+
+def test_deferred_writes_commit_once(tmp_path, monkeypatch):
+    embeddings = HashEmbeddings()
+    backend = NumpyBackend(embeddings, str(tmp_path), "test", dtype="int8")
+    populate(backend, embeddings)
+    saves = []
+    monkeypatch.setattr(backend, "_save", lambda *args, _save=backend._save: saves.append(1) or _save(*args))
+
+    with backend.deferred_writes():
+        for i, text in enumerate(["Excess baggage fees", "Excess baggage fees apply", "Seat selection"]):
+            backend.upsert([f"new-{i % 2}"], [text], [{"source": "c.pdf"}], embeddings.embed_documents([text]))
+        backend.delete(["id-1", "new-1"])
+        meals = "Meals on board"
+        backend.upsert(["id-1"], [meals], [{"source": "a.pdf"}], embeddings.embed_documents([meals]))
+        # Reads see the buffered rows before anything is written
+        assert backend.get_documents(["new-0"])["new-0"].page_content == "Seat selection"
+        assert saves == [] and NumpyBackend(embeddings, str(tmp_path), "test").count() == len(TEXTS)
+
+    assert saves == [1]
+    reloaded = NumpyBackend(embeddings, str(tmp_path), "test")
+    assert reloaded.count() == len(TEXTS) + 1 and "new-1" not in reloaded.ids
+    assert reloaded.search("Meals on board", k=1)[0].id == "id-1"
+    assert reloaded.search("Seat selection", k=1)[0].id == "new-0"
+
+
+def test_exact_top_k_orders_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert exact_top_k(scores, 3).tolist() == [1, 3, 2]
+    assert exact_top_k(scores, 10).tolist() == [1, 3, 2, 0]
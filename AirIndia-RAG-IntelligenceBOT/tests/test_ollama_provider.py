@@ -0,0 +1,43 @@
+import time
+from config.prompts import RAG_SYSTEM_PROMPT
+from src.llm.ollama_provider import OllamaProvider, context_window, keep_alive_value
+from tests.fake_ollama import FakeOllamaServer
+
+
+def test_context_window_rounds_up_to_power_of_two_within_bounds():
+    assert context_window(100, num_predict=512, minimum=2048, maximum=8192) == 2048
+    assert context_window(2000, num_predict=512, minimum=2048, maximum=8192) == 4096
+    assert context_window(50000, num_predict=512, minimum=2048, maximum=8192) == 8192
+    assert keep_alive_value("-1") == -1 and keep_alive_value("30m") == "30m"
+
+
+def test_warm_up_removes_cold_start_and_reuses_system_prefix():
+    with FakeOllamaServer(load_latency=0.3) as server:
+        cold = OllamaProvider(base_url=server.endpoint_url)
+        started = time.perf_counter()
+        cold.generate("What is the baggage allowance?", RAG_SYSTEM_PROMPT)
+        cold_seconds = time.perf_counter() - started
+
+        server.expire()
+        warm = OllamaProvider(base_url=server.endpoint_url)
+        warm.warm_up(RAG_SYSTEM_PROMPT)
+        started = time.perf_counter()
+        assert warm.generate("Which routes fly to London?", RAG_SYSTEM_PROMPT) == "Fake answer."
+        warm_seconds = time.perf_counter() - started
+
+    assert cold_seconds >= 0.3 > warm_seconds
+    first, warm_up, answer = server.requests
+    assert first["loaded"] and warm_up["loaded"] and not answer["loaded"]
+    assert answer["reused_tokens"] >= len(RAG_SYSTEM_PROMPT) // 4
+    assert answer["keep_alive"] == -1 and answer["options"] == {"num_ctx": 2048, "num_predict": 512}
+
+
+def test_context_window_only_grows_to_avoid_reloads():
+    with FakeOllamaServer(load_latency=0.0) as server:
+        provider = OllamaProvider(base_url=server.endpoint_url)
+        provider.generate("short question", RAG_SYSTEM_PROMPT)
+        list(provider.stream("long context " * 2000, RAG_SYSTEM_PROMPT))
+        provider.generate("short again", RAG_SYSTEM_PROMPT)
+
+    assert [r["options"]["num_ctx"] for r in server.requests] == [2048, 8192, 8192]
+    assert server.loads == 2
@@ -0,0 +1,65 @@
+import os
+import shutil
+from src.rag import pdf_cache
+from src.rag.pdf_cache import PdfTextCache
+from src.rag.pipeline import IngestionPipeline
+from src.rag.vector_backends import create_backend
+from src.rag.vector_store import VectorStoreManager
+from tests.stubs import HashEmbeddings
+from tests.test_ingest import PDF_DIR, SAMPLE_PDFS
+
+
+def _manager(db_dir):
+    embeddings = HashEmbeddings()
+    return VectorStoreManager(embeddings, backend=create_backend("numpy", embeddings, db_dir, "test"),
+                              persist_directory=db_dir)
+
+
+def test_rechunking_reads_pages_from_cache(tmp_path):
+    paths = [os.path.join(PDF_DIR, name) for name in SAMPLE_PDFS]
+    cache = PdfTextCache(str(tmp_path / "pdf_text"))
+    manager = _manager(str(tmp_path / "db"))
+
+    first = IngestionPipeline(manager, parse_workers=1, pdf_cache=cache)
+    first.run(paths)
+    assert first.cached_pages == 0 and cache.stats()["entries"] == len(paths)
+
+    rechunk = IngestionPipeline(manager, parse_workers=1, pdf_cache=cache, chunk_size=400, chunk_overlap=50)
+    summary = rechunk.run(paths)
+
+    assert sorted(summary["synced"]) == sorted(paths)
+    assert rechunk.cached_pages == first.stats["parse"].items
+    assert rechunk.stats["split"].items > first.stats["split"].items
+    assert set(manager.source_chunk_ids(paths[0]))
+
+
+def test_cached_pages_match_parsed_pages_under_any_path(tmp_path):
+    cache = PdfTextCache(str(tmp_path / "pdf_text"))
+    original = os.path.join(PDF_DIR, SAMPLE_PDFS[1])
+    copy = str(tmp_path / "renamed.pdf")
+    shutil.copy(original, copy)
+
+    parsed = cache.load(original)
+    cached = cache.load(copy)
+
+    assert cache.hits == 1 and cache.misses == 1
+    assert [text for text, _ in cached] == [text for text, _ in parsed]
+    assert all(meta["source"] == copy for _, meta in cached)
+
+
+def test_prune_drops_other_parsers_and_enforces_cap(tmp_path, monkeypatch):
+    cache = PdfTextCache(str(tmp_path / "pdf_text"), max_bytes=10 ** 9)
+    for name in SAMPLE_PDFS:
+        cache.load(os.path.join(PDF_DIR, name))
+    oldest, newest = sorted(cache.entries(), key=lambda e: e["last_used"])
+    os.utime(os.path.join(cache.cache_dir, oldest["file"]), (0, 0))
+
+    assert cache.prune(max_bytes=newest["bytes"]) == 1
+    assert [e["file"] for e in cache.entries()] == [newest["file"]]
+
+    monkeypatch.setattr(pdf_cache, "EXTRACTION_REVISION", 2)
+    pdf_cache.parser_version.cache_clear()
+    try:
+        assert cache.prune() == 1 and cache.entries() == []
+    finally:
+        pdf_cache.parser_version.cache_clear()
@@ -0,0 +1,75 @@
+import os
+import shutil
+from src.rag.pipeline import IngestionPipeline
+from src.rag.vector_backends import create_backend
+from src.rag.vector_store import VectorStoreManager
+from tests.stubs import HashEmbeddings
+from tests.test_ingest import PDF_DIR, SAMPLE_PDFS
+
+
+class RecordingEmbeddings(HashEmbeddings):
+    """Records how many pages the parse stage had produced at each embedding call."""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency=latency)
+        self.pipeline = None
+        self.parsed_at_call = []
+
+    def embed_documents(self, texts):
+        self.parsed_at_call.append(self.pipeline.stats["parse"].items)
+        return super().embed_documents(texts)
+
+
+def make_pipeline(tmp_path, embeddings, **kwargs):
+    db_dir = str(tmp_path / "db")
+    manager = VectorStoreManager(embeddings, backend=create_backend("numpy", embeddings, db_dir, "test"),
+                                 persist_directory=db_dir)
+    pipeline = IngestionPipeline(manager, parse_workers=1, use_pdf_cache=False, **kwargs)
+    embeddings.pipeline = pipeline
+    return manager, pipeline
+
+
+def test_sources_finish_in_order_with_their_chunk_ids(tmp_path):
+    done = []
+    paths = [os.path.join(PDF_DIR, name) for name in reversed(SAMPLE_PDFS)]
+    manager, pipeline = make_pipeline(tmp_path, RecordingEmbeddings(),
+                                      on_source_done=lambda source, ids: done.append((source, ids)))
+
+    saves = []
+    backend = manager.backend
+    backend._save = lambda *args, _save=backend._save: saves.append(1) or _save(*args)
+
+    summary = pipeline.run(paths)
+
+    assert summary == {"synced": paths, "failed": []}
+    assert saves == [1]  # the NumPy store is written once, at the end of the run
+    assert [source for source, _ in done] == paths
+    for source, ids in done:
+        assert ids and set(ids) == set(manager.source_chunk_ids(source))
+
+
+def test_bounded_queues_keep_parsing_close_to_embedding(tmp_path):
+    embeddings = RecordingEmbeddings(latency=0.2)
+    _, pipeline = make_pipeline(tmp_path, embeddings, pages_per_task=1, embed_batch_size=1, queue_size=1)
+
+    pipeline.run([os.path.join(PDF_DIR, "Air India Fact Sheet.pdf")])
+
+    total_pages = pipeline.stats["parse"].items
+    assert total_pages == 14 and len(embeddings.parsed_at_call) == total_pages  # one embed batch per page
+    # With one-slot queues the parser can only run a page per queue and stage ahead of the slow embedder
+    assert max(parsed - call for call, parsed in enumerate(embeddings.parsed_at_call)) <= 5
+
+
+def test_unreadable_pdf_is_reported_as_failed(tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    good = str(tmp_path / SAMPLE_PDFS[0])
+    shutil.copy(os.path.join(PDF_DIR, SAMPLE_PDFS[0]), good)
+    done = []
+    manager, pipeline = make_pipeline(tmp_path, RecordingEmbeddings(),
+                                      on_source_done=lambda source, ids: done.append(source))
+
+    summary = pipeline.run([str(broken), good])
+
+    assert summary == {"synced": [good], "failed": [str(broken)]}
+    assert done == [good] and manager.source_chunk_ids(str(broken)) == []
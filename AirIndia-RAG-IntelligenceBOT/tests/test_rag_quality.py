@@ -24,7 +24,8 @@ QUESTIONS = load_questions()
 def rag_engine():
     """Fixture to initialize the RAG Engine once for all tests in this module."""
     vs_manager = initialize_vector_store()
-    return RAGEngine(vs_manager)
+    engine = RAGEngine(vs_manager, response_cache=None)  # cached answers carry no contexts to judge against
+    return engine
 
 # Initialize a global history for the test session
 TEST_SESSION_HISTORY = []
@@ -40,27 +41,16 @@ def test_rag_response_quality(rag_engine, question):
     """Test the RAG engine's response with session-level chat history persistence."""
     global TEST_SESSION_HISTORY
     
-    # 1. Generate core RAG response using current test session history
-    response, sources = rag_engine.generate_response(question, chat_history=TEST_SESSION_HISTORY)
+    # 1. Generate core RAG response using current test session history, with the passages it used
+    result = rag_engine.generate(question, chat_history=TEST_SESSION_HISTORY)
+    response, sources = result.answer, result.sources
     
     # 2. Update session history for the NEXT test in the list
     TEST_SESSION_HISTORY.append({"role": "user", "content": question})
     TEST_SESSION_HISTORY.append({"role": "assistant", "content": response})
 
-    # 3. Retrieve the context used for transparency in evaluation
-    # (Using the same search query logic as the engine would internally)
-    search_query = question
-    if len(TEST_SESSION_HISTORY) > 2: # If it's not the first question
-        # We don't need to re-run the condense prompt here, we'll just check if it's a meta question
-        is_meta = any(word in question.lower() for word in ["asked you", "previous questions", "our conversation", "my last question"])
-        if is_meta:
-            context = "Conversation History"
-        else:
-            docs = rag_engine.vector_store.similarity_search(question)
-            context = "\n\n".join([doc.page_content for doc in docs])
-    else:
-        docs = rag_engine.vector_store.similarity_search(question)
-        context = "\n\n".join([doc.page_content for doc in docs])
+    # 3. The context the engine actually used (meta-history questions retrieve nothing)
+    context = "\n\n".join(result.contexts) if result.contexts else "Conversation History"
 
     # 4. Perform LLM-based Evaluation (Judge)
     eval_result = rag_engine.evaluate_response(question, response, context)
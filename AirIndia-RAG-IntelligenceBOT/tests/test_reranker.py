@@ -0,0 +1,33 @@
+import time
+from langchain_core.documents import Document
+from src.rag.reranker import CrossEncoderReranker
+
+
+class KeywordCrossEncoder:
+    """Scores a pair by how many query words appear in the passage, with a fixed per-pair cost."""
+
+    def __init__(self, delay_per_pair: float = 0.0):
+        self.delay_per_pair = delay_per_pair
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(self.delay_per_pair * len(pairs))
+        return [sum(word in passage.lower() for word in query.lower().split()) for query, passage in pairs]
+
+
+DOCS = [Document(page_content=text) for text in [
+    "Air India history and founders",
+    "Domestic routes for February 2025",
+    "Checked baggage allowance for international economy",
+]]
+
+
+def test_rerank_orders_by_cross_encoder_score():
+    reranker = CrossEncoderReranker(model=KeywordCrossEncoder(), top_n=1, budget_ms=1000)
+    assert reranker.rerank("baggage allowance", DOCS)[0] is DOCS[2]
+
+
+def test_over_budget_falls_back_to_vector_order():
+    reranker = CrossEncoderReranker(model=KeywordCrossEncoder(delay_per_pair=0.05), top_n=2, budget_ms=10)
+    reranker.rerank("baggage allowance", DOCS)  # first call calibrates the per-pair cost
+    assert reranker.rerank("baggage allowance", DOCS) == DOCS[:2]
+    assert reranker.fallbacks == 1
@@ -0,0 +1,37 @@
+from src.rag.response_cache import ResponseCache
+from tests.stubs import HashEmbeddings
+
+
+def make_cache(**kwargs):
+    return ResponseCache(embed_fn=HashEmbeddings().embed_query, **kwargs)
+
+
+def test_exact_and_semantic_hits_return_sources():
+    cache = make_cache(similarity_threshold=0.8)
+    cache.put("What is the baggage allowance?", "v1", "23kg", ["Fact Sheet.pdf"])
+
+    assert cache.get("  what is the BAGGAGE allowance? ", "v1") == ("23kg", ["Fact Sheet.pdf"])
+    assert cache.get("Please, what is the baggage allowance?", "v1") == ("23kg", ["Fact Sheet.pdf"])
+    assert cache.get("Who founded Air India?", "v1") is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_corpus_version_change_invalidates():
+    cache = make_cache()
+    cache.put("Domestic routes?", "v1", "DEL-BOM", ["Routes.pdf"])
+    assert cache.get("Domestic routes?", "v2") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    cache = make_cache(max_entries=2, ttl_seconds=10)
+    cache.put("q1", "v1", "a1", ["s"])
+    cache.put("q2", "v1", "a2", ["s"])
+    cache.get("q1", "v1")
+    cache.put("q3", "v1", "a3", ["s"])  # evicts q2, the least recently used
+    assert cache.get("q2", "v1") is None
+
+    real_time = __import__("time").time
+    monkeypatch.setattr("src.rag.response_cache.time.time", lambda: real_time() + 60)
+    assert cache.get("q1", "v1") is None
@@ -0,0 +1,102 @@
+import json
+import os
+import pytest
+from src.rag.pdf_cache import PdfTextCache
+from src.rag.pipeline import IngestionPipeline
+from src.rag.router import DOCUMENT_FAMILIES, FamilyCentroids, QueryRouter, document_family, evaluate_routing
+from src.rag.vector_backends import create_backend
+from src.rag.vector_store import VectorStoreManager
+from tests.stubs import HashEmbeddings
+from tests.test_ingest import BACKENDS, PDF_DIR
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = {"embed_query": 0, "embed_documents": 0}
+
+    def embed_documents(self, texts):
+        self.calls["embed_documents"] += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls["embed_query"] += 1
+        return super().embed_query(text)
+
+
+ALL_PDFS = sorted(os.path.join(PDF_DIR, name) for name in os.listdir(PDF_DIR) if name.endswith(".pdf"))
+
+
+@pytest.fixture(scope="module")
+def pdf_cache(tmp_path_factory):
+    return PdfTextCache(str(tmp_path_factory.mktemp("pdf_text")))
+
+
+@pytest.fixture(params=BACKENDS)
+def routed_manager(tmp_path, request, pdf_cache):
+    embeddings = CountingEmbeddings(dim=256)
+    db_dir = str(tmp_path / "db")
+    manager = VectorStoreManager(embeddings, backend=create_backend(request.param, embeddings, db_dir, "test"),
+                                 persist_directory=db_dir)
+    IngestionPipeline(manager, parse_workers=1, pdf_cache=pdf_cache).run(ALL_PDFS)
+    manager.rebuild_keyword_index()
+    manager.backend.build_index()
+    return manager
+
+
+def test_files_are_tagged_by_family():
+    families = {os.path.basename(path): document_family(path) for path in ALL_PDFS}
+    assert families["Domestic Routes Feb 2025.pdf"] == "routes"
+    assert families["Aiesl Employees service regulation.pdf"] == "regulations"
+    assert families["Air India Fact Sheet.pdf"] == "fact_sheet"
+    assert document_family("unknown.pdf") == "general"
+
+    keywords = [term for rules in DOCUMENT_FAMILIES.values() for term in rules["keywords"]]
+    assert len(keywords) == len(set(keywords))  # a query term routes to one family only
+
+
+def test_routed_search_only_returns_the_routed_family(routed_manager):
+    route = routed_manager.router.route("How many days of earned leave can an employee take?")
+    assert route.families == ["regulations"] and route.method == "keyword"
+    assert routed_manager.router.route("Which routes does Air India fly?").families == ["routes"]
+
+    docs = routed_manager.similarity_search("Which cities does Air India connect from Delhi?", k=3)
+    assert {doc.metadata["family"] for doc in docs} == {"routes"}
+    batched = routed_manager.similarity_search_many(["leave rules for an employee", "baggage allowance"], k=3)
+    assert [{doc.metadata["family"] for doc, _ in hits} for hits in batched] == [{"regulations"}, {"fact_sheet"}]
+
+
+def test_routing_reuses_the_search_embedding(routed_manager):
+    calls = routed_manager.embedding_function.calls
+    routed_manager.similarity_search_with_scores("Dummy", k=1, route=False)  # loads the indexes
+    calls.update(embed_query=0, embed_documents=0)
+
+    # Two queries without a keyword match (routed by embedding) and two routed by keyword
+    queries = ["Flight 182 in 1985", "Mont Blanc", "baggage allowance", "earned leave for an employee"]
+    routed_manager.similarity_search_many(queries, k=3)
+    assert calls == {"embed_query": 0, "embed_documents": 1}
+
+    routed_manager.similarity_search_with_scores("Mont Blanc", k=3)
+    assert calls == {"embed_query": 1, "embed_documents": 1}
+
+    report = evaluate_routing(routed_manager, {"Which Air India flight crashed on Mont Blanc?": ("history",)})
+    assert report["accuracy"] == 1.0 and report["routed_off_topic_tokens"] <= report["all_off_topic_tokens"]
+
+
+def test_router_falls_back_to_embedding_and_stays_off_for_untagged_chunks(tmp_path):
+    embeddings = HashEmbeddings(dim=64)
+    texts = {"routes": "delhi mumbai london flights", "regulations": "employee leave gratuity rules"}
+    centroids = FamilyCentroids()
+    centroids.add([{"family": family} for family in texts], embeddings.embed_documents(list(texts.values())))
+    path = str(tmp_path / "families.json")
+    centroids.save(path)
+
+    router = QueryRouter(embeddings, path, min_similarity=0.1, margin=0.05)
+    route = router.route("mumbai to london")  # no keyword rule matches
+    assert route.method == "embedding" and route.families == ["routes"]
+    assert router.route("").families is None
+
+    centroids.add([{"source": "old.pdf"}], embeddings.embed_documents(["untagged chunk"]))
+    centroids.save(path)
+    assert QueryRouter(embeddings, path).route("mumbai to london").families is None
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["untagged"] == 1
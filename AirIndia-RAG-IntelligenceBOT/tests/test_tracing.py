@@ -0,0 +1,53 @@
+import json
+from src.rag.tracing import LatencyHistogram, MetricsRegistry, Trace
+from src.rag.engine import RAGEngine
+from tests.stubs import StubVectorStore
+from tests.test_engine import DOCS, HISTORY, CondensingLLM
+
+
+def test_histogram_percentiles_and_buckets():
+    hist = LatencyHistogram(buckets_ms=(10, 100))
+    for ms in range(1, 101):
+        hist.observe(ms)
+    hist.observe(500)
+
+    assert hist.percentile(0.5) == 51
+    assert hist.percentile(0.99) == 100
+    assert hist.bucket_counts == [10, 90, 1]
+
+
+def test_registry_exports_prometheus_and_otlp():
+    registry = MetricsRegistry()
+    trace = Trace()
+    with trace.span("retrieval") as span:
+        span.set(docs_retrieved=3)
+    with trace.span("generation", prompt_tokens=120, completion_tokens=40):
+        pass
+    registry.record(trace)
+
+    text = registry.to_prometheus()
+    assert 'rag_stage_duration_seconds_count{stage="retrieval"} 1' in text
+    assert 'rag_stage_duration_seconds_bucket{stage="total",le="+Inf"} 1' in text
+    assert 'rag_stage_attribute_total{stage="generation",attribute="prompt_tokens"} 120' in text
+    assert "rag_requests_total 1" in text
+
+    metrics = json.loads(json.dumps(registry.to_otel_json()))["resourceMetrics"][0]["scopeMetrics"][0]["metrics"]
+    points = metrics[0]["histogram"]["dataPoints"]
+    assert {point["attributes"][0]["value"]["stringValue"] for point in points} == {"retrieval", "generation", "total"}
+    assert all(len(point["bucketCounts"]) == len(point["explicitBounds"]) + 1 for point in points)
+
+
+def test_engine_records_every_stage():
+    engine = RAGEngine(StubVectorStore(DOCS), llm_provider=CondensingLLM("What is the economy baggage allowance?"),
+                       response_cache=None)
+
+    list(engine.stream_response("And for economy?", chat_history=HISTORY))
+    engine.generate_response("What is the baggage allowance?")
+
+    summary = engine.metrics.summary()
+    for stage in ("condense", "meta_check", "cache_lookup", "retrieval", "context_build", "generation", "total"):
+        assert stage in summary
+    assert summary["total"]["count"] == 2
+    assert summary["condense"]["count"] == 1
+    assert engine.metrics.counters[("docs_retrieved", "retrieval")] > 0
+    assert engine.metrics.counters[("completion_tokens", "generation")] > 0